@@ -1,5 +1,55 @@
-from fastapi import Request
+from fastapi import HTTPException, Request
 from app.application.ports.runner_port import RunnerPort
+from app.application.ports.async_runner_port import AsyncRunnerPort
+from app.application.ports.catalog_port import CatalogPort
+
+def _started(request: Request, name: str):
+    # El runner y lo que depende de él se crean en segundo plano (ver /api/ready)
+    value = getattr(request.app.state, name, None)
+    if value is None:
+        startup = request.app.state.startup
+        detail = f"Arrancando ({startup.current})" if startup.error is None else f"Error al arrancar: {startup.error}"
+        raise HTTPException(status_code=503, detail=detail, headers={"Retry-After": "1"})
+    return value
 
 def get_runner(request: Request) -> RunnerPort:
-    return request.app.state.runner
\ No newline at end of file
+    return _started(request, "runner")
+
+def get_async_runner(request: Request) -> AsyncRunnerPort:
+    return _started(request, "async_runner")
+
+def get_catalog(request: Request) -> CatalogPort:
+    return request.app.state.catalog
+
+def get_renditions(request: Request):
+    return request.app.state.renditions
+
+def get_timelapse(request: Request):
+    return request.app.state.timelapse
+
+def get_previews(request: Request):
+    return _started(request, "previews")
+
+def get_events(request: Request):
+    return request.app.state.events
+
+def get_runner_events(request: Request):
+    return _started(request, "runner_events")
+
+def get_retention(request: Request):
+    return request.app.state.retention
+
+def get_metadata(request: Request):
+    return request.app.state.metadata
+
+def get_exporter(request: Request):
+    return request.app.state.exporter
+
+def get_metrics(request: Request):
+    return request.app.state.metrics
+
+def get_dedup(request: Request):
+    return request.app.state.dedup
+
+def get_startup(request: Request):
+    return request.app.state.startup
@@ -1,16 +1,51 @@
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException
-from app.adapters.http.deps import get_runner
+from app.adapters.http.deps import get_async_runner
+from app.adapters.http.schemas.capture import BurstRequest
+from app.application.validators.project_name import validate_project_name
 
 router = APIRouter()
 
+async def _capture(runner, wait: bool, project: Optional[str] = None) -> dict:
+    try:
+        meta = await runner.capture_now(wait=wait, project=project)
+        # Con wait, None: una etapa de ingesta descartó la foto (p. ej. repetida)
+        return {"ok": True, "persisted": wait and meta is not None, "metadata": meta}
+    except RuntimeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def _burst(runner, req: BurstRequest, wait: bool, project: Optional[str] = None) -> dict:
+    bracket = [step.to_controls() for step in req.bracket] if req.bracket else None
+    try:
+        result = await runner.capture_burst(req.frames, bracket=bracket, merge=req.merge, wait=wait, project=project)
+        return {"ok": True, "persisted": wait, **result}
+    except RuntimeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/api/status")
-def status(runner=Depends(get_runner)):
+async def status(runner=Depends(get_async_runner)):
     return runner.status()
 
 @router.post("/api/capture")
-def capture(runner=Depends(get_runner)):
-    try:
-        meta = runner.capture_now()
-        return {"ok": True, "metadata": meta}
-    except RuntimeError as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+async def capture(wait: bool = False, runner=Depends(get_async_runner)):
+    return await _capture(runner, wait)
+
+@router.post("/api/capture/burst")
+async def capture_burst(req: BurstRequest, wait: bool = False, runner=Depends(get_async_runner)):
+    return await _burst(runner, req, wait)
+
+@router.get("/api/projects/{name}/status")
+async def project_status(name: str, runner=Depends(get_async_runner)):
+    name = validate_project_name(name)
+    project = runner.status().get("projects", {}).get(name)
+    if project is None:
+        raise HTTPException(status_code=404, detail=f"Proyecto no activo: {name}")
+    return {"project": name, **project}
+
+@router.post("/api/projects/{name}/capture")
+async def project_capture(name: str, wait: bool = False, runner=Depends(get_async_runner)):
+    return await _capture(runner, wait, validate_project_name(name))
+
+@router.post("/api/projects/{name}/capture/burst")
+async def project_capture_burst(name: str, req: BurstRequest, wait: bool = False, runner=Depends(get_async_runner)):
+    return await _burst(runner, req, wait, validate_project_name(name))
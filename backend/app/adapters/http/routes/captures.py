@@ -0,0 +1,23 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.adapters.http.deps import get_catalog
+from app.application.validators.project_name import validate_project_name
+
+router = APIRouter()
+
+@router.get("/api/projects/{name}/captures")
+def list_captures(
+    name: str,
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    catalog=Depends(get_catalog),
+):
+    name = validate_project_name(name)
+    try:
+        items, next_cursor = catalog.query(name, start=from_, end=to, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"project": name, "captures": items, "next_cursor": next_cursor}
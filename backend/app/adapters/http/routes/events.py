@@ -0,0 +1,50 @@
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Depends, Header
+from fastapi.responses import StreamingResponse
+from app.adapters.http.deps import get_events, get_runner_events
+from app.infrastructure.common.sse import KEEPALIVE, MEDIA_TYPE, sse_message
+
+router = APIRouter()
+
+KEEPALIVE_SECONDS = 15
+
+@router.get("/api/events")
+async def events(
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    hub=Depends(get_events),
+    runner_events=Depends(get_runner_events),
+):
+    try:
+        last_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_id = -1  # id desconocido: el hub responde con resync
+    sub = hub.subscribe(last_id)
+
+    async def stream():
+        try:
+            if last_id is None:
+                # Conexión nueva: estado actual para no tener que pedir /api/status
+                yield sse_message("status", runner_events.snapshot())
+            while True:
+                try:
+                    message = await asyncio.wait_for(sub.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield KEEPALIVE
+                    continue
+                if message is None:
+                    # Cliente demasiado lento: se corta y reconecta con Last-Event-ID
+                    return
+                yield message
+        finally:
+            hub.unsubscribe(sub)
+
+    return StreamingResponse(
+        stream(),
+        media_type=MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/api/events/status")
+def events_status(hub=Depends(get_events)):
+    return hub.status()
@@ -0,0 +1,102 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from app.adapters.http.deps import get_catalog, get_exporter, get_renditions
+from app.infrastructure.db import decode_cursor
+from app.infrastructure.renditions import REBUILT_EXTS
+from app.application.validators.project_name import validate_project_name
+
+router = APIRouter()
+
+# Las capturas no cambian una vez escritas: el navegador puede reutilizarlas un día
+# sin preguntar y después revalida con ETag (304 sin cuerpo).
+CACHE_CONTROL = "public, max-age=86400"
+# Bloques grandes para las fotos de 64MP: menos vueltas por el bucle de envío.
+# Si el servidor ASGI soporta `http.response.pathsend`, FileResponse le pasa la ruta
+# y el envío es con sendfile (sin copias); Range/If-Range los resuelve FileResponse.
+CHUNK_SIZE = 1024 * 1024
+
+
+def _etag(path: Path) -> str:
+    st = path.stat()
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+
+def _cached_file_response(path: Path, request: Request) -> Response:
+    try:
+        etag = _etag(path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Fichero no encontrado")
+
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    response = FileResponse(path, headers=headers)
+    response.chunk_size = CHUNK_SIZE
+    return response
+
+
+@router.get("/api/projects/{name}/media/{filename}")
+def get_media(
+    name: str,
+    filename: str,
+    request: Request,
+    size: Optional[int] = None,
+    catalog=Depends(get_catalog),
+    renditions=Depends(get_renditions),
+):
+    name = validate_project_name(name)
+    capture = catalog.get(name, filename)
+    if capture is None:
+        raise HTTPException(status_code=404, detail="Captura no encontrada")
+
+    path = Path(capture["path"])
+    if size is None and path.suffix.lower() in REBUILT_EXTS:
+        # Diferencias y fotogramas en bruto: JPEG reconstruido (cacheado)
+        try:
+            path = renditions.full(name, filename, path)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Fichero no encontrado")
+    elif size is not None:
+        try:
+            path = renditions.get(name, filename, path, size)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Fichero no encontrado")
+
+    return _cached_file_response(path, request)
+
+
+@router.get("/api/projects/{name}/export.zip")
+def export_zip(
+    name: str,
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    after: Optional[str] = None,
+    metadata: bool = False,
+    catalog=Depends(get_catalog),
+    exporter=Depends(get_exporter),
+):
+    # Reanudar: `after` = última foto recibida entera, o directamente su `cursor`
+    name = validate_project_name(name)
+    if after is not None:
+        cursor = catalog.cursor_for(name, after)
+        if cursor is None:
+            raise HTTPException(status_code=404, detail="Captura no encontrada")
+    elif cursor is not None:
+        try:
+            decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    return StreamingResponse(
+        exporter.stream(name, from_, to, cursor=cursor, include_metadata=metadata),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{name}.zip"'},
+    )
@@ -0,0 +1,34 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.adapters.http.deps import get_metadata
+from app.application.validators.project_name import validate_project_name
+from app.infrastructure.metadata_log import parse_where
+
+router = APIRouter()
+
+@router.get("/api/projects/{name}/metadata")
+def query_metadata(
+    name: str,
+    fields: Optional[str] = None,
+    where: Optional[str] = None,
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    limit: int = Query(10000, ge=1, le=1000000),
+    metadata=Depends(get_metadata),
+):
+    # fields=ExposureTime,Lux,LensPosition  where=Lux<50,ExposureTime>=10000
+    name = validate_project_name(name)
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    try:
+        return metadata.query(name, field_list, parse_where(where), start=from_, end=to, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/api/projects/{name}/metadata/{filename}")
+def get_capture_metadata(name: str, filename: str, metadata=Depends(get_metadata)):
+    # Exportación del JSON por foto de antes
+    record = metadata.record(validate_project_name(name), filename)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Metadatos no encontrados")
+    return record
@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from app.adapters.http.deps import get_previews, get_runner
+from app.application.validators.project_name import validate_project_name
+from app.infrastructure.common.mjpeg import MEDIA_TYPE
+
+router = APIRouter()
+
+def _stream(previews, project: str) -> StreamingResponse:
+    broadcaster, sub = previews.subscribe(project)
+
+    async def frames():
+        try:
+            while True:
+                yield await sub.get()
+        finally:
+            broadcaster.unsubscribe(sub)
+
+    return StreamingResponse(
+        frames(),
+        media_type=MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache, no-store"},
+    )
+
+def _active_project(runner) -> str:
+    active = runner.active_projects()
+    if not active:
+        raise HTTPException(status_code=400, detail="No hay proyecto activo")
+    if len(active) > 1:
+        raise HTTPException(status_code=400, detail="Hay varios proyectos activos: indica el proyecto")
+    return active[0]
+
+# Ruta antigua: el preview del único proyecto activo, con el mismo productor que su ruta por proyecto
+@router.get("/api/preview.mjpeg")
+async def preview(runner=Depends(get_runner), previews=Depends(get_previews)):
+    return _stream(previews, _active_project(runner))
+
+@router.get("/api/preview/status")
+def preview_status(runner=Depends(get_runner), previews=Depends(get_previews)):
+    active = runner.active_projects()
+    only = previews.status().get(active[0]) if len(active) == 1 else None
+    return {**(only or {"clients": 0, "frames": 0, "paused": True}), "projects": previews.status()}
+
+# Solo proyectos en marcha: si no, cada nombre válido dejaría un productor sin cámara
+@router.get("/api/projects/{name}/preview.mjpeg")
+async def project_preview(name: str, runner=Depends(get_runner), previews=Depends(get_previews)):
+    name = validate_project_name(name)
+    if name not in runner.active_projects():
+        raise HTTPException(status_code=404, detail="El proyecto no está en marcha")
+    return _stream(previews, name)
@@ -1,23 +1,45 @@
 from fastapi import APIRouter, Depends, HTTPException
-from app.adapters.http.deps import get_runner
+from app.adapters.http.deps import get_async_runner, get_catalog, get_dedup, get_retention, get_runner
 from app.application.validators.project_name import validate_project_name
 
 router = APIRouter()
 
 @router.get("/api/projects")
-def list_projects(runner=Depends(get_runner)):
-    return {"projects": runner.list_projects()}
+def list_projects(
+    runner=Depends(get_runner),
+    catalog=Depends(get_catalog),
+    retention=Depends(get_retention),
+    dedup=Depends(get_dedup),
+):
+    projects = runner.list_projects()
+    # Del registro de uso del catálogo: no se recorre el disco
+    usage = catalog.usage()
+    empty = {"files": 0, "bytes": 0}
+    return {
+        "projects": projects,
+        "usage": {name: usage.get(name, empty) for name in projects},
+        "retention": retention.status(),
+        # Fotos descartadas o guardadas como diferencia y espacio ahorrado (estimado)
+        "dedup": dedup.stats(),
+    }
 
 @router.post("/api/projects/{name}/start")
-def start_project(name: str, runner=Depends(get_runner)):
+async def start_project(name: str, runner=Depends(get_async_runner)):
     name = validate_project_name(name)
     try:
-        runner.start_project(name)
+        await runner.start_project(name)
         return {"ok": True, "active_project": name}
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Project config.json not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/api/projects/stop")
-def stop_project(runner=Depends(get_runner)):
-    runner.stop_project()
+async def stop_project(runner=Depends(get_async_runner)):
+    await runner.stop_project()
+    return {"ok": True}
+
+@router.post("/api/projects/{name}/stop")
+async def stop_named_project(name: str, runner=Depends(get_async_runner)):
+    await runner.stop_project(validate_project_name(name))
     return {"ok": True}
\ No newline at end of file
@@ -0,0 +1,23 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.adapters.http.deps import get_catalog
+from app.application.validators.project_name import validate_project_name
+
+router = APIRouter()
+
+@router.get("/api/projects/{name}/series")
+def get_series(
+    name: str,
+    metric: str = "mean_luminosity",
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    bucket: Optional[int] = Query(None, ge=1),
+    catalog=Depends(get_catalog),
+):
+    name = validate_project_name(name)
+    try:
+        bucket, points = catalog.series(name, metric, start=from_, end=to, bucket=bucket)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"project": name, "metric": metric, "bucket": bucket, "points": points}
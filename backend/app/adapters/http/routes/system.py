@@ -1,7 +1,21 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse, Response
+from app.adapters.http.deps import get_metrics, get_startup
+from app.infrastructure.common.metrics import MEDIA_TYPE
 
 router = APIRouter()
 
 @router.get("/api/health")
-def health():
-    return {"ok": True}
\ No newline at end of file
+async def health():
+    return {"ok": True}
+
+# 200 cuando han terminado todas las fases del arranque; 503 mientras tanto, con su estado
+@router.get("/api/ready")
+def ready(startup=Depends(get_startup)):
+    status = startup.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+# Formato de texto de Prometheus
+@router.get("/api/metrics")
+async def metrics(registry=Depends(get_metrics)):
+    return Response(registry.render(), media_type=MEDIA_TYPE)
@@ -0,0 +1,32 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
+from app.adapters.http.deps import get_catalog, get_timelapse
+from app.application.validators.project_name import validate_project_name
+from app.infrastructure.common.mjpeg import MEDIA_TYPE
+
+router = APIRouter()
+
+@router.get("/api/projects/{name}/timelapse")
+def timelapse(
+    name: str,
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    step: int = Query(1, ge=1),
+    size: int = Query(1024, ge=64, le=4096),
+    catalog=Depends(get_catalog),
+    renderer=Depends(get_timelapse),
+):
+    name = validate_project_name(name)
+    if catalog.count(name) == 0:
+        raise HTTPException(status_code=404, detail="El proyecto no tiene capturas")
+
+    cached = renderer.cache_path(name, from_, to, step, size)
+    if cached.exists():
+        return FileResponse(cached, media_type=MEDIA_TYPE)
+
+    return StreamingResponse(
+        renderer.stream(name, from_, to, step, size, cached),
+        media_type=MEDIA_TYPE,
+    )
@@ -0,0 +1,29 @@
+from typing import Optional
+from pydantic import BaseModel, Field, model_validator
+
+
+class BracketStep(BaseModel):
+    exposure_time: Optional[int] = Field(None, gt=0, description="ExposureTime (µs)")
+    analogue_gain: Optional[float] = Field(None, ge=1.0, description="AnalogueGain")
+
+    def to_controls(self) -> dict:
+        controls = {}
+        if self.exposure_time is not None:
+            controls["ExposureTime"] = self.exposure_time
+        if self.analogue_gain is not None:
+            controls["AnalogueGain"] = self.analogue_gain
+        return controls
+
+
+class BurstRequest(BaseModel):
+    frames: int = Field(3, ge=1, le=16)
+    bracket: Optional[list[BracketStep]] = None
+    merge: bool = False
+
+    @model_validator(mode="after")
+    def _check_bracket(self):
+        if self.bracket is not None and len(self.bracket) != self.frames:
+            raise ValueError("bracket debe tener un paso por foto (len(bracket) == frames)")
+        if self.merge and self.frames < 2:
+            raise ValueError("merge necesita al menos 2 fotos")
+        return self
@@ -0,0 +1,18 @@
+from __future__ import annotations
+from typing import Optional, Protocol
+
+
+class AsyncRunnerPort(Protocol):
+    def status(self) -> dict: ...
+    async def start_project(self, name: str) -> None: ...
+    async def stop_project(self, name: Optional[str] = None) -> None: ...
+    async def capture_now(self, wait: bool = False, project: Optional[str] = None) -> dict: ...
+    async def capture_burst(
+        self,
+        frames: int,
+        bracket: Optional[list[dict]] = None,
+        merge: bool = False,
+        wait: bool = False,
+        project: Optional[str] = None,
+    ) -> dict: ...
+    def shutdown(self) -> None: ...
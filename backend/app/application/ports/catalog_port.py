@@ -0,0 +1,25 @@
+from __future__ import annotations
+from datetime import datetime
+from typing import Optional, Protocol
+
+
+class CatalogPort(Protocol):
+    def record(self, meta: dict) -> int: ...
+    def query(
+        self,
+        project: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+    ) -> tuple[list[dict], Optional[str]]: ...
+    def get(self, project: str, filename: str) -> Optional[dict]: ...
+    def series(
+        self,
+        project: str,
+        metric: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        bucket: Optional[int] = None,
+    ) -> tuple[int, list[dict]]: ...
+    def usage(self) -> dict[str, dict]: ...
@@ -1,11 +1,27 @@
 from __future__ import annotations
-from typing import Protocol, Any
+from typing import Callable, Optional, Protocol, Any
 
 
 class RunnerPort(Protocol):
+    # `project=None` se refiere al único proyecto en marcha (RuntimeError si hay varios)
     def status(self) -> dict: ...
     def list_projects(self) -> list[str]: ...
+    def active_projects(self) -> list[str]: ...
     def start_project(self, name: str) -> None: ...
-    def stop_project(self) -> None: ...
-    def capture_now(self) -> dict: ...
+    # Proyectos de current.txt (si el runner se creó con autostart=False)
+    def start_initial_projects(self) -> None: ...
+    def stop_project(self, name: Optional[str] = None) -> None: ...
+    def capture_now(self, wait: bool = False, project: Optional[str] = None) -> dict: ...
+    def capture_burst(
+        self,
+        frames: int,
+        bracket: Optional[list[dict]] = None,
+        merge: bool = False,
+        wait: bool = False,
+        project: Optional[str] = None,
+    ) -> dict: ...
+    def preview_frame(self, project: Optional[str] = None) -> Optional[Any]: ...
+    def stop_preview(self, project: Optional[str] = None) -> None: ...
+    def add_capture_listener(self, listener: Callable[[dict], None]) -> None: ...
+    def add_ingest_stage(self, stage: Callable[[dict, Any], Optional[dict]]) -> None: ...
     def shutdown(self) -> None: ...
\ No newline at end of file
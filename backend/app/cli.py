@@ -0,0 +1,103 @@
+import argparse
+import sys
+
+from app.config import DATA_DIR, CATALOG_PATH, CACHE_DIR, METADATA_DIR, PROJECTS_DIR, RENDITION_SIZES
+
+
+def _catalog_rebuild(args) -> int:
+    from app.infrastructure.db import CaptureCatalog
+    from app.infrastructure.captures_fs import rebuild_catalog
+    from app.infrastructure.metadata_log import MetadataLog
+
+    catalog = CaptureCatalog(CATALOG_PATH)
+    metadata = MetadataLog(METADATA_DIR)
+    try:
+        count = rebuild_catalog(catalog, DATA_DIR, project=args.project, metadata=metadata)
+    finally:
+        metadata.close()
+        catalog.close()
+    print(f"Catálogo reconstruido: {count} capturas")
+    return 0
+
+
+def _retention_run(args) -> int:
+    from app.infrastructure.db import CaptureCatalog
+    from app.infrastructure.projects_fs import ProjectRegistry
+    from app.infrastructure.renditions import RenditionService
+    from app.infrastructure.retention import RetentionCompactor
+
+    catalog = CaptureCatalog(CATALOG_PATH)
+    registry = ProjectRegistry(PROJECTS_DIR)
+    registry.rescan()
+    renditions = RenditionService(CACHE_DIR / "renditions", RENDITION_SIZES, workers=1)
+    try:
+        summary = RetentionCompactor(catalog, registry, renditions, io_rate=0).run_once(args.project)
+    finally:
+        renditions.shutdown()
+        catalog.close()
+    print(f"Retención: {summary['deleted']} borradas, {summary['downsampled']} reducidas, {summary['bytes_freed']} bytes liberados")
+    return 0
+
+
+def _metadata_export(args) -> int:
+    import json
+    import os
+    from app.infrastructure.metadata_log import MetadataLog
+
+    metadata = MetadataLog(METADATA_DIR)
+    os.makedirs(args.out, exist_ok=True)
+    count = 0
+    try:
+        for record in metadata.records(args.project):
+            stem = os.path.splitext(record.get("filename", f"capture-{count}"))[0]
+            # Mismo formato que el JSON por foto de antes: los metadatos de la cámara si los hay
+            payload = record.get("metadata", record) if args.camera else record
+            with open(os.path.join(args.out, f"{stem}-metadata.json"), "w", encoding="utf-8") as f:
+                json.dump(payload, f, indent=2, default=str)
+            count += 1
+    finally:
+        metadata.close()
+    print(f"Metadatos exportados: {count} ficheros en {args.out}")
+    return 0
+
+
+def _metadata_compact(args) -> int:
+    from app.infrastructure.metadata_log import MetadataLog
+
+    metadata = MetadataLog(METADATA_DIR)
+    try:
+        compacted = metadata.compact(args.project)
+    finally:
+        metadata.close()
+    print("Metadatos compactados" if compacted else "Nada que compactar")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("catalog-rebuild", help="Reconstruye el catálogo de capturas desde disco")
+    p.add_argument("--project", help="Solo este proyecto (por defecto, todos)")
+    p.set_defaults(func=_catalog_rebuild)
+
+    p = sub.add_parser("retention-run", help="Aplica ahora las políticas de retención (sin límite de E/S)")
+    p.add_argument("--project", help="Solo este proyecto (por defecto, todos)")
+    p.set_defaults(func=_retention_run)
+
+    p = sub.add_parser("metadata-export", help="Exporta el log de metadatos a un JSON por foto")
+    p.add_argument("--project", required=True)
+    p.add_argument("--out", required=True, help="Directorio de salida")
+    p.add_argument("--camera", action="store_true", help="Solo los metadatos de la cámara (formato de meapis)")
+    p.set_defaults(func=_metadata_export)
+
+    p = sub.add_parser("metadata-compact", help="Compacta ya el log de metadatos de un proyecto (con la API parada)")
+    p.add_argument("--project", required=True)
+    p.set_defaults(func=_metadata_compact)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,4 +5,60 @@ ENV = os.getenv("MEAPLAN_ENV", "sim")  # sim | raspi
 DATA_DIR = Path(os.getenv("MEAPLAN_DATA_DIR", "data")).resolve()
 
 PROJECTS_DIR = DATA_DIR / "projects"
-MEDIA_DIR = DATA_DIR / "media"
\ No newline at end of file
+MEDIA_DIR = DATA_DIR / "media"
+
+# Cámaras virtuales del simulador (un proyecto por cámara a la vez)
+SIM_CAMERAS = int(os.getenv("MEAPLAN_SIM_CAMERAS", "2"))
+# Tiempos de hardware simulados (OwlSight/V3) multiplicados por este factor (0: sin esperas)
+SIM_LATENCY = float(os.getenv("MEAPLAN_SIM_LATENCY", "1"))
+# Ancho de los fotogramas simulados en px (0: resolución completa del sensor)
+SIM_FRAME_WIDTH = int(os.getenv("MEAPLAN_SIM_FRAME_WIDTH", "1280"))
+# Velocidad del tiempo simulado de la escena (p. ej. 3600: las plantas crecen una hora por segundo)
+SIM_TIME_SCALE = float(os.getenv("MEAPLAN_SIM_TIME_SCALE", "1"))
+
+# Reescaneo del directorio de proyectos cuando no se puede usar inotify (segundos)
+PROJECTS_RESCAN_INTERVAL = float(os.getenv("MEAPLAN_PROJECTS_RESCAN_INTERVAL", "30"))
+
+# Catálogo SQLite de capturas (índice por proyecto y fecha)
+CATALOG_PATH = Path(os.getenv("MEAPLAN_CATALOG_PATH", DATA_DIR / "catalog.db")).resolve()
+
+CACHE_DIR = Path(os.getenv("MEAPLAN_CACHE_DIR", DATA_DIR / "cache")).resolve()
+
+# Miniaturas/previews generadas para cada captura (lado mayor en px)
+RENDITION_SIZES = tuple(int(s) for s in os.getenv("MEAPLAN_RENDITION_SIZES", "256,1024").split(","))
+RENDITION_WORKERS = int(os.getenv("MEAPLAN_RENDITION_WORKERS", "2"))
+
+# Pipeline captura -> codificación -> escritura
+PIPELINE_WORKERS = int(os.getenv("MEAPLAN_PIPELINE_WORKERS", "1"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("MEAPLAN_PIPELINE_QUEUE_SIZE", "8"))
+# Memoria máxima de fotogramas en la cola (MB; 0: sin límite). Cada foto pendiente es el
+# RGB sin comprimir: ~190MB a resolución completa de la OwlSight (9152x6944), ~35MB la V3.
+# Con 400MB caben dos de la OwlSight; en una Raspberry de 1-2GB no conviene subirlo.
+PIPELINE_QUEUE_MB = float(os.getenv("MEAPLAN_PIPELINE_QUEUE_MB", "400"))
+# Cola llena (block | drop_oldest | drop_newest). Con block una SD lenta retrasa la siguiente
+# foto programada; drop_oldest mantiene la rejilla y, si hay que perder una foto, pierde la
+# más antigua pendiente (la siguiente está más cerca de la escena actual).
+PIPELINE_POLICY = os.getenv("MEAPLAN_PIPELINE_POLICY", "drop_oldest")
+# Codificaciones simultáneas (jpg/webp/png según el "format"/"quality" de cada proyecto; 0: en el hilo del pipeline)
+ENCODER_WORKERS = int(os.getenv("MEAPLAN_ENCODER_WORKERS", "2"))
+
+# Eventos SSE: eventos recientes que se reenvían al reconectar y buffer por cliente
+EVENTS_HISTORY = int(os.getenv("MEAPLAN_EVENTS_HISTORY", "256"))
+EVENTS_QUEUE_SIZE = int(os.getenv("MEAPLAN_EVENTS_QUEUE_SIZE", "64"))
+
+# Capturas programadas que vencen dentro de esta ventana (s) comparten una sesión de luz
+CAPTURE_BATCH_WINDOW = float(os.getenv("MEAPLAN_CAPTURE_BATCH_WINDOW", "0.3"))
+# Espera tras encender la luz antes del primer fotograma de la sesión (s)
+LIGHT_WARMUP = float(os.getenv("MEAPLAN_LIGHT_WARMUP", "0"))
+
+# Retención: cada cuánto se aplican las políticas (s) y límite de E/S del compactador (MB/s)
+RETENTION_INTERVAL = float(os.getenv("MEAPLAN_RETENTION_INTERVAL", "3600"))
+RETENTION_IO_RATE = float(os.getenv("MEAPLAN_RETENTION_IO_RATE", "2")) * 1024 * 1024
+
+# Metadatos de captura: log por proyecto (fsync agrupado cada METADATA_FLUSH_INTERVAL s),
+# compactado en columnas cada METADATA_COMPACT_ROWS registros
+METADATA_DIR = Path(os.getenv("MEAPLAN_METADATA_DIR", DATA_DIR / "metadata")).resolve()
+METADATA_FLUSH_INTERVAL = float(os.getenv("MEAPLAN_METADATA_FLUSH_INTERVAL", "1"))
+METADATA_COMPACT_ROWS = int(os.getenv("MEAPLAN_METADATA_COMPACT_ROWS", "1000"))
+# Escribir además el JSON de cada foto (formato anterior)
+METADATA_SIDECARS = os.getenv("MEAPLAN_METADATA_SIDECARS", "0") == "1"
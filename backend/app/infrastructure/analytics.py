@@ -0,0 +1,49 @@
+from __future__ import annotations
+import math
+
+import numpy as np
+
+# Métricas por captura que se agregan en series temporales
+METRICS = ("mean_luminosity", "green_index")
+
+HISTOGRAM_BINS = 32
+# Umbral del índice de exceso de verde (ExG = 2G - R - B) para contar un píxel como vegetación
+EXG_THRESHOLD = 20
+# Las estadísticas se calculan sobre ~1MP: con 64MP el resultado es el mismo y cuesta 64 veces menos
+MAX_PIXELS = 1_000_000
+
+
+def compute_analytics(frame: np.ndarray) -> dict:
+    """
+    Estadísticas de una foto RGB uint8 (H, W, 3) en memoria, vectorizadas:
+    - mean_luminosity: luminancia media (0-255, pesos BT.601 en enteros)
+    - green_index: fracción de píxeles con ExG > EXG_THRESHOLD (cobertura vegetal)
+    - histogram: histograma de luminancia en HISTOGRAM_BINS intervalos
+    """
+    height, width = frame.shape[:2]
+    step = max(1, math.ceil(math.sqrt(height * width / MAX_PIXELS)))
+    sample = frame[::step, ::step, :3]
+
+    r = sample[..., 0].astype(np.int16)
+    g = sample[..., 1].astype(np.int16)
+    b = sample[..., 2].astype(np.int16)
+
+    # (77R + 150G + 29B) >> 8 cabe en uint16 sin pasar a float
+    lum = (77 * r.astype(np.uint16) + 150 * g.astype(np.uint16) + 29 * b.astype(np.uint16)) >> 8
+    histogram = np.bincount(lum.ravel() >> 3, minlength=HISTOGRAM_BINS)
+
+    exg = 2 * g - r - b
+    green = np.count_nonzero(exg > EXG_THRESHOLD)
+
+    return {
+        "mean_luminosity": round(float(lum.mean()), 3),
+        "green_index": round(green / exg.size, 5),
+        "histogram": histogram.tolist(),
+    }
+
+
+def analytics_stage(meta: dict, frame: np.ndarray) -> dict:
+    """
+    Etapa de ingesta: añade `analytics` a los metadatos de la captura.
+    """
+    return {**meta, "analytics": compute_analytics(frame)}
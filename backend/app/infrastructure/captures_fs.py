@@ -0,0 +1,151 @@
+from __future__ import annotations
+import json
+import os
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, Optional
+
+from app.infrastructure.db import CaptureCatalog
+from app.infrastructure.metadata_log import MetadataLog
+
+_IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp", ".npy", ".npz"}
+
+# FakeRunner:  <filename>_YYYYmmdd_HHMMSS[_n].jpg
+_SIM_TS_RE = re.compile(r"_(\d{8}_\d{6})(?:_\d+)?$")
+# meapis:      <filename>-<host>-<camera>-YYYY-mm-dd_HH-MM-SS[_n][-postfix].<ext>
+# (_n: n-ésima foto del mismo segundo)
+_MEAPIS_TS_RE = re.compile(r"-(\d+)-(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})(?:_\d+)?(?:-[^-]+)?$")
+
+
+def _read_json(path: str) -> Optional[dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _logged(metadata: Optional[MetadataLog], project: str) -> dict[str, dict]:
+    """
+    Registros del log de metadatos del proyecto por nombre de fichero.
+    """
+    if metadata is None:
+        return {}
+    return {r.get("filename"): r for r in metadata.records(project)}
+
+
+def _scan_sim(project: str, media_dir: str, logged: dict[str, dict]) -> Iterator[dict]:
+    """
+    Capturas del simulador: media/<project>/<file>.jpg + <file>.jpg.json (o su registro en el log)
+    """
+    with os.scandir(media_dir) as it:
+        entries = [e for e in it if e.is_file()]
+    names = {e.name for e in entries}
+
+    for e in entries:
+        stem, ext = os.path.splitext(e.name)
+        if ext.lower() not in _IMAGE_EXTS:
+            continue
+        st = e.stat()
+        meta = _read_json(e.path + ".json") if f"{e.name}.json" in names else logged.get(e.name)
+        meta = dict(meta or {})
+
+        m = _SIM_TS_RE.search(stem)
+        if "timestamp_utc" not in meta:
+            meta["timestamp_utc"] = m.group(1) if m else st.st_mtime
+
+        meta.update({
+            "project": project,
+            "filename": e.name,
+            "path": e.path,
+            "camera": meta.get("camera", "SIM"),
+            "size_bytes": st.st_size,
+        })
+        yield meta
+
+
+def _scan_meapis(project: str, project_dir: str, logged: dict[str, dict]) -> Iterator[dict]:
+    """
+    Capturas de meapis: projects/<project>/pictures/<file>.<ext> + metadata/<file>-metadata.json
+    (o su registro en el log de metadatos)
+    """
+    pictures_dir = os.path.join(project_dir, "pictures")
+    metadata_dir = os.path.join(project_dir, "metadata")
+
+    try:
+        with os.scandir(metadata_dir) as it:
+            metadata_names = {e.name for e in it}
+    except FileNotFoundError:
+        metadata_names = set()
+
+    with os.scandir(pictures_dir) as it:
+        for e in it:
+            stem, ext = os.path.splitext(e.name)
+            if not e.is_file() or ext.lower() not in _IMAGE_EXTS:
+                continue
+            st = e.stat()
+
+            m = _MEAPIS_TS_RE.search(stem)
+            if m:
+                # meapis nombra los ficheros con hora local
+                ts = datetime.strptime(m.group(2), "%Y-%m-%d_%H-%M-%S").astimezone(timezone.utc).timestamp()
+                camera = m.group(1)
+            else:
+                ts, camera = st.st_mtime, None
+
+            meta = {
+                "project": project,
+                "filename": e.name,
+                "path": e.path,
+                "camera": camera,
+                "timestamp_utc": ts,
+                "size_bytes": st.st_size,
+            }
+            md_name = f"{stem}-metadata.json"
+            if md_name in metadata_names:
+                metadata = _read_json(os.path.join(metadata_dir, md_name))
+                if metadata is not None:
+                    meta["metadata"] = metadata
+            elif e.name in logged:
+                record = logged[e.name]
+                meta.update({k: record[k] for k in ("metadata", "analytics") if k in record})
+            yield meta
+
+
+def scan_captures(data_dir: Path, project: Optional[str] = None, metadata: Optional[MetadataLog] = None) -> Iterator[dict]:
+    """
+    Recorre las carpetas de capturas existentes (simulador y meapis) y genera
+    los registros del catálogo. Si se indica `project`, solo ese proyecto.
+    Las fotos sin JSON propio toman sus metadatos del log `metadata`.
+    """
+    media_dir = data_dir / "media"
+    projects_dir = data_dir / "projects"
+
+    if media_dir.is_dir():
+        for p in sorted(media_dir.iterdir()):
+            if p.is_dir() and not p.name.startswith(".") and project in (None, p.name):
+                yield from _scan_sim(p.name, str(p), _logged(metadata, p.name))
+
+    if projects_dir.is_dir():
+        for p in sorted(projects_dir.iterdir()):
+            if (p / "pictures").is_dir() and project in (None, p.name):
+                yield from _scan_meapis(p.name, str(p), _logged(metadata, p.name))
+
+
+def rebuild_catalog(
+    catalog: CaptureCatalog,
+    data_dir: Path,
+    project: Optional[str] = None,
+    metadata: Optional[MetadataLog] = None,
+) -> int:
+    """
+    Reconstruye el catálogo desde disco en una única inserción masiva.
+    Devuelve el número de capturas registradas.
+    """
+    return catalog.record_many(
+        scan_captures(data_dir, project, metadata),
+        replace_project=project,
+        clear_all=project is None,
+    )
+
@@ -0,0 +1,131 @@
+from __future__ import annotations
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Optional
+
+from app.application.ports.runner_port import RunnerPort
+
+
+class AsyncRunner:
+    """
+    Versión asíncrona de un runner (FakeRunner o RaspiRunner).
+
+    El trabajo que bloquea la cámara (calibración al arrancar un proyecto, capturas,
+    ráfagas) se ejecuta en un executor de un hilo por proyecto (un proyecto por cámara),
+    así no ocupa el threadpool de Starlette, /api/health o /api/status siguen
+    respondiendo y las cámaras trabajan en paralelo.
+
+    Las peticiones de captura de un proyecto que llegan mientras otra está en curso
+    comparten su resultado en vez de esperar turno para hacer una foto más.
+
+    Al parar un proyecto se cierra su executor (si no le queda trabajo pendiente).
+
+    `on_status_change` se llama tras arrancar o parar un proyecto.
+    """
+
+    def __init__(self, runner: RunnerPort, on_status_change: Optional[Callable[[], None]] = None):
+        self.runner = runner
+        self.on_status_change = on_status_change
+        self._executors: dict[str, ThreadPoolExecutor] = {}
+        # Trabajos enviados y sin terminar por proyecto (solo se accede desde el event loop)
+        self._pending: dict[str, int] = {}
+        # Captura en curso por (proyecto, wait) (solo se accede desde el event loop)
+        self._inflight: dict[tuple[str, bool], asyncio.Future] = {}
+        self.captures = 0
+        self.shared = 0
+
+    def _resolve(self, project: Optional[str]) -> str:
+        if project is not None:
+            return project
+        active = self.runner.active_projects()
+        if not active:
+            raise RuntimeError("No hay proyecto activo")
+        if len(active) > 1:
+            raise RuntimeError("Hay varios proyectos activos: indica el proyecto")
+        return active[0]
+
+    async def _run(self, name: str, fn, /, *args, **kwargs):
+        executor = self._executors.get(name)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"camera-{name}")
+            self._executors[name] = executor
+        loop = asyncio.get_running_loop()
+        self._pending[name] = self._pending.get(name, 0) + 1
+        try:
+            return await loop.run_in_executor(executor, partial(fn, *args, **kwargs))
+        finally:
+            self._pending[name] -= 1
+            if not self._pending[name]:
+                del self._pending[name]
+
+    def _prune(self) -> None:
+        """
+        Cierra los executors de los proyectos parados que no tienen trabajo pendiente.
+        """
+        active = set(self.runner.active_projects())
+        for name in [n for n in self._executors if n not in active and n not in self._pending]:
+            self._executors.pop(name).shutdown(wait=False)
+
+    def _forget(self, key: tuple[str, bool], fut: asyncio.Future) -> None:
+        if self._inflight.get(key) is fut:
+            del self._inflight[key]
+        if not fut.cancelled():
+            fut.exception()  # evita el aviso de excepción no recuperada
+
+    def status(self) -> dict:
+        return {
+            **self.runner.status(),
+            "capture": {"inflight": len(self._inflight), "captures": self.captures, "shared": self.shared},
+        }
+
+    def _status_changed(self) -> None:
+        if self.on_status_change is not None:
+            self.on_status_change()
+
+    async def start_project(self, name: str) -> None:
+        try:
+            await self._run(name, self.runner.start_project, name)
+        finally:
+            # Si no arrancó (o sustituyó a otro proyecto en su cámara) sobra algún executor
+            self._prune()
+            self._status_changed()
+
+    async def stop_project(self, name: Optional[str] = None) -> None:
+        names = self.runner.active_projects() if name is None else [name]
+        try:
+            await asyncio.gather(*(self._run(n, self.runner.stop_project, n) for n in names))
+        finally:
+            self._prune()
+            self._status_changed()
+
+    async def capture_now(self, wait: bool = False, project: Optional[str] = None) -> dict:
+        project = self._resolve(project)
+        key = (project, wait)
+        fut = self._inflight.get(key)
+        if fut is None:
+            self.captures += 1
+            fut = asyncio.ensure_future(self._run(project, self.runner.capture_now, wait=wait, project=project))
+            self._inflight[key] = fut
+            fut.add_done_callback(partial(self._forget, key))
+        else:
+            self.shared += 1
+        # shield: si un cliente se desconecta no se cancela la captura de los demás
+        return await asyncio.shield(fut)
+
+    async def capture_burst(
+        self,
+        frames: int,
+        bracket: Optional[list[dict]] = None,
+        merge: bool = False,
+        wait: bool = False,
+        project: Optional[str] = None,
+    ) -> dict:
+        project = self._resolve(project)
+        return await self._run(
+            project, self.runner.capture_burst, frames, bracket=bracket, merge=merge, wait=wait, project=project
+        )
+
+    def shutdown(self) -> None:
+        for executor in self._executors.values():
+            executor.shutdown(wait=True)
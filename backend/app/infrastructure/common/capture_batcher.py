@@ -0,0 +1,139 @@
+from __future__ import annotations
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+from app.infrastructure.common.light import LightArbiter
+
+log = logging.getLogger(__name__)
+
+SESSION_OWNER = "session"
+
+
+class CaptureBatcher:
+    """
+    Etapa del scheduler que agrupa en una sola sesión con luz las capturas que
+    vencen dentro de una ventana de `window` segundos.
+
+    Cada sesión hace primero las capturas sin luz y después, con una sola
+    encendida y un solo apagado, todas las que la necesitan. Mientras la sesión
+    tiene la luz, los turn_on/turn_off de cada cámara no la conmutan (árbitro).
+    `warmup` es la espera tras encender antes del primer fotograma.
+    """
+
+    def __init__(self, arbiter: LightArbiter, window: float = 0.3, warmup: float = 0.0, history: int = 20):
+        self.arbiter = arbiter
+        self.window = window
+        self.warmup = warmup
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.sessions = 0
+        self.frames = 0
+        self.toggles_saved = 0
+        self.recent: deque[dict] = deque(maxlen=history)
+        self._thread = threading.Thread(target=self._run, name="capture-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, job: Callable[[], object], use_light: bool = True) -> Future:
+        """
+        Encola una captura para la próxima sesión. El Future da el resultado de `job`.
+        """
+        fut: Future = Future()
+        self._queue.put((job, use_light, fut))
+        return fut
+
+    def run(self, job: Callable[[], object], use_light: bool = True):
+        """
+        Igual que `submit`, pero espera al resultado (para los jobs del scheduler).
+        """
+        return self.submit(job, use_light).result()
+
+    def _collect(self, first) -> list:
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return batch
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                return batch
+            if item is None:
+                self._queue.put(None)
+                return batch
+            batch.append(item)
+
+    def _execute(self, job, fut: Future) -> None:
+        if not fut.set_running_or_notify_cancel():
+            return
+        try:
+            fut.set_result(job())
+        except BaseException as e:
+            log.exception("Batched capture failed")
+            fut.set_exception(e)
+
+    def _session(self, batch: list) -> None:
+        started = time.time()
+        t_start = time.perf_counter()
+        dark = [(job, fut) for job, use_light, fut in batch if not use_light]
+        lit = [(job, fut) for job, use_light, fut in batch if use_light]
+
+        for job, fut in dark:
+            self._execute(job, fut)
+
+        light_on = 0.0
+        if lit:
+            t_on = time.perf_counter()
+            self.arbiter.acquire(SESSION_OWNER)
+            try:
+                if self.warmup > 0:
+                    time.sleep(self.warmup)
+                for job, fut in lit:
+                    self._execute(job, fut)
+            finally:
+                self.arbiter.release(SESSION_OWNER)
+            light_on = time.perf_counter() - t_on
+
+        session = {
+            "started": started,
+            "frames": len(batch),
+            "lit": len(lit),
+            "duration": round(time.perf_counter() - t_start, 4),
+            "light_on": round(light_on, 4),
+            # Sin agrupar cada foto con luz habría encendido y apagado por su cuenta
+            "toggles_saved": 2 * (len(lit) - 1) if lit else 0,
+        }
+        with self._lock:
+            self.sessions += 1
+            self.frames += session["frames"]
+            self.toggles_saved += session["toggles_saved"]
+            self.recent.append(session)
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            try:
+                self._session(self._collect(first))
+            except Exception:
+                log.exception("Capture session failed")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "window": self.window,
+                "sessions": self.sessions,
+                "frames": self.frames,
+                "toggles_saved": self.toggles_saved,
+                "recent": list(self.recent),
+            }
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout)
@@ -0,0 +1,261 @@
+from __future__ import annotations
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Optional, Sequence, Union
+
+import numpy as np
+from PIL import Image
+
+from app.infrastructure.common.metrics import MetricsRegistry
+
+# Formatos de salida ("format" del config.json, que también es la extensión del fichero)
+# y sus presets de calidad ("quality": nombre del preset o, en jpg/webp, un entero 1-100).
+# npy guarda el array tal cual: se abre con np.load(mmap_mode="r") sin decodificar.
+FORMATS = {
+    "jpg": {
+        "pil": "JPEG",
+        "presets": {
+            "standard": {"quality": 90},
+            "high": {"quality": 95, "subsampling": 0},
+            "low": {"quality": 75},
+        },
+    },
+    "webp": {
+        "pil": "WEBP",
+        "presets": {
+            "standard": {"quality": 85, "method": 4},
+            "high": {"quality": 95, "method": 4},
+            "low": {"quality": 70, "method": 2},
+            "lossless": {"lossless": True, "quality": 50, "method": 2},
+        },
+    },
+    "png": {
+        "pil": "PNG",
+        "presets": {
+            "standard": {"compress_level": 6},
+            "fast": {"compress_level": 1},
+            "small": {"compress_level": 9},
+        },
+    },
+    "npy": {
+        "pil": None,
+        "presets": {"standard": {}},
+    },
+}
+
+_ALIASES = {"jpeg": "jpg"}
+
+# Lo que devuelve un encoder: bytes, o varios buffers que se escriben seguidos (npy: cabecera + array sin copiar)
+Encoded = Union[bytes, Sequence[Union[bytes, memoryview]]]
+
+
+def encoded_size(data: Encoded) -> int:
+    if isinstance(data, (bytes, bytearray)):
+        return len(data)
+    return sum(memoryview(b).nbytes for b in data)
+
+
+class FrameEncoder:
+    """
+    Codifica un fotograma RGB uint8 en un formato y preset de `FORMATS`.
+    """
+
+    def __init__(self, fmt: str = "jpg", quality: Union[str, int, None] = None):
+        fmt = _ALIASES.get(str(fmt).lower(), str(fmt).lower())
+        if fmt not in FORMATS:
+            raise ValueError(f"Formato desconocido: {fmt} (disponibles: {', '.join(FORMATS)})")
+        spec = FORMATS[fmt]
+        presets = spec["presets"]
+
+        if quality is None:
+            quality = "standard"
+        if isinstance(quality, int) and not isinstance(quality, bool):
+            if "quality" not in presets["standard"] or not 1 <= quality <= 100:
+                raise ValueError(f"quality numérica (1-100) solo vale para jpg y webp, no para {fmt}")
+            options = {**presets["standard"], "quality": quality}
+        elif quality in presets:
+            options = presets[quality]
+        else:
+            raise ValueError(f"Preset de calidad desconocido para {fmt}: {quality} (disponibles: {', '.join(presets)})")
+
+        self.format = fmt
+        self.quality = quality
+        self.extension = fmt
+        self.options = options
+        self._pil_format = spec["pil"]
+
+    @property
+    def name(self) -> str:
+        return f"{self.format}:{self.quality}"
+
+    def encode(self, frame: np.ndarray) -> Encoded:
+        if self._pil_format is None:
+            return self._encode_npy(frame)
+        buf = io.BytesIO()
+        Image.fromarray(frame).save(buf, self._pil_format, **self.options)
+        return buf.getvalue()
+
+    def _encode_npy(self, frame: np.ndarray) -> Encoded:
+        frame = np.ascontiguousarray(frame)
+        header = io.BytesIO()
+        np.lib.format.write_array_header_1_0(header, np.lib.format.header_data_from_array_1_0(frame))
+        return [header.getvalue(), memoryview(frame).cast("B")]
+
+    def __repr__(self) -> str:
+        return f"FrameEncoder({self.name})"
+
+
+class DeltaEncoder:
+    """
+    Guarda un fotograma como diferencia con un keyframe ya guardado (`keyframe_name`,
+    en la misma carpeta), por teselas de `tile` px como los bloques "skip" de un códec
+    de vídeo: las teselas cuyo color medio no cambia más de `threshold` niveles respecto
+    al keyframe se toman de él, y solo las que cambian se guardan, en un mosaico JPEG.
+    Comparar medias por tesela deja fuera el ruido del sensor, que hace que una resta
+    píxel a píxel de dos fotos casi iguales ocupe más que el propio JPEG.
+
+    La reconstrucción (`imaging.load_delta`) es el keyframe tal como se guardó con las
+    teselas cambiadas encima.
+    """
+
+    format = "delta"
+    extension = "npz"
+    quality = "delta"
+
+    def __init__(self, keyframe: np.ndarray, keyframe_name: str, tile: int = 64, threshold: float = 3.0, quality: int = 90):
+        if tile % 16:
+            raise ValueError("El tamaño de tesela debe ser múltiplo de 16")
+        self.keyframe = keyframe
+        self.keyframe_name = keyframe_name
+        self.tile = tile
+        self.threshold = threshold
+        self.quality = quality
+
+    @property
+    def name(self) -> str:
+        return "delta"
+
+    def _tile_means(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Color medio (ny, nx, 3) de cada tesela, sobre una muestra de 1 de cada 4x4 píxeles.
+        """
+        t = self.tile // 4
+        sample = frame[::4, ::4, :3]
+        ny, nx = -(-sample.shape[0] // t), -(-sample.shape[1] // t)
+        pad = ((0, ny * t - sample.shape[0]), (0, nx * t - sample.shape[1]), (0, 0))
+        sample = np.pad(sample, pad, mode="edge").astype(np.float32)
+        return sample.reshape(ny, t, nx, t, 3).mean(axis=(1, 3))
+
+    def changed_tiles(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Índices (fila, columna) de las teselas que cambian respecto al keyframe.
+        """
+        diff = np.abs(self._tile_means(frame) - self._tile_means(self.keyframe)).max(axis=-1)
+        return np.argwhere(diff > self.threshold).astype(np.int32)
+
+    def encode(self, frame: np.ndarray) -> Encoded:
+        if frame.shape != self.keyframe.shape:
+            raise ValueError(f"El fotograma {frame.shape} no tiene el tamaño del keyframe {self.keyframe.shape}")
+        t = self.tile
+        tiles = self.changed_tiles(frame)
+        arrays = {
+            "keyframe": np.array(self.keyframe_name),
+            "shape": np.array(frame.shape, dtype=np.int32),
+            "tile": np.int32(t),
+            "tiles": tiles,
+        }
+        if len(tiles):
+            # Mosaico casi cuadrado con las teselas cambiadas; las de los bordes, rellenas con ceros
+            cols = int(np.ceil(np.sqrt(len(tiles))))
+            rows = -(-len(tiles) // cols)
+            mosaic = np.zeros((rows * t, cols * t, 3), dtype=np.uint8)
+            for i, (ty, tx) in enumerate(tiles):
+                block = frame[ty * t:(ty + 1) * t, tx * t:(tx + 1) * t]
+                my, mx = divmod(i, cols)
+                mosaic[my * t:my * t + block.shape[0], mx * t:mx * t + block.shape[1]] = block
+            buf = io.BytesIO()
+            Image.fromarray(mosaic).save(buf, "JPEG", quality=self.quality)
+            arrays["mosaic"] = np.frombuffer(buf.getvalue(), dtype=np.uint8)
+        buf = io.BytesIO()
+        np.savez(buf, **arrays)
+        return buf.getvalue()
+
+    def __repr__(self) -> str:
+        return f"DeltaEncoder({self.keyframe_name}, tile={self.tile})"
+
+
+@lru_cache(maxsize=None)
+def get_encoder(fmt: str = "jpg", quality: Union[str, int, None] = None) -> FrameEncoder:
+    return FrameEncoder(fmt, quality)
+
+
+def encoder_for(config: Optional[dict]) -> FrameEncoder:
+    """
+    Encoder del config.json de un proyecto, p. ej.:
+        "format": "webp", "quality": "high"
+    Sin "format", JPEG estándar (como meapis). ValueError si no es válido.
+    """
+    config = config or {}
+    return get_encoder(config.get("format", "jpg"), config.get("quality"))
+
+
+DEFAULT_ENCODER = get_encoder()
+
+
+class EncoderPool:
+    """
+    Hilos de codificación, separados de los del pipeline: el pipeline puede tener
+    más hilos para la E/S (escrituras lentas en la SD, listeners) sin multiplicar las
+    codificaciones simultáneas, que son lo que consume CPU y memoria (una foto de
+    64MP son ~200MB). Con `workers=0` se codifica en el hilo que llama.
+    """
+
+    def __init__(self, workers: int = 2, metrics: Optional[MetricsRegistry] = None, name: str = "encode"):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name) if workers > 0 else None
+        self._lock = threading.Lock()
+        self._frames: dict[str, int] = {}
+        self._bytes: dict[str, int] = {}
+        self.busy = 0
+
+        metrics = metrics or MetricsRegistry()
+        metrics.counter("meaplan_encoded_frames_total", "Fotogramas codificados por formato y preset", ("encoder",),
+                        fn=lambda: dict(self._frames))
+        metrics.counter("meaplan_encoded_bytes_total", "Bytes codificados por formato y preset", ("encoder",),
+                        fn=lambda: dict(self._bytes))
+        metrics.gauge("meaplan_encoder_busy", "Codificaciones en curso", fn=lambda: self.busy)
+
+    def encode(self, frame: np.ndarray, encoder: FrameEncoder = DEFAULT_ENCODER) -> Encoded:
+        """
+        Codifica `frame` en un hilo del pool y espera al resultado.
+        """
+        if self._executor is None:
+            return self._encode(frame, encoder)
+        return self._executor.submit(self._encode, frame, encoder).result()
+
+    def _encode(self, frame: np.ndarray, encoder: FrameEncoder) -> Encoded:
+        with self._lock:
+            self.busy += 1
+        try:
+            data = encoder.encode(frame)
+        finally:
+            with self._lock:
+                self.busy -= 1
+        with self._lock:
+            self._frames[encoder.name] = self._frames.get(encoder.name, 0) + 1
+            self._bytes[encoder.name] = self._bytes.get(encoder.name, 0) + encoded_size(data)
+        return data
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "busy": self.busy,
+                "encoded": {name: {"frames": n, "bytes": self._bytes[name]} for name, n in self._frames.items()},
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
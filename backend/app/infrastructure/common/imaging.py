@@ -0,0 +1,117 @@
+from __future__ import annotations
+import io
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+from app.infrastructure.common.encoders import Encoded, encoded_size
+
+
+def encode_jpeg(frame: np.ndarray, quality: int = 90) -> bytes:
+    """
+    Codifica un array RGB uint8 como JPEG en memoria.
+    """
+    buf = io.BytesIO()
+    Image.fromarray(frame).save(buf, "JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def write_file(data: Encoded, path: Path) -> int:
+    """
+    Escribe `data` (bytes o varios buffers seguidos) en `path` (creando la carpeta).
+    Devuelve el tamaño en bytes.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        if isinstance(data, (bytes, bytearray)):
+            f.write(data)
+        else:
+            f.writelines(data)
+    return encoded_size(data)
+
+
+def save_jpeg(frame: np.ndarray, path: Path, quality: int = 90) -> int:
+    """
+    Guarda un array RGB uint8 como JPEG. Devuelve el tamaño en bytes.
+    """
+    return write_file(encode_jpeg(frame, quality), path)
+
+
+def load_delta(path: Path) -> np.ndarray:
+    """
+    Reconstruye un fotograma guardado como diferencia (.npz de DeltaEncoder): su
+    keyframe, en la misma carpeta, con las teselas cambiadas encima.
+    """
+    path = Path(path)
+    with np.load(path) as npz:
+        keyframe = str(npz["keyframe"])
+        shape = tuple(int(v) for v in npz["shape"])
+        t = int(npz["tile"])
+        tiles = npz["tiles"]
+        mosaic = npz["mosaic"].tobytes() if "mosaic" in npz.files else None
+    with open_image(path.with_name(keyframe)) as img:
+        frame = np.array(img.convert("RGB"))
+    if frame.shape != shape:
+        raise ValueError(f"El keyframe {keyframe} no coincide con la diferencia {path.name}")
+    if mosaic is not None:
+        with Image.open(io.BytesIO(mosaic)) as img:
+            mosaic = np.asarray(img.convert("RGB"))
+        cols = mosaic.shape[1] // t
+        for i, (ty, tx) in enumerate(tiles):
+            my, mx = divmod(i, cols)
+            target = frame[ty * t:(ty + 1) * t, tx * t:(tx + 1) * t]
+            target[:] = mosaic[my * t:my * t + target.shape[0], mx * t:mx * t + target.shape[1]]
+    return frame
+
+
+def open_image(path: Path, draft_size: Optional[int] = None) -> Image.Image:
+    """
+    Abre una captura con PIL. Los .npy se abren con mmap; con `draft_size` solo se
+    leen las filas y columnas necesarias para ese lado mayor (como draft() en JPEG).
+    Las diferencias (.npz) se reconstruyen a partir de su keyframe.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".npz":
+        return Image.fromarray(load_delta(path))
+    if suffix != ".npy":
+        return Image.open(path)
+    frame = np.load(path, mmap_mode="r")
+    if draft_size:
+        step = max(1, max(frame.shape[:2]) // draft_size)
+        frame = frame[::step, ::step]
+    return Image.fromarray(np.ascontiguousarray(frame))
+
+
+def exposure_fusion(stack: np.ndarray, sigma: float = 0.2, rows_per_chunk: int = 256) -> np.ndarray:
+    """
+    Fusión de exposiciones (Mertens, una escala) de un stack (N, H, W, 3) uint8.
+
+    Cada píxel se pondera por lo bien expuesto que está (cercanía a 0.5 en los tres
+    canales) y por su saturación; los pesos se normalizan entre los N fotogramas.
+    Se procesa por bandas de filas para acotar la memoria en float32 con fotos de 64MP.
+    """
+    if stack.ndim != 4 or stack.shape[-1] != 3:
+        raise ValueError("Se esperaba un stack (N, H, W, 3)")
+
+    n, height, width, _ = stack.shape
+    out = np.empty((height, width, 3), dtype=np.uint8)
+    inv_two_sigma2 = 1.0 / (2.0 * sigma * sigma)
+
+    for y0 in range(0, height, rows_per_chunk):
+        y1 = min(y0 + rows_per_chunk, height)
+        imgs = stack[:, y0:y1].astype(np.float32) * (1.0 / 255.0)  # (N, h, W, 3)
+
+        well_exposed = np.exp(-((imgs - 0.5) ** 2).sum(axis=-1) * inv_two_sigma2)  # (N, h, W)
+        saturation = imgs.std(axis=-1)
+        weights = well_exposed * (saturation + 1e-3)
+        weights /= weights.sum(axis=0, keepdims=True) + 1e-12
+
+        fused = np.einsum("nhw,nhwc->hwc", weights, imgs)
+        np.clip(fused * 255.0 + 0.5, 0, 255, out=fused)
+        out[y0:y1] = fused.astype(np.uint8)
+
+    return out
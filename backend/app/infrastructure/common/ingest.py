@@ -0,0 +1,107 @@
+from __future__ import annotations
+import json
+import logging
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+import numpy as np
+
+from app.infrastructure.common.encoders import DEFAULT_ENCODER, Encoded, EncoderPool, FrameEncoder
+from app.infrastructure.common.imaging import write_file
+from app.infrastructure.common.metrics import MetricsRegistry, capture_phases
+from app.infrastructure.common.pipeline import CapturePipeline
+
+log = logging.getLogger(__name__)
+
+# Etapa de ingesta: recibe (meta, frame) y devuelve los metadatos (ampliados) o None para descartar
+# la foto. También puede devolver (metadatos, encoder) para guardarla de otra forma (p. ej. como
+# diferencia con un keyframe); la extensión de meta["path"] debe ser entonces la de ese encoder.
+IngestStage = Callable[[dict, np.ndarray], Union[dict, tuple[dict, FrameEncoder], None]]
+
+
+class FrameIngest:
+    """
+    Persistencia de un fotograma ya capturado, en los hilos del pipeline:
+    etapas de ingesta (análisis sobre el array en memoria) -> codificación (en `encoders`)
+    -> disco -> listeners.
+    Común a FakeRunner y RaspiRunner; cada fase se mide en `meaplan_capture_phase_seconds`.
+    """
+
+    def __init__(self, pipeline: CapturePipeline, metrics: Optional[MetricsRegistry] = None, encoders: Optional[EncoderPool] = None):
+        self.pipeline = pipeline
+        self.encoders = encoders or EncoderPool(workers=0, metrics=metrics)
+        self._phases = capture_phases(metrics or MetricsRegistry())
+        self._stages: list[IngestStage] = []
+        self._listeners: list[Callable[[dict], None]] = []
+
+    def add_stage(self, stage: IngestStage) -> None:
+        self._stages.append(stage)
+
+    def add_listener(self, listener: Callable[[dict], None]) -> None:
+        self._listeners.append(listener)
+
+    def submit(
+        self,
+        frame: Union[np.ndarray, Callable[[], np.ndarray]],
+        meta: dict,
+        sidecar_path: Optional[Path] = None,
+        sidecar: Optional[dict] = None,
+        encoder: FrameEncoder = DEFAULT_ENCODER,
+    ) -> Future:
+        """
+        Encola la persistencia de `frame`. El Future se resuelve con los metadatos
+        finales (o None si una etapa descartó la foto). `frame` puede ser una función
+        que lo genere: así se calcula en el hilo del pipeline (p. ej. una fusión HDR).
+        Si se indica `sidecar_path` se escribe ahí `sidecar` (por defecto, los metadatos) en JSON.
+        `encoder` decide el formato; la extensión de meta["path"] debe ser la suya.
+        """
+        nbytes = frame.nbytes if isinstance(frame, np.ndarray) else 0
+        return self.pipeline.submit(lambda: self._persist(frame, meta, sidecar_path, sidecar, encoder), nbytes=nbytes)
+
+    def _persist(self, frame, meta: dict, sidecar_path: Optional[Path], sidecar: Optional[dict], encoder: FrameEncoder) -> Optional[dict]:
+        if callable(frame):
+            frame = frame()
+
+        t0 = time.perf_counter()
+        for stage in self._stages:
+            try:
+                result = stage(meta, frame)
+            except Exception:
+                log.exception("Ingest stage failed: %s", meta.get("filename"))
+                continue
+            if result is None:
+                return None
+            if isinstance(result, tuple):
+                result, encoder = result
+            meta = result
+        t1 = time.perf_counter()
+
+        data = self._encode(frame, meta, encoder)
+        t2 = time.perf_counter()
+        meta = {**meta, "size_bytes": write_file(data, Path(meta["path"]))}
+
+        if sidecar_path is not None:
+            payload = meta if sidecar is None else sidecar
+            Path(sidecar_path).write_text(json.dumps(payload, indent=2, default=str), encoding="utf-8")
+        t3 = time.perf_counter()
+
+        self.notify(meta)
+        t4 = time.perf_counter()
+
+        self._phases.observe(t1 - t0, phase="analyze")
+        self._phases.observe(t2 - t1, phase="encode")
+        self._phases.observe(t3 - t2, phase="write")
+        self._phases.observe(t4 - t3, phase="notify")
+        return meta
+
+    def _encode(self, frame: np.ndarray, meta: dict, encoder: FrameEncoder) -> Encoded:
+        return self.encoders.encode(frame, encoder)
+
+    def notify(self, meta: dict) -> None:
+        for listener in self._listeners:
+            try:
+                listener(meta)
+            except Exception:
+                log.exception("Capture listener failed")
@@ -0,0 +1,90 @@
+from __future__ import annotations
+import threading
+import time
+from typing import Hashable, Optional
+
+from app.infrastructure.common.metrics import MetricsRegistry
+
+
+class LightHandle:
+    """
+    Vista de la luz para una cámara, con la misma interfaz que `Light`
+    (turn_on / turn_off). Encender o apagar dos veces seguidas no tiene efecto.
+    """
+
+    def __init__(self, arbiter: "LightArbiter", owner: Hashable):
+        self.arbiter = arbiter
+        self.owner = owner
+
+    def turn_on(self) -> None:
+        self.arbiter.acquire(self.owner)
+
+    def turn_off(self) -> None:
+        self.arbiter.release(self.owner)
+
+    def close(self) -> None:
+        self.arbiter.release(self.owner)
+
+    @property
+    def is_closed(self) -> bool:
+        return self.arbiter.light.is_closed
+
+
+class LightArbiter:
+    """
+    Comparte una única luz (GPIO 17) entre varias cámaras.
+
+    Cada cámara enciende y apaga a través de su `LightHandle`; la luz física está
+    encendida mientras alguna cámara la necesite y solo se apaga cuando la suelta
+    la última. Así una cámara no apaga la luz en mitad de la exposición de otra.
+    """
+
+    def __init__(self, light, metrics: Optional[MetricsRegistry] = None):
+        self.light = light
+        self._lock = threading.Lock()
+        self._holders: set = set()
+        self.switches = 0
+        self.overlaps = 0
+        self._on_since = 0.0
+
+        metrics = metrics or MetricsRegistry()
+        self._on_time = metrics.histogram("meaplan_light_on_seconds", "Tiempo que la luz física pasa encendida cada vez")
+        metrics.counter("meaplan_light_switches_total", "Encendidos de la luz física", fn=lambda: self.switches)
+
+    def handle(self, owner: Hashable) -> LightHandle:
+        return LightHandle(self, owner)
+
+    def acquire(self, owner: Hashable) -> None:
+        with self._lock:
+            if owner in self._holders:
+                return
+            if not self._holders:
+                self.light.turn_on()
+                self.switches += 1
+                self._on_since = time.perf_counter()
+            else:
+                self.overlaps += 1
+            self._holders.add(owner)
+
+    def release(self, owner: Hashable) -> None:
+        with self._lock:
+            if owner not in self._holders:
+                return
+            self._holders.discard(owner)
+            if not self._holders:
+                self.light.turn_off()
+                self._on_time.observe(time.perf_counter() - self._on_since)
+
+    def close(self) -> None:
+        with self._lock:
+            self._holders.clear()
+            self.light.close()
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "on": bool(self._holders),
+                "holders": sorted(str(h) for h in self._holders),
+                "switches": self.switches,
+                "overlaps": self.overlaps,
+            }
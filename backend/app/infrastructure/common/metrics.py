@@ -0,0 +1,200 @@
+from __future__ import annotations
+import bisect
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, Sequence
+
+log = logging.getLogger(__name__)
+
+# Segundos: de una conmutación de GPIO (~ms) a una escritura lenta en la SD
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs: Sequence[tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """
+    Métrica con etiquetas. Con `fn` el valor no se guarda: se lee al exportar
+    (sin coste en el camino de captura). `fn` devuelve un número o, con etiquetas,
+    un dict {valor de etiqueta (o tupla de valores): número}.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), fn: Optional[Callable] = None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+        self._lock = threading.Lock()
+        self._values: dict[tuple, object] = {}
+
+    def _key(self, labels: dict) -> tuple:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"Etiquetas incorrectas para {self.name}: {sorted(labels)} (se esperaba {list(self.labelnames)})")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _pairs(self, key: tuple) -> list[tuple[str, str]]:
+        return list(zip(self.labelnames, key))
+
+    def samples(self) -> Iterator[tuple[str, list, float]]:
+        """
+        (sufijo, etiquetas, valor) de cada serie.
+        """
+        if self.fn is not None:
+            value = self.fn()
+            if not self.labelnames:
+                yield "", [], value
+                return
+            for key, v in value.items():
+                key = key if isinstance(key, tuple) else (key,)
+                yield "", self._pairs(tuple(str(k) for k in key)), v
+            return
+        with self._lock:
+            values = list(self._values.items())
+        for key, v in values:
+            yield "", self._pairs(key), v
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Cuentas por cubeta (la última es +Inf), suma y número de observaciones
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def samples(self) -> Iterator[tuple[str, list, float]]:
+        with self._lock:
+            values = [(key, (list(s[0]), s[1], s[2])) for key, s in self._values.items()]
+        for key, (counts, total, count) in values:
+            pairs = self._pairs(key)
+            cumulative = 0
+            for bound, n in zip((*self.buckets, math.inf), counts):
+                cumulative += n
+                yield "_bucket", pairs + [("le", _format_value(bound))], cumulative
+            yield "_sum", pairs, total
+            yield "_count", pairs, count
+
+
+class MetricsRegistry:
+    """
+    Métricas del proceso en formato de texto de Prometheus.
+
+    Los componentes piden sus métricas por nombre (si ya existe se reutiliza, así
+    varios componentes pueden alimentar la misma). Observar cuesta un bisect y un
+    lock sin contención; los contadores que ya llevan los componentes se exportan
+    con `fn`, leídos solo al exportar.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: dict[str, _Metric] = {}
+
+    def _get(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif type(metric) is not cls:
+                raise ValueError(f"La métrica {name} ya existe como {metric.kind}")
+            elif kwargs.get("fn") is not None:
+                metric.fn = kwargs["fn"]
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = (), fn: Optional[Callable] = None) -> Counter:
+        return self._get(Counter, name, help, labelnames, fn=fn)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = (), fn: Optional[Callable] = None) -> Gauge:
+        return self._get(Gauge, name, help, labelnames, fn=fn)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for m in metrics:
+            try:
+                samples = list(m.samples())
+            except Exception:
+                log.exception("Metric %s failed", m.name)
+                continue
+            lines.append(f"# HELP {m.name} {_escape(m.help)}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            for suffix, pairs, value in samples:
+                lines.append(f"{m.name}{suffix}{_format_labels(pairs)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def capture_phases(registry: MetricsRegistry) -> Histogram:
+    """
+    Histograma de duración por fase de la captura, común a los dos runners:
+    light_on, frame (exposición y lectura del sensor), handoff (meapis), queue,
+    analyze, encode, write, notify y focus_calibration (meapis).
+    """
+    return registry.histogram("meaplan_capture_phase_seconds", "Duración de cada fase de la captura", ("phase",))
+
+
+def capture_failures(registry: MetricsRegistry) -> Counter:
+    return registry.counter("meaplan_capture_failures_total", "Capturas fallidas por origen", ("source",))
+
@@ -0,0 +1,14 @@
+BOUNDARY = "frame"
+MEDIA_TYPE = f"multipart/x-mixed-replace; boundary={BOUNDARY}"
+
+
+def mjpeg_part(jpeg: bytes) -> bytes:
+    """
+    Una parte del stream multipart MJPEG (cabeceras + JPEG).
+    """
+    header = (
+        f"--{BOUNDARY}\r\n"
+        f"Content-Type: image/jpeg\r\n"
+        f"Content-Length: {len(jpeg)}\r\n\r\n"
+    ).encode("ascii")
+    return header + jpeg + b"\r\n"
@@ -0,0 +1,195 @@
+from __future__ import annotations
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Optional
+
+from app.infrastructure.common.metrics import MetricsRegistry, capture_phases
+
+log = logging.getLogger(__name__)
+
+POLICIES = ("block", "drop_oldest", "drop_newest")
+
+
+class FrameDropped(RuntimeError):
+    pass
+
+
+class CapturePipeline:
+    """
+    Etapa de persistencia desacoplada de la captura: la captura entrega un trabajo
+    (codificar + escribir) a una cola acotada y los hilos de escritura la vacían.
+
+    La cola se acota por número de trabajos (`queue_size`) y por los bytes de los
+    fotogramas que retienen (`max_bytes`, 0: sin límite): un fotograma RGB de 64MP son
+    ~190MB, así que con fotos grandes el límite que cuenta es el de memoria. Un trabajo
+    siempre cabe en la cola vacía aunque supere `max_bytes`; los que están en proceso
+    (uno por hilo) no cuentan.
+
+    Política cuando la cola está llena:
+    - block:       la captura espera a que haya hueco (no se pierde nada)
+    - drop_oldest: se descarta el trabajo más antiguo pendiente
+    - drop_newest: se descarta el trabajo nuevo
+    Los trabajos descartados terminan con FrameDropped.
+    """
+
+    def __init__(
+        self,
+        workers: int = 1,
+        queue_size: int = 8,
+        policy: str = "block",
+        name: str = "persist",
+        metrics: Optional[MetricsRegistry] = None,
+        max_bytes: int = 0,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Política desconocida: {policy}")
+        self.policy = policy
+        self.queue_size = queue_size
+        self.max_bytes = max_bytes
+        # Sin maxsize: la admisión (trabajos y bytes) se controla con _space
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._space = threading.Condition(self._lock)
+        self._queued = 0
+        self.queued_bytes = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+
+        metrics = metrics or MetricsRegistry()
+        self._phases = capture_phases(metrics)
+        metrics.gauge("meaplan_pipeline_depth", "Trabajos pendientes en la cola de persistencia", fn=lambda: self.depth)
+        metrics.gauge("meaplan_pipeline_queued_bytes", "Bytes de fotogramas pendientes en la cola de persistencia",
+                      fn=lambda: self.queued_bytes)
+        metrics.counter(
+            "meaplan_pipeline_jobs_total", "Trabajos de persistencia por resultado", ("result",),
+            fn=lambda: {k: v for k, v in self.stats().items() if k in ("completed", "failed", "dropped")},
+        )
+
+        self._workers = [
+            threading.Thread(target=self._run, name=f"{name}-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for t in self._workers:
+            t.start()
+
+    def _drop(self, item) -> None:
+        _, fut, _, _ = item
+        with self._lock:
+            self.dropped += 1
+        fut.set_exception(FrameDropped("Cola de persistencia llena"))
+
+    def _fits(self, nbytes: int) -> bool:
+        # Con el lock tomado
+        if self._queued == 0:
+            return True
+        if self._queued >= self.queue_size:
+            return False
+        return not self.max_bytes or self.queued_bytes + nbytes <= self.max_bytes
+
+    def _take(self, item) -> None:
+        # Con el lock tomado: el trabajo sale de la cola y libera su hueco
+        self._queued -= 1
+        self.queued_bytes -= item[3]
+        self._space.notify_all()
+
+    def submit(self, job: Callable[[], object], nbytes: int = 0) -> Future:
+        """
+        Encola `job` y devuelve un Future con su resultado. `nbytes` es la memoria
+        que retiene mientras espera (el fotograma que va a escribir).
+        """
+        fut: Future = Future()
+        item = (job, fut, time.perf_counter(), nbytes)
+        dropped = []
+        with self._space:
+            self.submitted += 1
+            if self.policy == "block":
+                self._space.wait_for(lambda: self._fits(nbytes))
+            elif self.policy == "drop_newest":
+                if not self._fits(nbytes):
+                    dropped.append(item)
+            else:
+                while not self._fits(nbytes):
+                    try:
+                        old = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    self._queue.task_done()
+                    self._take(old)
+                    dropped.append(old)
+            if not dropped or dropped[0] is not item:
+                self._queued += 1
+                self.queued_bytes += nbytes
+                self._queue.put(item)
+        for d in dropped:
+            self._drop(d)
+        return fut
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                with self._space:
+                    self._take(item)
+                job, fut, queued, _ = item
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                self._phases.observe(time.perf_counter() - queued, phase="queue")
+                try:
+                    result = job()
+                except BaseException as e:
+                    with self._lock:
+                        self.failed += 1
+                    log.exception("Persist job failed")
+                    fut.set_exception(e)
+                else:
+                    with self._lock:
+                        self.completed += 1
+                    fut.set_result(result)
+            finally:
+                self._queue.task_done()
+
+    @property
+    def depth(self) -> int:
+        return self._queued
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "policy": self.policy,
+                "depth": self.depth,
+                "queued_bytes": self.queued_bytes,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "dropped": self.dropped,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Termina los hilos. Con `wait` se escriben antes los trabajos pendientes.
+        """
+        if wait:
+            self._queue.join()
+        else:
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    with self._space:
+                        self._take(item)
+                    self._drop(item)
+                self._queue.task_done()
+        for _ in self._workers:
+            self._queue.put(None)
+        if wait:
+            for t in self._workers:
+                t.join()
@@ -0,0 +1,258 @@
+from __future__ import annotations
+import logging
+import math
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+from app.infrastructure.common.metrics import MetricsRegistry, capture_failures
+
+log = logging.getLogger(__name__)
+
+MISFIRE_POLICIES = ("skip", "coalesce", "catch_up")
+
+
+def parse_misfire(config: dict) -> tuple[str, Optional[float]]:
+    """
+    Política ante disparos tardíos del config.json del proyecto, p. ej.:
+        "misfire": "coalesce", "misfire_grace": 5
+    Devuelve (política, margen en s o None para el de por defecto); ValueError si no es válida.
+    """
+    policy = config.get("misfire", "coalesce")
+    if policy not in MISFIRE_POLICIES:
+        raise ValueError(f"misfire debe ser uno de {', '.join(MISFIRE_POLICIES)}")
+    grace = config.get("misfire_grace")
+    if grace is not None:
+        grace = float(grace)
+        if grace < 0:
+            raise ValueError("misfire_grace debe ser >= 0")
+    return policy, grace
+
+
+class _Job:
+    def __init__(self, job_id: str, func: Callable[[], object], interval: float, misfire: str, grace: float, start: float, history: int, now: float):
+        self.id = job_id
+        self.func = func
+        self.interval = interval
+        self.misfire = misfire
+        self.grace = grace
+        # Rejilla: el disparo n está planificado en anchor + n * interval (reloj monotónico)
+        self.anchor = now + start
+        # Hora de pared equivalente al ancla, solo para informar
+        self.wall_anchor = time.time() + start
+        self.next_slot = 0
+        self.stop = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+        self.fires = 0
+        self.skipped = 0
+        self.coalesced = 0
+        self.caught_up = 0
+        self.failures = 0
+        self.late_sum = 0.0
+        self.late_max = 0.0
+        self.recent: deque[dict] = deque(maxlen=history)
+
+    def planned(self, slot: int) -> float:
+        return self.anchor + slot * self.interval
+
+    def stats(self) -> dict:
+        last = self.recent[-1] if self.recent else None
+        return {
+            "interval": self.interval,
+            "misfire": self.misfire,
+            "grace": self.grace,
+            "next_run": datetime.fromtimestamp(self.wall_anchor + self.next_slot * self.interval, timezone.utc).isoformat(),
+            "fires": self.fires,
+            "skipped": self.skipped,
+            "coalesced": self.coalesced,
+            "caught_up": self.caught_up,
+            "failures": self.failures,
+            "drift": {
+                "last": last["late"] if last else None,
+                "mean": round(self.late_sum / self.fires, 4) if self.fires else None,
+                "max": round(self.late_max, 4),
+            },
+            "recent": list(self.recent),
+        }
+
+
+class CaptureScheduler:
+    """
+    Jobs periódicos anclados a una rejilla fija sobre el reloj monotónico: el disparo n
+    de un job está planificado en inicio + n * interval, así que el retraso de un disparo
+    (una captura lenta, una escritura lenta en la SD) no desplaza los siguientes, y los
+    saltos del reloj de pared (la Raspberry no tiene RTC y lo ajusta por NTP) no le afectan.
+
+    Cada job corre en su propio hilo, con como mucho una ejecución a la vez. Si al
+    terminar una ejecución hay disparos vencidos, o uno llega más de `grace` segundos
+    tarde, se aplica la política del job:
+    - skip:     se descartan los vencidos; solo se dispara el último si aún está dentro de `grace`
+    - coalesce: los vencidos se juntan en un único disparo inmediato
+    - catch_up: se ejecutan todos los vencidos seguidos (como mucho `max_catch_up`; el resto se descarta)
+    Cada disparo se registra con su hora planificada y la real.
+
+    `clock` (segundos, monotónico) y `wait(stop, delay)` (espera hasta `delay` o hasta
+    que se pida parar; True si se pidió parar) permiten sustituir el reloj en las pruebas.
+    """
+
+    def __init__(
+        self,
+        metrics: Optional[MetricsRegistry] = None,
+        max_catch_up: int = 10,
+        history: int = 20,
+        name: str = "scheduler",
+        clock: Callable[[], float] = time.monotonic,
+        wait: Optional[Callable[[threading.Event, float], bool]] = None,
+    ):
+        self.max_catch_up = max_catch_up
+        self.history = history
+        self.name = name
+        self._clock = clock
+        self._wait = wait or (lambda stop, delay: stop.wait(delay))
+        self._lock = threading.Lock()
+        self._jobs: dict[str, _Job] = {}
+
+        metrics = metrics or MetricsRegistry()
+        self._lag = metrics.histogram("meaplan_scheduler_lag_seconds", "Retraso de cada disparo programado respecto a su hora en la rejilla")
+        self._misfires = metrics.counter(
+            "meaplan_scheduler_misfires_total",
+            "Disparos programados que no se hicieron a su hora (skipped: descartados; coalesced: agrupados en uno; caught_up: recuperados tarde)",
+            ("reason",),
+        )
+        self._failures = capture_failures(metrics)
+
+    # --- jobs ---
+    def add(
+        self,
+        job_id: str,
+        func: Callable[[], object],
+        interval: float,
+        misfire: str = "coalesce",
+        grace: Optional[float] = None,
+        start: Optional[float] = None,
+    ) -> None:
+        """
+        Programa `func` cada `interval` segundos; el primer disparo, dentro de `start`
+        segundos (por defecto, un intervalo). Sustituye al job con el mismo id.
+        `grace` por defecto es medio intervalo.
+        """
+        if interval <= 0:
+            raise ValueError("El intervalo debe ser > 0")
+        if misfire not in MISFIRE_POLICIES:
+            raise ValueError(f"Política desconocida: {misfire}")
+        job = _Job(
+            job_id, func, interval, misfire,
+            grace=interval / 2 if grace is None else grace,
+            start=interval if start is None else start,
+            history=self.history,
+            now=self._clock(),
+        )
+        self.remove(job_id)
+        with self._lock:
+            self._jobs[job_id] = job
+        job.thread = threading.Thread(target=self._run, args=(job,), name=f"{self.name}-{job_id}", daemon=True)
+        job.thread.start()
+
+    def remove(self, job_id: str) -> bool:
+        """
+        Quita un job (la ejecución en curso, si la hay, termina). False si no existía.
+        """
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+        if job is None:
+            return False
+        job.stop.set()
+        return True
+
+    def shutdown(self, wait: bool = False, timeout: Optional[float] = None) -> None:
+        with self._lock:
+            jobs = list(self._jobs.values())
+            self._jobs.clear()
+        for job in jobs:
+            job.stop.set()
+        if wait:
+            for job in jobs:
+                if job.thread is not threading.current_thread():
+                    job.thread.join(timeout)
+
+    # --- disparos ---
+    def _due(self, job: _Job, now: float) -> list[int]:
+        """
+        Huecos de la rejilla que hay que disparar ahora según la política
+        (vacío si todavía no toca); descarta el resto de huecos vencidos.
+        """
+        last_due = math.floor((now - job.anchor) / job.interval)
+        if last_due < job.next_slot:
+            return []
+        due = list(range(job.next_slot, last_due + 1))
+        job.next_slot = last_due + 1
+        if len(due) == 1 and now - job.planned(due[0]) <= job.grace:
+            return due
+
+        if job.misfire == "skip":
+            fire = due[-1:] if now - job.planned(due[-1]) <= job.grace else []
+            self._count(job, "skipped", len(due) - len(fire))
+            return fire
+        if job.misfire == "coalesce":
+            self._count(job, "coalesced", len(due) - 1)
+            return due[-1:]
+        fire = due[-self.max_catch_up:]
+        self._count(job, "skipped", len(due) - len(fire))
+        self._count(job, "caught_up", sum(1 for slot in fire if now - job.planned(slot) > job.grace))
+        return fire
+
+    def _count(self, job: _Job, reason: str, n: int) -> None:
+        if n <= 0:
+            return
+        with self._lock:
+            setattr(job, reason, getattr(job, reason) + n)
+        self._misfires.inc(n, reason=reason)
+        log.warning("Job %s: %d run(s) %s (policy %s)", job.id, n, reason, job.misfire)
+
+    def _fire(self, job: _Job, slot: int) -> None:
+        actual = self._clock()
+        late = actual - job.planned(slot)
+        try:
+            job.func()
+            ok = True
+        except Exception:
+            ok = False
+            self._failures.inc(source="scheduled")
+            log.exception("Scheduled job failed: %s", job.id)
+        duration = self._clock() - actual
+
+        planned_wall = job.wall_anchor + slot * job.interval
+        log.info("Job %s slot %d: planned %s, fired %+.3fs late, took %.3fs", job.id, slot,
+                 datetime.fromtimestamp(planned_wall, timezone.utc).isoformat(timespec="milliseconds"), late, duration)
+        self._lag.observe(late)
+        with self._lock:
+            job.fires += 1
+            job.failures += not ok
+            job.late_sum += late
+            job.late_max = max(job.late_max, late)
+            job.recent.append({
+                "slot": slot,
+                "planned": planned_wall,
+                "actual": planned_wall + late,
+                "late": round(late, 4),
+                "duration": round(duration, 4),
+                "ok": ok,
+            })
+
+    def _run(self, job: _Job) -> None:
+        while not job.stop.is_set():
+            delay = job.planned(job.next_slot) - self._clock()
+            if delay > 0 and self._wait(job.stop, delay):
+                return
+            for slot in self._due(job, self._clock()):
+                if job.stop.is_set():
+                    return
+                self._fire(job, slot)
+
+    # --- estado ---
+    def stats(self) -> dict:
+        with self._lock:
+            return {job_id: job.stats() for job_id, job in self._jobs.items()}
@@ -0,0 +1,17 @@
+import json
+from typing import Optional
+
+MEDIA_TYPE = "text/event-stream"
+KEEPALIVE = b": keepalive\n\n"
+
+
+def sse_message(event: str, data: dict, event_id: Optional[int] = None) -> bytes:
+    """
+    Un mensaje Server-Sent Events (id opcional + tipo + datos JSON en una línea).
+    """
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str, separators=(',', ':'))}")
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
@@ -0,0 +1,176 @@
+from __future__ import annotations
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional, Sequence
+
+from app.infrastructure.common.metrics import MetricsRegistry
+
+log = logging.getLogger(__name__)
+
+# Hora de importación de este módulo: inicio del proceso si no se puede leer de /proc
+_IMPORTED_AT = time.time()
+
+
+def _process_start() -> float:
+    """
+    Hora (epoch) a la que arrancó el proceso, de /proc (Linux); si no, la de importación.
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            # El campo 22 (starttime) va tras el nombre del ejecutable, que puede tener espacios
+            fields = f.read().rsplit(")", 1)[1].split()
+        start_ticks = int(fields[19])
+        with open("/proc/stat") as f:
+            btime = next(int(line.split()[1]) for line in f if line.startswith("btime"))
+        return btime + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration):
+        return _IMPORTED_AT
+
+
+def _uptime() -> Optional[float]:
+    """
+    Segundos desde que arrancó el sistema (None si no se puede leer /proc/uptime).
+    """
+    try:
+        with open("/proc/uptime") as f:
+            return float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class Startup:
+    """
+    Arranque por fases: la API responde en cuanto termina lo imprescindible y el
+    resto (imports de picamera2/libcamera, GPIO, cámaras, calibración de los proyectos
+    que arrancan solos) sigue en un hilo en segundo plano. `phases` son las fases
+    previstas, en orden, para poder informar de las pendientes.
+
+    Hitos medidos desde el inicio del proceso: serving (la API acepta peticiones),
+    ready (todas las fases terminadas) y first_request; con /proc/uptime, también
+    desde el arranque del sistema (arranque en frío de la Raspberry hasta la primera petición).
+    """
+
+    def __init__(self, phases: Sequence[str] = (), metrics: Optional[MetricsRegistry] = None):
+        self._lock = threading.Lock()
+        self.process_started = _process_start()
+        uptime = _uptime()
+        self._boot = time.time() - uptime if uptime is not None else None
+        self._phases: dict[str, dict] = {name: {"name": name, "state": "pending"} for name in phases}
+        self.milestones: dict[str, float] = {}
+        self.error: Optional[str] = None
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        metrics = metrics or MetricsRegistry()
+        metrics.gauge(
+            "meaplan_startup_phase_seconds", "Duración de cada fase del arranque", ("phase",),
+            fn=lambda: {p["name"]: p["duration"] for p in self.status()["phases"] if "duration" in p},
+        )
+        metrics.gauge(
+            "meaplan_startup_seconds", "Segundos desde el inicio del proceso hasta cada hito del arranque", ("milestone",),
+            fn=lambda: self.status()["timings"]["process"],
+        )
+        metrics.gauge("meaplan_ready", "1 si el arranque ha terminado", fn=lambda: int(self.ready))
+
+    # --- fases ---
+    @contextmanager
+    def phase(self, name: str):
+        with self._lock:
+            entry = self._phases.setdefault(name, {"name": name})
+            entry.update({"state": "running", "started": time.time()})
+        t0 = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            with self._lock:
+                entry.update({"state": "failed", "duration": round(time.perf_counter() - t0, 4), "error": str(e) or type(e).__name__})
+            log.exception("Startup phase failed: %s", name)
+            raise
+        with self._lock:
+            entry.update({"state": "done", "duration": round(time.perf_counter() - t0, 4)})
+        log.info("Startup phase %s: %.3fs", name, entry["duration"])
+
+    def mark(self, milestone: str) -> None:
+        """
+        Registra un hito (la primera vez que ocurre).
+        """
+        with self._lock:
+            if milestone in self.milestones:
+                return
+            self.milestones[milestone] = time.time()
+        log.info("Startup %s after %.3fs", milestone, self.milestones[milestone] - self.process_started)
+
+    def run_background(self, stages: Callable[[], None], name: str = "startup") -> None:
+        """
+        Ejecuta `stages` (que abre sus fases con `phase`) en un hilo; al terminar marca ready.
+        """
+        def target():
+            try:
+                stages()
+            except BaseException as e:
+                self.error = str(e) or type(e).__name__
+            else:
+                self.mark("ready")
+            finally:
+                self._done.set()
+
+        self._thread = threading.Thread(target=target, name=name, daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Espera a que termine el arranque en segundo plano. False si sigue en curso.
+        """
+        return self._done.wait(timeout)
+
+    # --- estado ---
+    @property
+    def ready(self) -> bool:
+        return "ready" in self.milestones
+
+    @property
+    def current(self) -> Optional[str]:
+        """
+        Fase en curso (o la primera pendiente).
+        """
+        with self._lock:
+            phases = list(self._phases.values())
+        for state in ("running", "pending"):
+            for p in phases:
+                if p["state"] == state:
+                    return p["name"]
+        return None
+
+    def status(self) -> dict:
+        with self._lock:
+            phases = [dict(p) for p in self._phases.values()]
+            milestones = dict(self.milestones)
+        timings = {
+            "process": {m: round(t - self.process_started, 4) for m, t in milestones.items()},
+            "boot": {m: round(t - self._boot, 4) for m, t in milestones.items()} if self._boot is not None else None,
+        }
+        state = "ready" if "ready" in milestones else ("failed" if self.error is not None else "starting")
+        return {"state": state, "ready": state == "ready", "error": self.error, "phases": phases, "timings": timings}
+
+
+class FirstRequestMiddleware:
+    """
+    Middleware ASGI que marca el hito first_request en la primera petición HTTP;
+    después solo comprueba un booleano.
+    """
+
+    def __init__(self, app, startup: Callable[[], Optional[Startup]]):
+        self.app = app
+        self.startup = startup
+        self._seen = False
+
+    async def __call__(self, scope, receive, send):
+        if not self._seen and scope["type"] == "http":
+            startup = self.startup()
+            if startup is not None:
+                self._seen = True
+                startup.mark("first_request")
+        await self.app(scope, receive, send)
@@ -0,0 +1,609 @@
+from __future__ import annotations
+import base64
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS captures (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    project     TEXT    NOT NULL,
+    ts          REAL    NOT NULL,
+    filename    TEXT    NOT NULL,
+    path        TEXT    NOT NULL,
+    camera      TEXT,
+    size_bytes  INTEGER,
+    metadata    TEXT,
+    UNIQUE (project, filename)
+);
+CREATE INDEX IF NOT EXISTS idx_captures_project_ts ON captures (project, ts, id);
+
+-- Estadísticas por captura (se conservan aunque se reconstruya `captures`)
+CREATE TABLE IF NOT EXISTS capture_stats (
+    project          TEXT NOT NULL,
+    filename         TEXT NOT NULL,
+    mean_luminosity  REAL,
+    green_index      REAL,
+    histogram        TEXT,
+    PRIMARY KEY (project, filename)
+);
+
+-- Agregados por intervalos de 1 min / 1 h / 1 día, mantenidos al registrar cada captura
+CREATE TABLE IF NOT EXISTS series (
+    project  TEXT    NOT NULL,
+    metric   TEXT    NOT NULL,
+    level    INTEGER NOT NULL,
+    start    REAL    NOT NULL,
+    count    INTEGER NOT NULL,
+    sum      REAL    NOT NULL,
+    min      REAL    NOT NULL,
+    max      REAL    NOT NULL,
+    PRIMARY KEY (project, metric, level, start)
+);
+
+-- Espacio en disco por proyecto (originales), mantenido por triggers en cada alta/baja/cambio
+CREATE TABLE IF NOT EXISTS usage (
+    project  TEXT    PRIMARY KEY,
+    files    INTEGER NOT NULL,
+    bytes    INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS usage_insert AFTER INSERT ON captures BEGIN
+    INSERT INTO usage (project, files, bytes) VALUES (NEW.project, 1, COALESCE(NEW.size_bytes, 0))
+    ON CONFLICT (project) DO UPDATE SET files = files + 1, bytes = bytes + excluded.bytes;
+END;
+CREATE TRIGGER IF NOT EXISTS usage_delete AFTER DELETE ON captures BEGIN
+    UPDATE usage SET files = files - 1, bytes = bytes - COALESCE(OLD.size_bytes, 0) WHERE project = OLD.project;
+END;
+CREATE TRIGGER IF NOT EXISTS usage_update AFTER UPDATE OF size_bytes ON captures BEGIN
+    UPDATE usage SET bytes = bytes - COALESCE(OLD.size_bytes, 0) + COALESCE(NEW.size_bytes, 0) WHERE project = NEW.project;
+END;
+
+-- Hasta dónde ha llegado la retención de cada proyecto (cursor keyset) y nº de capturas envejecidas
+CREATE TABLE IF NOT EXISTS retention (
+    project  TEXT    PRIMARY KEY,
+    cursor   TEXT,
+    seq      INTEGER NOT NULL
+);
+
+-- Deltas de dedup por keyframe, y keyframes cuyo borrado o reducción (action) la retención
+-- aplaza mientras algún delta los use
+CREATE INDEX IF NOT EXISTS idx_captures_keyframe ON captures (project, json_extract(metadata, '$.dedup.keyframe'));
+CREATE TABLE IF NOT EXISTS retention_held (
+    project   TEXT NOT NULL,
+    filename  TEXT NOT NULL,
+    action    TEXT NOT NULL,
+    PRIMARY KEY (project, filename)
+);
+"""
+
+# Campos del registro que tienen columna propia; el resto va a `metadata` (JSON)
+_COLUMNS = ("project", "filename", "path", "camera", "timestamp_utc", "size_bytes")
+
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+SERIES_METRICS = ("mean_luminosity", "green_index")
+SERIES_LEVELS = (60, 3600, 86400)
+# Intervalos "redondos" para elegir el tamaño de bucket si no se indica
+_SERIES_BUCKETS = (60, 300, 900, 3600, 3 * 3600, 6 * 3600, 86400, 7 * 86400, 30 * 86400)
+SERIES_MAX_POINTS = 500
+
+_SELECT_CAPTURES = (
+    "SELECT c.*, s.mean_luminosity, s.green_index, s.histogram FROM captures c "
+    "LEFT JOIN capture_stats s ON s.project = c.project AND s.filename = c.filename"
+)
+
+
+def parse_timestamp(value) -> float:
+    """
+    Convierte un timestamp de captura a epoch (segundos, UTC).
+    Acepta epoch numérico, `datetime` o el formato `YYYYmmdd_HHMMSS` de los runners.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return datetime.strptime(value, TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc).timestamp()
+
+
+def encode_cursor(ts: float, capture_id: int) -> str:
+    raw = f"{ts!r}:{capture_id}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[float, int]:
+    """
+    Lanza ValueError si el cursor no es válido.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts, capture_id = base64.urlsafe_b64decode(padded).decode("ascii").split(":")
+        return float(ts), int(capture_id)
+    except Exception as e:
+        raise ValueError("Cursor inválido") from e
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    # WAL: lecturas concurrentes mientras el scheduler escribe; NORMAL basta en SD
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    # INSERT OR REPLACE borra la fila anterior: así también la descuentan los triggers de `usage`
+    conn.execute("PRAGMA recursive_triggers=ON")
+    return conn
+
+_INSERT_STATS = (
+    "INSERT OR REPLACE INTO capture_stats (project, filename, mean_luminosity, green_index, histogram) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+
+
+class CaptureCatalog:
+    """
+    Catálogo de capturas en SQLite. Permite consultar las capturas de un proyecto
+    por rango de fechas sin recorrer el sistema de ficheros.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        has_usage = self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'usage'").fetchone() is not None
+        self._conn.executescript(_SCHEMA)
+        if not has_usage:
+            # Catálogo anterior a los triggers: se calcula el espacio una sola vez
+            self._conn.execute(
+                "INSERT INTO usage (project, files, bytes) "
+                "SELECT project, COUNT(*), COALESCE(SUM(size_bytes), 0) FROM captures GROUP BY project"
+            )
+
+    # --- helpers ---
+    @staticmethod
+    def _extra(meta: dict) -> dict:
+        """
+        Metadatos sin columna propia, a un solo nivel: los de la cámara ("metadata" de
+        los runners) junto a los del pipeline (dedup, merged_from...).
+        """
+        extra = dict(meta.get("metadata") or {})
+        extra.update((k, v) for k, v in meta.items() if k not in _COLUMNS and k not in ("analytics", "metadata"))
+        return extra
+
+    @staticmethod
+    def _to_row(meta: dict) -> tuple:
+        extra = CaptureCatalog._extra(meta)
+        camera = meta.get("camera")
+        return (
+            meta["project"],
+            parse_timestamp(meta["timestamp_utc"]),
+            meta["filename"],
+            str(meta["path"]),
+            str(camera) if camera is not None else None,
+            meta.get("size_bytes"),
+            json.dumps(extra, default=str) if extra else None,
+        )
+
+    @staticmethod
+    def _to_item(row: sqlite3.Row) -> dict:
+        item = {
+            "id": row["id"],
+            "project": row["project"],
+            "filename": row["filename"],
+            "path": row["path"],
+            "camera": row["camera"],
+            "size_bytes": row["size_bytes"],
+            "timestamp": datetime.fromtimestamp(row["ts"], tz=timezone.utc).isoformat(),
+        }
+        if row["metadata"]:
+            # Filas anteriores guardaban los metadatos de la cámara anidados en "metadata"
+            item["metadata"] = CaptureCatalog._extra(json.loads(row["metadata"]))
+        if row["mean_luminosity"] is not None:
+            item["analytics"] = {
+                "mean_luminosity": row["mean_luminosity"],
+                "green_index": row["green_index"],
+                "histogram": json.loads(row["histogram"]) if row["histogram"] else None,
+            }
+        return item
+
+    @staticmethod
+    def _stats_row(meta: dict) -> tuple:
+        analytics = meta["analytics"]
+        histogram = analytics.get("histogram")
+        return (
+            meta["project"],
+            meta["filename"],
+            analytics.get("mean_luminosity"),
+            analytics.get("green_index"),
+            json.dumps(histogram) if histogram is not None else None,
+        )
+
+    def _record_stats(self, meta: dict, ts: float, replaced: bool) -> None:
+        """
+        Guarda las estadísticas de la captura y actualiza los agregados.
+        Debe llamarse con el lock tomado y dentro de una transacción.
+        """
+        analytics = meta["analytics"]
+        self._conn.execute(_INSERT_STATS, self._stats_row(meta))
+        if replaced:
+            # La captura ya existía: se recalculan sus buckets para no contarla dos veces
+            for level in SERIES_LEVELS:
+                start = ts - ts % level
+                self._rebuild_series(meta["project"], level, start, start + level)
+            return
+
+        for metric in SERIES_METRICS:
+            value = analytics.get(metric)
+            if value is None:
+                continue
+            self._conn.executemany(
+                "INSERT INTO series (project, metric, level, start, count, sum, min, max) "
+                "VALUES (?, ?, ?, ?, 1, ?, ?, ?) "
+                "ON CONFLICT (project, metric, level, start) DO UPDATE SET "
+                "count = count + 1, sum = sum + excluded.sum, "
+                "min = MIN(min, excluded.min), max = MAX(max, excluded.max)",
+                [(meta["project"], metric, level, ts - ts % level, value, value, value) for level in SERIES_LEVELS],
+            )
+
+    def _rebuild_series(self, project: str, level: Optional[int] = None, start: Optional[float] = None, end: Optional[float] = None) -> None:
+        """
+        Recalcula los agregados de un proyecto (o de un nivel y rango) a partir de capture_stats.
+        Debe llamarse con el lock tomado y dentro de una transacción.
+        """
+        levels = SERIES_LEVELS if level is None else (level,)
+        where = "c.project = ?"
+        params: list = [project]
+        if start is not None:
+            where += " AND c.ts >= ? AND c.ts < ?"
+            params.extend((start, end))
+
+        for lvl in levels:
+            delete = "DELETE FROM series WHERE project = ? AND level = ?"
+            delete_params: list = [project, lvl]
+            if start is not None:
+                delete += " AND start >= ? AND start < ?"
+                delete_params.extend((start, end))
+            self._conn.execute(delete, delete_params)
+
+            for metric in SERIES_METRICS:
+                self._conn.execute(
+                    "INSERT INTO series (project, metric, level, start, count, sum, min, max) "
+                    f"SELECT c.project, ?, ?, c.ts - (c.ts % ?) AS b, COUNT(s.{metric}), SUM(s.{metric}), "
+                    f"MIN(s.{metric}), MAX(s.{metric}) "
+                    "FROM captures c JOIN capture_stats s ON s.project = c.project AND s.filename = c.filename "
+                    f"WHERE {where} AND s.{metric} IS NOT NULL GROUP BY b",
+                    [metric, lvl, lvl, *params],
+                )
+
+    # --- escritura ---
+    def record(self, meta: dict) -> int:
+        """
+        Registra una captura (dict de metadatos devuelto por `capture_now`).
+        """
+        row = self._to_row(meta)
+        with self._lock:
+            if "analytics" not in meta:
+                cur = self._conn.execute(
+                    "INSERT OR REPLACE INTO captures "
+                    "(project, ts, filename, path, camera, size_bytes, metadata) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    row,
+                )
+                return cur.lastrowid
+
+            self._conn.execute("BEGIN")
+            try:
+                replaced = self._conn.execute(
+                    "SELECT 1 FROM capture_stats WHERE project = ? AND filename = ?",
+                    (meta["project"], meta["filename"]),
+                ).fetchone() is not None
+                cur = self._conn.execute(
+                    "INSERT OR REPLACE INTO captures "
+                    "(project, ts, filename, path, camera, size_bytes, metadata) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    row,
+                )
+                self._record_stats(meta, row[1], replaced)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return cur.lastrowid
+
+    def record_many(self, metas: Iterable[dict], replace_project: Optional[str] = None, clear_all: bool = False) -> int:
+        """
+        Inserción masiva en una sola transacción (usado por el rebuild).
+        Si se indica `replace_project` (o `clear_all`) se borran antes las filas existentes.
+        Las estadísticas de capture_stats se conservan y los agregados se recalculan.
+        """
+        metas = list(metas)
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                if clear_all:
+                    self._conn.execute("DELETE FROM captures")
+                elif replace_project is not None:
+                    self._conn.execute("DELETE FROM captures WHERE project = ?", (replace_project,))
+                cur = self._conn.executemany(
+                    "INSERT OR REPLACE INTO captures "
+                    "(project, ts, filename, path, camera, size_bytes, metadata) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (self._to_row(m) for m in metas),
+                )
+                count = cur.rowcount
+                self._conn.executemany(
+                    _INSERT_STATS,
+                    (self._stats_row(m) for m in metas if isinstance(m.get("analytics"), dict)),
+                )
+                if clear_all:
+                    self._conn.execute("DELETE FROM series")
+                    projects = {r[0] for r in self._conn.execute("SELECT DISTINCT project FROM captures")}
+                else:
+                    projects = {m["project"] for m in metas}
+                    if replace_project is not None:
+                        projects.add(replace_project)
+                for project in projects:
+                    self._rebuild_series(project)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return count
+
+    # --- lectura ---
+    @staticmethod
+    def _range_where(project: str, start: Optional[datetime], end: Optional[datetime]) -> tuple[str, list]:
+        sql = "WHERE c.project = ?"
+        params: list = [project]
+        if start is not None:
+            sql += " AND c.ts >= ?"
+            params.append(parse_timestamp(start))
+        if end is not None:
+            sql += " AND c.ts < ?"
+            params.append(parse_timestamp(end))
+        return sql, params
+
+    def query(
+        self,
+        project: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+    ) -> tuple[list[dict], Optional[str]]:
+        """
+        Capturas de un proyecto ordenadas por fecha, paginadas por keyset (ts, id).
+        Devuelve (items, next_cursor); next_cursor es None en la última página.
+        """
+        where, params = self._range_where(project, start, end)
+        sql = f"{_SELECT_CAPTURES} {where}"
+        if cursor:
+            ts, capture_id = decode_cursor(cursor)
+            sql += " AND (c.ts, c.id) > (?, ?)"
+            params.extend((ts, capture_id))
+        sql += " ORDER BY c.ts, c.id LIMIT ?"
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(last["ts"], last["id"])
+
+        return [self._to_item(r) for r in rows], next_cursor
+
+    def iter_range(
+        self,
+        project: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        batch: int = 500,
+        cursor: Optional[str] = None,
+    ) -> Iterator[dict]:
+        """
+        Recorre todas las capturas del rango por lotes (keyset), con memoria acotada.
+        Con `cursor` se empieza después de esa captura.
+        """
+        while True:
+            items, cursor = self.query(project, start=start, end=end, cursor=cursor, limit=batch)
+            yield from items
+            if cursor is None:
+                return
+
+    def range_signature(
+        self,
+        project: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> tuple[int, int]:
+        """
+        (número de capturas, id máximo) del rango: cambia si se añaden o borran capturas.
+        """
+        where, params = self._range_where(project, start, end)
+        sql = f"SELECT COUNT(*), COALESCE(MAX(c.id), 0) FROM captures c {where}"
+        with self._lock:
+            count, max_id = self._conn.execute(sql, params).fetchone()
+        return count, max_id
+
+    def cursor_for(self, project: str, filename: str) -> Optional[str]:
+        """
+        Cursor keyset de una captura: para seguir justo después de ella.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT ts, id FROM captures WHERE project = ? AND filename = ?", (project, filename)
+            ).fetchone()
+        return encode_cursor(row["ts"], row["id"]) if row else None
+
+    def get(self, project: str, filename: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                f"{_SELECT_CAPTURES} WHERE c.project = ? AND c.filename = ?", (project, filename)
+            ).fetchone()
+        return self._to_item(row) if row else None
+
+    def series(
+        self,
+        project: str,
+        metric: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        bucket: Optional[int] = None,
+    ) -> tuple[int, list[dict]]:
+        """
+        Serie temporal de `metric` agregada en intervalos de `bucket` segundos.
+        Si no se indica `bucket` se elige uno para no pasar de SERIES_MAX_POINTS puntos.
+        Se lee del mayor nivel precalculado que divide al bucket; si ninguno lo divide
+        se agrega directamente desde las capturas. Devuelve (bucket, puntos).
+        """
+        if metric not in SERIES_METRICS:
+            raise ValueError(f"Métrica desconocida: {metric}")
+        if bucket is not None and bucket < 1:
+            raise ValueError("bucket debe ser >= 1")
+
+        lo = parse_timestamp(start) if start is not None else None
+        hi = parse_timestamp(end) if end is not None else None
+
+        with self._lock:
+            if bucket is None:
+                first, last = self._conn.execute(
+                    "SELECT MIN(start), MAX(start) FROM series WHERE project = ? AND metric = ? AND level = ?",
+                    (project, metric, SERIES_LEVELS[0]),
+                ).fetchone()
+                span = ((hi if hi is not None else (last or 0)) - (lo if lo is not None else (first or 0)))
+                bucket = next((b for b in _SERIES_BUCKETS if span / b <= SERIES_MAX_POINTS), _SERIES_BUCKETS[-1])
+
+            level = max((lvl for lvl in SERIES_LEVELS if bucket % lvl == 0), default=None)
+            if level is not None:
+                sql = (
+                    "SELECT start - (start % ?) AS b, SUM(count), SUM(sum), MIN(min), MAX(max) FROM series "
+                    "WHERE project = ? AND metric = ? AND level = ?"
+                )
+                params: list = [bucket, project, metric, level]
+                col = "start"
+            else:
+                sql = (
+                    f"SELECT c.ts - (c.ts % ?) AS b, COUNT(s.{metric}), SUM(s.{metric}), MIN(s.{metric}), MAX(s.{metric}) "
+                    "FROM captures c JOIN capture_stats s ON s.project = c.project AND s.filename = c.filename "
+                    f"WHERE c.project = ? AND s.{metric} IS NOT NULL"
+                )
+                params = [bucket, project]
+                col = "c.ts"
+            if lo is not None:
+                sql += f" AND {col} >= ?"
+                params.append(lo - lo % bucket)
+            if hi is not None:
+                sql += f" AND {col} < ?"
+                params.append(hi)
+            sql += " GROUP BY b ORDER BY b"
+            rows = self._conn.execute(sql, params).fetchall()
+
+        points = [
+            {
+                "t": datetime.fromtimestamp(b, tz=timezone.utc).isoformat(),
+                "count": count,
+                "mean": total / count,
+                "min": vmin,
+                "max": vmax,
+            }
+            for b, count, total, vmin, vmax in rows
+            if count
+        ]
+        return bucket, points
+
+    def usage(self) -> dict[str, dict]:
+        """
+        Espacio de los originales por proyecto, sin recorrer el disco: {proyecto: {files, bytes}}.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT project, files, bytes FROM usage WHERE files > 0").fetchall()
+        return {r["project"]: {"files": r["files"], "bytes": r["bytes"]} for r in rows}
+
+    # --- retención ---
+    def delete(self, project: str, filename: str) -> None:
+        """
+        Quita una captura del catálogo. Sus estadísticas y agregados se conservan.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM captures WHERE project = ? AND filename = ?", (project, filename))
+
+    def update_size(self, project: str, filename: str, size_bytes: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE captures SET size_bytes = ? WHERE project = ? AND filename = ?",
+                (size_bytes, project, filename),
+            )
+
+    def retention_state(self, project: str) -> tuple[Optional[str], int]:
+        """
+        (cursor, seq) de la retención del proyecto: la última captura ya tratada y cuántas van.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT cursor, seq FROM retention WHERE project = ?", (project,)).fetchone()
+        return (row["cursor"], row["seq"]) if row else (None, 0)
+
+    def aged(self, project: str, before: datetime, cursor: Optional[str] = None, limit: int = 100) -> list[tuple[str, dict]]:
+        """
+        Capturas anteriores a `before` a partir de `cursor`, en orden, cada una con su cursor.
+        """
+        where, params = self._range_where(project, None, before)
+        sql = f"{_SELECT_CAPTURES} {where}"
+        if cursor:
+            ts, capture_id = decode_cursor(cursor)
+            sql += " AND (c.ts, c.id) > (?, ?)"
+            params.extend((ts, capture_id))
+        sql += " ORDER BY c.ts, c.id LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [(encode_cursor(r["ts"], r["id"]), self._to_item(r)) for r in rows]
+
+    def set_retention_state(self, project: str, cursor: Optional[str], seq: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO retention (project, cursor, seq) VALUES (?, ?, ?)",
+                (project, cursor, seq),
+            )
+
+    def keyframe_users(self, project: str, keyframe: str) -> int:
+        """
+        Capturas guardadas como diferencia con `keyframe`.
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM captures WHERE project = ? AND json_extract(metadata, '$.dedup.keyframe') = ?",
+                (project, keyframe),
+            ).fetchone()[0]
+
+    def hold(self, project: str, filename: str, action: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO retention_held (project, filename, action) VALUES (?, ?, ?)",
+                (project, filename, action),
+            )
+
+    def take_held(self, project: str, filename: str) -> Optional[str]:
+        """
+        Acción aplazada de una captura (y la olvida); None si no había ninguna.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT action FROM retention_held WHERE project = ? AND filename = ?", (project, filename)
+            ).fetchone()
+            self._conn.execute("DELETE FROM retention_held WHERE project = ? AND filename = ?", (project, filename))
+        return row["action"] if row else None
+
+    def count(self, project: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM captures WHERE project = ?", (project,)).fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,254 @@
+from __future__ import annotations
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+
+from app.infrastructure.common.encoders import DeltaEncoder
+from app.infrastructure.common.metrics import MetricsRegistry
+from app.infrastructure.projects_fs import ProjectRegistry
+
+log = logging.getLogger(__name__)
+
+DEDUP_KEY = "dedup"
+MODES = ("skip", "keep_every", "delta")
+
+# Miniatura en gris con la que se comparan las fotos (alto, ancho)
+THUMB_SIZE = (48, 64)
+# Bits del dHash cuyas celdas vecinas difieren menos que esto (0-255) no cuentan:
+# en zonas planas (noches, fondo) el signo de la diferencia es solo ruido del sensor
+HASH_MARGIN = 2.0
+
+ACTIONS = ("stored", "keyframe", "delta", "skipped")
+
+
+def parse_dedup(config: dict) -> Optional[dict]:
+    """
+    Política de fotos casi repetidas del config.json del proyecto, p. ej.:
+        "dedup": {"mode": "delta", "max_distance": 4, "max_diff": 2.0, "keyframe_every": 30}
+    - mode: skip (no se guardan), keep_every (se guarda una de cada `keep_every` seguidas)
+      o delta (se guardan como diferencia con el último keyframe)
+    - max_diff: diferencia media (0-255) entre las miniaturas en gris; es el criterio
+      principal (el ruido del sensor da ~0.3-0.8, un cambio de luz o de crecimiento > 5)
+    - max_distance: bits distintos del dHash de 64 bits, contando solo los que tienen
+      contraste en las dos fotos (ver HASH_MARGIN); descarta cambios de estructura
+      que apenas mueven la media, como una planta desplazada
+    - keep_every: en keep_every, una de cada N fotos repetidas seguidas
+    - keyframe_every: en delta, diferencias seguidas antes de guardar otro keyframe completo
+    - tile, tile_threshold: en delta, tamaño de tesela (px, múltiplo de 16) y cambio de su
+      color medio (0-255) a partir del cual se guarda la tesela en vez de tomarla del keyframe
+    Devuelve None si el proyecto no tiene política; ValueError si no es válida.
+    """
+    raw = config.get(DEDUP_KEY)
+    if raw is None:
+        return None
+    if not isinstance(raw, dict):
+        raise ValueError("dedup debe ser un objeto")
+
+    policy = {
+        "mode": raw.get("mode", "skip"),
+        "max_distance": int(raw.get("max_distance", 4)),
+        "max_diff": float(raw.get("max_diff", 2.0)),
+        "keep_every": int(raw.get("keep_every", 6)),
+        "keyframe_every": int(raw.get("keyframe_every", 30)),
+        "tile": int(raw.get("tile", 64)),
+        "tile_threshold": float(raw.get("tile_threshold", 3.0)),
+    }
+    if policy["mode"] not in MODES:
+        raise ValueError(f"dedup.mode debe ser uno de {', '.join(MODES)}")
+    if not 0 <= policy["max_distance"] <= 64:
+        raise ValueError("dedup.max_distance debe estar entre 0 y 64")
+    if policy["max_diff"] < 0:
+        raise ValueError("dedup.max_diff debe ser >= 0")
+    if policy["keep_every"] < 1 or policy["keyframe_every"] < 1:
+        raise ValueError("dedup.keep_every y dedup.keyframe_every deben ser >= 1")
+    if policy["tile"] < 16 or policy["tile"] % 16:
+        raise ValueError("dedup.tile debe ser un múltiplo de 16")
+    if policy["tile_threshold"] < 0:
+        raise ValueError("dedup.tile_threshold debe ser >= 0")
+    return policy
+
+
+def signature(frame: np.ndarray) -> tuple[int, int, np.ndarray]:
+    """
+    (dHash de 64 bits, máscara de sus bits fiables, miniatura THUMB_SIZE en gris float32)
+    de una foto RGB uint8. Se calcula sobre una muestra con saltos de ~4x4 píxeles por
+    celda de la miniatura: con 64MP se leen unos 50.000 píxeles.
+    """
+    th, tw = THUMB_SIZE
+    height, width = frame.shape[:2]
+    step = max(1, min(height // th, width // tw) // 4)
+    sample = frame[::step, ::step, :3].astype(np.uint16)
+    lum = ((77 * sample[..., 0] + 150 * sample[..., 1] + 29 * sample[..., 2]) >> 8).astype(np.float32)
+
+    bh, bw = lum.shape[0] // th, lum.shape[1] // tw
+    thumb = lum[:bh * th, :bw * tw].reshape(th, bh, tw, bw).mean(axis=(1, 3))
+
+    # dHash: 8 filas x 9 columnas de la miniatura, cada bit = ¿más claro que el vecino izquierdo?
+    small = thumb[:, :63].reshape(8, th // 8, 9, 7).mean(axis=(1, 3))
+    grad = small[:, 1:] - small[:, :-1]
+    bits = np.packbits(grad > 0)
+    mask = np.packbits(np.abs(grad) >= HASH_MARGIN)
+    return int.from_bytes(bits.tobytes(), "big"), int.from_bytes(mask.tobytes(), "big"), thumb
+
+
+class DedupStage:
+    """
+    Etapa de ingesta que detecta fotos casi idénticas a la última guardada del
+    proyecto (noches, cámaras selladas) comparando su dHash y la diferencia media
+    de sus miniaturas, y aplica la política "dedup" del config.json del proyecto
+    (ver `parse_dedup`). Proyectos sin política no se tocan; las fusiones HDR tampoco.
+
+    En modo delta, la foto de referencia es el último keyframe, que se guarda entero
+    y se conserva en memoria (una foto de 64MP son ~200MB por proyecto). Las
+    diferencias se reconstruyen al servirlas (`imaging.open_image`). Un keyframe nuevo
+    solo pasa a ser la referencia cuando `on_capture` confirma que está escrito: si su
+    escritura falla, o si con varios hilos de pipeline una foto posterior se guarda
+    antes, las diferencias siguen apuntando al keyframe anterior, que ya está en disco.
+    Mientras tanto se guarda en `_pending` (otros ~200MB).
+
+    El ahorro se estima con el tamaño medio de las fotos completas del proyecto:
+    una foto descartada ahorra esa media y una diferencia, la media menos lo que ocupa.
+    Al arrancar, la primera foto de cada proyecto se guarda siempre entera.
+    """
+
+    def __init__(self, registry: ProjectRegistry, metrics: Optional[MetricsRegistry] = None):
+        self.registry = registry
+        self._lock = threading.Lock()
+        # proyecto -> referencia: hash, miniatura, repetidas seguidas y, en delta, el keyframe
+        self._refs: dict[str, dict] = {}
+        # proyecto -> keyframe pendiente de escribirse (referencia candidata)
+        self._pending: dict[str, dict] = {}
+        self._stats: dict[str, dict] = {}
+
+        metrics = metrics or MetricsRegistry()
+        metrics.counter(
+            "meaplan_dedup_frames_total", "Fotos por decisión de la etapa dedup", ("project", "action"),
+            fn=lambda: {(p, a): s[a] for p, s in self.stats().items() for a in ACTIONS},
+        )
+        metrics.counter(
+            "meaplan_dedup_bytes_saved_total", "Bytes ahorrados (estimados) por la etapa dedup", ("project",),
+            fn=lambda: {p: s["bytes_saved"] for p, s in self.stats().items()},
+        )
+
+    def _policy(self, project: str) -> Optional[dict]:
+        config = self.registry.get(project)
+        if config is None:
+            return None
+        try:
+            return parse_dedup(config)
+        except (TypeError, ValueError) as e:
+            log.warning("Invalid dedup policy in %s: %s", project, e)
+            return None
+
+    def _project_stats(self, project: str, mode: str) -> dict:
+        stats = self._stats.get(project)
+        if stats is None:
+            stats = self._stats[project] = {
+                "mode": mode, "frames": 0, **{a: 0 for a in ACTIONS},
+                "full_frames": 0, "full_bytes": 0, "bytes_saved": 0,
+            }
+        stats["mode"] = mode
+        return stats
+
+    def __call__(self, meta: dict, frame: np.ndarray) -> Union[dict, tuple[dict, DeltaEncoder], None]:
+        project = meta.get("project")
+        policy = self._policy(project) if project else None
+        if policy is None or "merged_from" in meta:
+            return meta
+
+        hash_, mask, thumb = signature(frame)
+        delta = None
+        with self._lock:
+            stats = self._project_stats(project, policy["mode"])
+            ref = self._refs.get(project)
+            if ref is not None and ref["mode"] == policy["mode"] and ref["shape"] == frame.shape:
+                distance = ((hash_ ^ ref["hash"]) & mask & ref["mask"]).bit_count()
+                diff = float(np.abs(thumb - ref["thumb"]).mean())
+                duplicate = distance <= policy["max_distance"] and diff <= policy["max_diff"]
+            else:
+                distance, diff, duplicate = None, None, False
+
+            if not duplicate:
+                action = "keyframe" if policy["mode"] == "delta" else "stored"
+            elif policy["mode"] == "skip":
+                action = "skipped"
+            elif policy["mode"] == "keep_every":
+                ref["run"] += 1
+                action = "stored" if ref["run"] % policy["keep_every"] == 0 else "skipped"
+            elif ref["deltas"] >= policy["keyframe_every"] and project not in self._pending:
+                action = "keyframe"
+            else:
+                action = "delta"
+                ref["deltas"] += 1
+                delta = DeltaEncoder(ref["keyframe"], ref["keyframe_name"], tile=policy["tile"], threshold=policy["tile_threshold"])
+
+            if action in ("stored", "keyframe"):
+                # Nueva referencia: las siguientes se comparan con esta (un keyframe, cuando esté escrito)
+                new_ref = {
+                    "mode": policy["mode"], "shape": frame.shape, "hash": hash_, "mask": mask, "thumb": thumb, "run": 0, "deltas": 0,
+                    "keyframe": frame if action == "keyframe" else None,
+                    "keyframe_name": meta["filename"],
+                }
+                if action == "keyframe":
+                    self._pending[project] = new_ref
+                else:
+                    self._refs[project] = new_ref
+            stats["frames"] += 1
+            stats[action] += 1
+            if action == "skipped" and stats["full_frames"]:
+                stats["bytes_saved"] += stats["full_bytes"] // stats["full_frames"]
+
+        info = {"action": action, "hash": f"{hash_:016x}"}
+        if distance is not None:
+            info.update({"distance": distance, "diff": round(diff, 3)})
+        if action == "skipped":
+            log.debug("Dedup: skipping %s/%s (distance %s, diff %s)", project, meta.get("filename"), distance, diff)
+            return None
+        if delta is None:
+            return {**meta, DEDUP_KEY: info}
+
+        filename = f'{os.path.splitext(meta["filename"])[0]}.{delta.extension}'
+        meta = {
+            **meta,
+            "filename": filename,
+            "path": str(Path(meta["path"]).with_name(filename)),
+            DEDUP_KEY: {**info, "keyframe": delta.keyframe_name},
+        }
+        return meta, delta
+
+    def on_capture(self, meta: dict) -> None:
+        """
+        Listener de capturas: confirma los keyframes escritos y lleva el tamaño de las
+        fotos completas y el ahorro de las diferencias.
+        """
+        info = meta.get(DEDUP_KEY)
+        size = meta.get("size_bytes")
+        if info is None or size is None:
+            return
+        with self._lock:
+            pending = self._pending.get(meta["project"])
+            if info["action"] == "keyframe" and pending is not None and pending["keyframe_name"] == meta["filename"]:
+                # El keyframe ya está en disco: las siguientes diferencias pueden apuntar a él
+                self._refs[meta["project"]] = self._pending.pop(meta["project"])
+            stats = self._stats.get(meta["project"])
+            if stats is None:
+                return
+            if info["action"] in ("stored", "keyframe"):
+                stats["full_frames"] += 1
+                stats["full_bytes"] += size
+            elif info["action"] == "delta" and stats["full_frames"]:
+                stats["bytes_saved"] += max(0, stats["full_bytes"] // stats["full_frames"] - size)
+
+    def stats(self) -> dict[str, dict]:
+        with self._lock:
+            return {
+                project: {
+                    **{k: v for k, v in s.items() if k not in ("full_frames", "full_bytes")},
+                    "avg_full_bytes": s["full_bytes"] // s["full_frames"] if s["full_frames"] else None,
+                }
+                for project, s in self._stats.items()
+            }
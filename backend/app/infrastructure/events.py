@@ -0,0 +1,158 @@
+from __future__ import annotations
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from app.infrastructure.common.sse import sse_message
+
+
+class EventSubscriber:
+    """
+    Cola acotada de un cliente SSE. Si el cliente no da abasto la cola se marca como
+    desbordada y el stream se cierra: el navegador reconecta con Last-Event-ID y
+    recupera lo perdido del histórico, en vez de perder eventos en silencio.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int, replay: list[bytes]):
+        self.loop = loop
+        self.queue: asyncio.Queue[Optional[bytes]] = asyncio.Queue(maxsize=maxsize)
+        self.replay = replay
+        self.overflowed = False
+
+    def _offer(self, message: bytes) -> None:
+        # Se ejecuta en el event loop del cliente
+        if self.overflowed:
+            return
+        if self.queue.full():
+            self.overflowed = True
+            self.queue.get_nowait()
+            self.queue.put_nowait(None)
+            return
+        self.queue.put_nowait(message)
+
+    def offer(self, message: bytes) -> None:
+        try:
+            self.loop.call_soon_threadsafe(self._offer, message)
+        except RuntimeError:
+            # Loop cerrado: el cliente ya se ha ido
+            pass
+
+    async def get(self) -> Optional[bytes]:
+        """
+        Siguiente mensaje (primero los reenviados); None si la cola se desbordó.
+        """
+        if self.replay:
+            return self.replay.pop(0)
+        return await self.queue.get()
+
+
+class EventHub:
+    """
+    Publicación/suscripción en proceso para el stream SSE.
+
+    Cada evento recibe un id creciente y se guarda en un histórico circular; un
+    cliente que reconecta con Last-Event-ID recibe los eventos posteriores. Los ids
+    parten de la hora de arranque en ms, así siguen creciendo tras un reinicio.
+    `publish` se puede llamar desde cualquier hilo (scheduler, pipeline, event loop).
+    """
+
+    def __init__(self, history: int = 256, queue_size: int = 64):
+        self.queue_size = queue_size
+        self._history: deque[tuple[int, bytes]] = deque(maxlen=history)
+        self._subscribers: set[EventSubscriber] = set()
+        self._lock = threading.Lock()
+        self._last_id = int(time.time() * 1000)
+        self.published = 0
+
+    def publish(self, event: str, data: dict) -> int:
+        with self._lock:
+            self._last_id += 1
+            event_id = self._last_id
+            message = sse_message(event, data, event_id)
+            self._history.append((event_id, message))
+            self.published += 1
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            sub.offer(message)
+        return event_id
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> EventSubscriber:
+        """
+        Con `last_event_id` se reenvían los eventos posteriores del histórico. Si ya no
+        están (o el id no es de este servidor) el primer mensaje es `resync`: el
+        cliente debe volver a pedir el estado completo.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            replay: list[bytes] = []
+            if last_event_id is not None and last_event_id != self._last_id:
+                oldest = self._history[0][0] if self._history else self._last_id + 1
+                if oldest - 1 <= last_event_id < self._last_id:
+                    replay = [m for i, m in self._history if i > last_event_id]
+                else:
+                    replay = [sse_message("resync", {"last_event_id": self._last_id})]
+            sub = EventSubscriber(loop, self.queue_size, replay)
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: EventSubscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "clients": len(self._subscribers),
+                "published": self.published,
+                "last_event_id": self._last_id,
+            }
+
+
+class RunnerEvents:
+    """
+    Traduce la actividad del runner a eventos del hub:
+    - `capture`: cada captura persistida, con sus metadatos y la URL de la miniatura
+    - `status`: proyectos en marcha (cámara, intervalo), solo cuando cambian
+    """
+
+    STATUS_FIELDS = ("env", "active_project", "interval")
+    PROJECT_FIELDS = ("camera", "interval")
+
+    def __init__(self, hub: EventHub, runner, thumbnail_size: Optional[int] = None):
+        self.hub = hub
+        self.runner = runner
+        self.thumbnail_size = thumbnail_size
+        self._lock = threading.Lock()
+        self._status = self.snapshot()
+
+    def snapshot(self) -> dict:
+        status = self.runner.status()
+        snapshot = {k: status.get(k) for k in self.STATUS_FIELDS}
+        snapshot["projects"] = {
+            name: {k: p.get(k) for k in self.PROJECT_FIELDS}
+            for name, p in status.get("projects", {}).items()
+        }
+        return snapshot
+
+    def on_status_change(self) -> None:
+        snapshot = self.snapshot()
+        with self._lock:
+            if snapshot == self._status:
+                return
+            self._status = snapshot
+        self.hub.publish("status", snapshot)
+
+    def on_capture(self, meta: dict) -> None:
+        project, filename = meta["project"], meta["filename"]
+        url = f"/api/projects/{project}/media/{filename}"
+        self.hub.publish("capture", {
+            "project": project,
+            "filename": filename,
+            "timestamp_utc": meta.get("timestamp_utc"),
+            "size_bytes": meta.get("size_bytes"),
+            "url": url,
+            "thumbnail_url": f"{url}?size={self.thumbnail_size}" if self.thumbnail_size else url,
+            "metadata": {k: v for k, v in meta.items() if k not in ("project", "filename", "path")},
+        })
@@ -0,0 +1,128 @@
+from __future__ import annotations
+import json
+import logging
+import os
+import zipfile
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+
+from app.infrastructure.common.encoders import DeltaEncoder
+from app.infrastructure.db import CaptureCatalog
+from app.infrastructure.metadata_log import MetadataLog
+from app.infrastructure.renditions import RenditionService
+
+log = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+# Primera fecha representable en una entrada ZIP
+_ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+
+
+class _Sink:
+    """
+    Destino de zipfile sin seek: acumula lo escrito hasta que el generador lo entrega.
+    Sin seek, zipfile escribe cada tamaño/CRC en un data descriptor tras los datos.
+    """
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._pos = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ZipExporter:
+    """
+    Exporta las capturas de un proyecto como un ZIP generado al vuelo: sin fichero
+    temporal y con memoria constante (un bloque de CHUNK_SIZE más el directorio
+    central, ~100 bytes por foto). Las fotos van sin comprimir (ya son JPEG) y con
+    ZIP64 cuando hace falta, así que el archivo puede pasar de 4GB.
+
+    Las capturas salen en el orden del catálogo: una descarga cortada se reanuda
+    pidiendo otro ZIP a partir del cursor de la última foto recibida.
+
+    Las fotos guardadas como diferencia (.npz, etapa dedup) solo tienen sentido junto a
+    su keyframe: salen reconstruidas como JPEG, con la versión a tamaño completo que
+    cachea `renditions` (la misma que sirve la ruta de media).
+    """
+
+    def __init__(
+        self,
+        catalog: CaptureCatalog,
+        metadata: Optional[MetadataLog] = None,
+        renditions: Optional[RenditionService] = None,
+    ):
+        self.catalog = catalog
+        self.metadata = metadata
+        self.renditions = renditions
+
+    def _source(self, project: str, item: dict) -> tuple[str, str]:
+        """
+        (ruta a copiar, nombre en el ZIP) de una captura; las diferencias, reconstruidas.
+        """
+        path, filename = item["path"], item["filename"]
+        stem, ext = os.path.splitext(filename)
+        if self.renditions is not None and ext.lower() == f".{DeltaEncoder.extension}":
+            return str(self.renditions.full(project, filename, path)), f"{stem}.jpg"
+        return path, filename
+
+    @staticmethod
+    def _zipinfo(arcname: str, timestamp: str, size: int) -> zipfile.ZipInfo:
+        dt = datetime.fromisoformat(timestamp).astimezone(timezone.utc)
+        info = zipfile.ZipInfo(arcname, date_time=max(_ZIP_EPOCH, dt.timetuple()[:6]))
+        info.file_size = size
+        info.compress_type = zipfile.ZIP_STORED
+        return info
+
+    def stream(
+        self,
+        project: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        include_metadata: bool = False,
+    ) -> Iterator[bytes]:
+        sink = _Sink()
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+            for item in self.catalog.iter_range(project, start, end, cursor=cursor):
+                try:
+                    path, arcname = self._source(project, item)
+                    src = open(path, "rb")
+                except (OSError, ValueError) as e:
+                    log.warning("Export: cannot read %s: %s", item["path"], e)
+                    continue
+                with src:
+                    size = os.fstat(src.fileno()).st_size
+                    info = self._zipinfo(f"{project}/{arcname}", item["timestamp"], size)
+                    with zf.open(info, "w") as dest:
+                        while True:
+                            chunk = src.read(CHUNK_SIZE)
+                            if not chunk:
+                                break
+                            dest.write(chunk)
+                            yield sink.drain()
+                yield sink.drain()
+
+                if include_metadata and self.metadata is not None:
+                    record = self.metadata.record(project, item["filename"])
+                    if record is not None:
+                        stem = os.path.splitext(item["filename"])[0]
+                        data = json.dumps(record, indent=2, default=str).encode("utf-8")
+                        zf.writestr(self._zipinfo(f"{project}/{stem}.json", item["timestamp"], len(data)), data)
+                        yield sink.drain()
+        # Directorio central
+        yield sink.drain()
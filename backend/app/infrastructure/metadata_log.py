@@ -0,0 +1,531 @@
+from __future__ import annotations
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+
+from app.infrastructure.db import parse_timestamp
+
+log = logging.getLogger(__name__)
+
+LOG_NAME = "log.jsonl"
+CURRENT_NAME = "current"
+_PENDING_RE = re.compile(r"^log-(\d+)\.jsonl$")
+_SEGMENT_RE = re.compile(r"^segment-(\d+)$")
+
+# Diccionarios anidados cuyos campos numéricos se guardan como columnas de primer nivel
+_NESTED = ("metadata", "analytics")
+
+_OPS = {
+    ">=": np.greater_equal,
+    "<=": np.less_equal,
+    "!=": np.not_equal,
+    "=": np.equal,
+    ">": np.greater,
+    "<": np.less,
+}
+_WHERE_RE = re.compile(r"^\s*([A-Za-z_][\w.]*)\s*(>=|<=|!=|=|>|<)\s*(\S+)\s*$")
+
+
+def numeric_fields(record: dict) -> dict[str, float]:
+    """
+    Campos numéricos de un registro. Los de `metadata` (cámara) y `analytics` se suben
+    al primer nivel (ExposureTime, Lux, mean_luminosity...); los de primer nivel mandan.
+    """
+    out: dict[str, float] = {}
+    for source in (*(record.get(k) for k in _NESTED), record):
+        if not isinstance(source, dict):
+            continue
+        for key, value in source.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                out[key] = float(value)
+    return out
+
+
+def parse_where(expr: Optional[str]) -> list[tuple[str, str, float]]:
+    """
+    Filtro `campo<op>valor` separados por comas, p. ej. "ExposureTime>10000,Lux<=50".
+    Operadores: >= <= != = > <. Lanza ValueError si no es válido.
+    """
+    conditions = []
+    for part in (expr or "").split(","):
+        if not part.strip():
+            continue
+        m = _WHERE_RE.match(part)
+        if m is None:
+            raise ValueError(f"Condición inválida: {part.strip()}")
+        field, op, value = m.groups()
+        try:
+            conditions.append((field, op, float(value)))
+        except ValueError:
+            raise ValueError(f"Valor no numérico: {part.strip()}") from None
+    return conditions
+
+
+class _Segment:
+    """
+    Forma compactada (columnar) del registro de un proyecto, abierta con mmap:
+    ts.npy, filename.npy, una columna float64 por campo numérico (NaN si falta)
+    y los registros completos en records.jsonl con sus offsets.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path / "columns.json", "r", encoding="utf-8") as f:
+            self.files = json.load(f)["fields"]
+        self.ts = np.load(path / "ts.npy", mmap_mode="r")
+        self.filename = np.load(path / "filename.npy", mmap_mode="r")
+        self.offsets = np.load(path / "offsets.npy", mmap_mode="r")
+        self.columns = {field: np.load(path / name, mmap_mode="r") for field, name in self.files.items()}
+        self.n = len(self.ts)
+
+    def record(self, i: int) -> dict:
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        with open(self.path / "records.jsonl", "rb") as f:
+            f.seek(start)
+            return json.loads(f.read(end - start))
+
+    def records(self) -> Iterator[dict]:
+        with open(self.path / "records.jsonl", "rb") as f:
+            for line in f:
+                yield json.loads(line)
+
+
+class _ProjectLog:
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.compact_lock = threading.Lock()
+        self.file = None
+        self.dirty = False
+        # Registros aún no compactados: (ts, filename, campos numéricos, línea)
+        self.tail: list[tuple[float, str, dict, bytes]] = []
+        # Segmentos compactados, del más antiguo al más reciente (los de `current`)
+        self.segments: list[_Segment] = []
+        self.gen = 0
+        self.next_gen = 1
+
+
+def _parse_line(line: bytes):
+    try:
+        record = json.loads(line)
+    except ValueError:
+        # Última línea a medio escribir tras un corte: se descarta
+        return None
+    return _entry(record, line)
+
+
+def _entry(record: dict, line: bytes) -> tuple[float, str, dict, bytes]:
+    try:
+        ts = parse_timestamp(record["timestamp_utc"])
+    except (KeyError, ValueError, TypeError):
+        ts = math.nan
+    return ts, str(record.get("filename", "")), numeric_fields(record), line
+
+
+class MetadataLog:
+    """
+    Registro de metadatos de captura por proyecto, en vez de un JSON por foto.
+
+    Cada captura se añade como una línea a <root>/<proyecto>/log.jsonl. Las escrituras
+    se agrupan: un hilo hace flush + fsync cada `flush_interval` segundos. Cuando hay
+    `compact_rows` registros sin compactar, el log se compacta en un segmento columnar
+    (un .npy por campo numérico) que las consultas abren con mmap y filtran con numpy.
+
+    Los segmentos no se modifican: cada compactación añade uno nuevo a la lista de
+    `current`. Para que no se acumulen, el nuevo absorbe a los más recientes mientras
+    no sean mayores que lo que ya lleva (como un contador binario): cada registro se
+    reescribe unas log2(n) veces a lo largo de la vida del proyecto y hay unos log2(n)
+    segmentos abiertos.
+
+    La compactación es segura ante cortes: el log se renombra a log-<gen>.jsonl, se
+    escribe segment-<gen> y solo después se reescribe `current` con él; al arrancar, los
+    log-<gen>.jsonl posteriores al último segmento de `current` se vuelven a leer.
+    """
+
+    def __init__(self, root: Path, flush_interval: float = 1.0, compact_rows: int = 1000):
+        self.root = Path(root)
+        self.flush_interval = flush_interval
+        self.compact_rows = compact_rows
+        self._lock = threading.Lock()
+        self._projects: dict[str, _ProjectLog] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # --- ciclo de vida ---
+    def start(self) -> "MetadataLog":
+        self._thread = threading.Thread(target=self._run, name="metadata-log", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+            for name, state in list(self._projects.items()):
+                if len(state.tail) >= self.compact_rows:
+                    try:
+                        self.compact(name)
+                    except Exception:
+                        log.exception("Metadata compaction failed: %s", name)
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        with self._lock:
+            states = list(self._projects.values())
+        for state in states:
+            with state.lock:
+                if state.file is not None:
+                    state.file.close()
+                    state.file = None
+
+    # --- estado por proyecto ---
+    def _state(self, project: str, create: bool = False) -> Optional[_ProjectLog]:
+        with self._lock:
+            state = self._projects.get(project)
+            if state is not None:
+                return state
+            path = self.root / project
+            if not path.is_dir():
+                if not create:
+                    return None
+                path.mkdir(parents=True, exist_ok=True)
+            state = self._load(path)
+            self._projects[project] = state
+            return state
+
+    def _load(self, path: Path) -> _ProjectLog:
+        state = _ProjectLog(path)
+        try:
+            gens = [int(g) for g in (path / CURRENT_NAME).read_text().split()]
+        except (FileNotFoundError, ValueError):
+            gens = []
+        state.segments = [_Segment(path / f"segment-{g}") for g in gens]
+        state.gen = max(gens, default=0)
+
+        # Logs de compactaciones que no llegaron a terminar, en orden, y después el activo
+        pending = sorted(
+            (int(m.group(1)), p) for p in path.iterdir() if (m := _PENDING_RE.match(p.name))
+        )
+        files = []
+        for gen, p in pending:
+            if gen <= state.gen:
+                p.unlink(missing_ok=True)
+            else:
+                files.append(p)
+        state.next_gen = max([state.gen, *(g for g, _ in pending)]) + 1
+        files.append(path / LOG_NAME)
+
+        for p in files:
+            try:
+                with open(p, "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                continue
+            for line in data.splitlines(keepends=True):
+                entry = _parse_line(line)
+                if entry is not None:
+                    state.tail.append(entry)
+            if data and not data.endswith(b"\n"):
+                # Se corta la línea a medio escribir para que la siguiente no se pegue a ella
+                with open(p, "r+b") as f:
+                    f.truncate(data.rfind(b"\n") + 1)
+        return state
+
+    # --- escritura ---
+    def append(self, meta: dict) -> None:
+        """
+        Listener de capturas: añade los metadatos de la captura al log del proyecto.
+        """
+        line = (json.dumps(meta, default=str, separators=(",", ":")) + "\n").encode("utf-8")
+        entry = _entry(meta, line)
+        state = self._state(meta["project"], create=True)
+        with state.lock:
+            if state.file is None:
+                state.file = open(state.path / LOG_NAME, "ab")
+            state.file.write(line)
+            state.tail.append(entry)
+            state.dirty = True
+
+    def flush(self) -> None:
+        """
+        Lleva a disco (fsync) lo escrito desde el último flush, un fsync por proyecto.
+        """
+        with self._lock:
+            states = list(self._projects.values())
+        for state in states:
+            with state.lock:
+                if not state.dirty or state.file is None:
+                    continue
+                state.file.flush()
+                state.dirty = False
+                fd = state.file.fileno()
+            try:
+                os.fsync(fd)
+            except (OSError, ValueError):
+                pass
+
+    def compact(self, project: str) -> bool:
+        """
+        Pasa los registros pendientes del proyecto a un nuevo segmento columnar, junto
+        con los segmentos más recientes que no sean mayores que lo que ya lleva.
+        """
+        state = self._state(project)
+        if state is None:
+            return False
+        with state.compact_lock:
+            with state.lock:
+                if not state.tail:
+                    return False
+                gen = state.next_gen
+                if state.file is not None:
+                    state.file.flush()
+                    os.fsync(state.file.fileno())
+                    state.file.close()
+                    state.file = None
+                    state.dirty = False
+                try:
+                    os.replace(state.path / LOG_NAME, state.path / f"log-{gen}.jsonl")
+                except FileNotFoundError:
+                    pass
+                tail = list(state.tail)
+                kept = list(state.segments)
+
+            # Segmentos recientes que se funden con el nuevo
+            merged: list[_Segment] = []
+            rows = len(tail)
+            while kept and kept[-1].n <= rows:
+                merged.insert(0, kept.pop())
+                rows += merged[0].n
+
+            segment = self._build_segment(state.path, gen, merged, tail)
+            segments = [*kept, segment]
+
+            tmp = state.path / f".{CURRENT_NAME}.tmp"
+            tmp.write_text(" ".join(_SEGMENT_RE.match(s.path.name).group(1) for s in segments))
+            os.replace(tmp, state.path / CURRENT_NAME)
+
+            with state.lock:
+                state.segments = segments
+                state.gen = gen
+                state.next_gen = gen + 1
+                del state.tail[:len(tail)]
+
+            live = {s.path for s in segments}
+            for p in state.path.iterdir():
+                m = _PENDING_RE.match(p.name) or _SEGMENT_RE.match(p.name)
+                if m and int(m.group(1)) <= gen and p not in live:
+                    if p.is_dir():
+                        shutil.rmtree(p, ignore_errors=True)
+                    else:
+                        p.unlink(missing_ok=True)
+        log.info("Compacted metadata of %s: %d rows in segment %d (%d merged), %d segment(s)",
+                 project, segment.n, gen, len(merged), len(segments))
+        return True
+
+    @staticmethod
+    def _build_segment(path: Path, gen: int, olds: list[_Segment], tail: list) -> _Segment:
+        """
+        Escribe segment-<gen> con los registros de `olds` (en orden) seguidos de `tail`.
+        """
+        tmp = path / f".segment-{gen}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir()
+
+        n_old = sum(old.n for old in olds)
+        n = n_old + len(tail)
+        fields = sorted({f for old in olds for f in old.columns} | {f for _, _, values, _ in tail for f in values})
+
+        ts = np.concatenate([*(old.ts for old in olds), np.array([e[0] for e in tail], dtype=np.float64)])
+        filenames = np.concatenate([*(old.filename for old in olds), np.array([e[1] for e in tail], dtype=str)])
+        np.save(tmp / "ts.npy", ts)
+        np.save(tmp / "filename.npy", filenames)
+
+        files = {}
+        for i, field in enumerate(fields):
+            column = np.full(n, np.nan)
+            start = 0
+            for old in olds:
+                if field in old.columns:
+                    column[start:start + old.n] = old.columns[field]
+                start += old.n
+            column[n_old:] = [values.get(field, np.nan) for _, _, values, _ in tail]
+            files[field] = f"c{i}.npy"
+            np.save(tmp / files[field], column)
+
+        offsets = np.empty(n + 1, dtype=np.int64)
+        offsets[0] = 0
+        with open(tmp / "records.jsonl", "wb") as out:
+            start = 0
+            for old in olds:
+                with open(old.path / "records.jsonl", "rb") as src:
+                    shutil.copyfileobj(src, out)
+                offsets[start + 1:start + old.n + 1] = old.offsets[1:] + offsets[start]
+                start += old.n
+            pos = int(offsets[n_old])
+            for i, (_, _, _, line) in enumerate(tail):
+                out.write(line)
+                pos += len(line)
+                offsets[n_old + i + 1] = pos
+            out.flush()
+            os.fsync(out.fileno())
+        np.save(tmp / "offsets.npy", offsets)
+
+        with open(tmp / "columns.json", "w", encoding="utf-8") as f:
+            json.dump({"fields": files, "rows": n}, f)
+
+        target = path / f"segment-{gen}"
+        os.replace(tmp, target)
+        return _Segment(target)
+
+    # --- lectura ---
+    def _parts(self, project: str) -> list[tuple[int, np.ndarray, np.ndarray, dict]]:
+        """
+        Segmentos compactados + registros pendientes como columnas: (n, ts, filename, columnas).
+        """
+        state = self._state(project)
+        if state is None:
+            return []
+        with state.lock:
+            segments = list(state.segments)
+            tail = list(state.tail)
+
+        parts = [(s.n, s.ts, s.filename, s.columns) for s in segments if s.n]
+        if tail:
+            fields = {f for _, _, values, _ in tail for f in values}
+            columns = {f: np.array([values.get(f, np.nan) for _, _, values, _ in tail]) for f in fields}
+            parts.append((
+                len(tail),
+                np.array([e[0] for e in tail], dtype=np.float64),
+                np.array([e[1] for e in tail], dtype=str),
+                columns,
+            ))
+        return parts
+
+    def fields(self, project: str) -> list[str]:
+        return sorted({f for _, _, _, columns in self._parts(project) for f in columns})
+
+    def query(
+        self,
+        project: str,
+        fields: Optional[list[str]] = None,
+        where: Optional[list[tuple[str, str, float]]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        limit: int = 10000,
+    ) -> dict:
+        """
+        Campos numéricos de las capturas que cumplen `where` (ver parse_where) en [start, end),
+        en columnas y ordenadas por fecha. Lanza ValueError si se pide un campo desconocido.
+        """
+        where = where or []
+        parts = self._parts(project)
+        available = {f for _, _, _, columns in parts for f in columns}
+        fields = list(fields) if fields else sorted(available)
+        unknown = [f for f in [*fields, *(c[0] for c in where)] if f not in available]
+        if unknown and parts:
+            raise ValueError(f"Campo desconocido: {', '.join(sorted(set(unknown)))}")
+
+        lo = parse_timestamp(start) if start is not None else None
+        hi = parse_timestamp(end) if end is not None else None
+
+        ts_out, fn_out, values_out = [], [], {f: [] for f in fields}
+        for n, ts, filenames, columns in parts:
+            mask = np.ones(n, dtype=bool)
+            if lo is not None:
+                mask &= ts >= lo
+            if hi is not None:
+                mask &= ts < hi
+            for field, op, value in where:
+                column = columns.get(field)
+                if column is None:
+                    mask[:] = False
+                    break
+                # NaN (campo ausente) nunca cumple la condición, tampoco con !=
+                mask &= _OPS[op](column, value) & ~np.isnan(column)
+            idx = np.flatnonzero(mask)
+            ts_out.append(ts[idx])
+            fn_out.append(filenames[idx])
+            for field in fields:
+                column = columns.get(field)
+                values_out[field].append(column[idx] if column is not None else np.full(len(idx), np.nan))
+
+        if not parts:
+            return {"project": project, "count": 0, "truncated": False, "columns": {"timestamp": [], "filename": []}}
+
+        ts_all = np.concatenate(ts_out)
+        order = np.argsort(ts_all, kind="stable")
+        count = len(order)
+        order = order[:limit]
+
+        def listed(arr: np.ndarray) -> list:
+            return [None if math.isnan(v) else v for v in arr.tolist()]
+
+        columns = {
+            "timestamp": [
+                datetime.fromtimestamp(t, tz=timezone.utc).isoformat() if not math.isnan(t) else None
+                for t in ts_all[order].tolist()
+            ],
+            "filename": np.concatenate(fn_out)[order].tolist(),
+        }
+        for field in fields:
+            columns[field] = listed(np.concatenate(values_out[field])[order])
+        return {"project": project, "count": count, "truncated": count > limit, "columns": columns}
+
+    def record(self, project: str, filename: str) -> Optional[dict]:
+        """
+        Metadatos completos de una captura (el antiguo JSON por foto).
+        """
+        state = self._state(project)
+        if state is None:
+            return None
+        with state.lock:
+            segments = list(state.segments)
+            tail = list(state.tail)
+        for _, name, _, line in reversed(tail):
+            if name == filename:
+                return json.loads(line)
+        for segment in reversed(segments):
+            idx = np.flatnonzero(segment.filename == filename)
+            if len(idx):
+                return segment.record(int(idx[-1]))
+        return None
+
+    def records(self, project: str) -> Iterator[dict]:
+        """
+        Todos los registros del proyecto, compactados y pendientes.
+        """
+        state = self._state(project)
+        if state is None:
+            return
+        with state.lock:
+            segments = list(state.segments)
+            tail = list(state.tail)
+        for segment in segments:
+            yield from segment.records()
+        for _, _, _, line in tail:
+            yield json.loads(line)
+
+    def status(self) -> dict:
+        with self._lock:
+            states = dict(self._projects)
+        return {
+            name: {
+                "rows": sum(seg.n for seg in s.segments) + len(s.tail),
+                "pending": len(s.tail),
+                "segment": s.gen,
+                "segments": len(s.segments),
+            }
+            for name, s in states.items()
+        }
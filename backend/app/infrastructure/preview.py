@@ -0,0 +1,184 @@
+from __future__ import annotations
+import asyncio
+import io
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+import numpy as np
+from PIL import Image
+
+from app.infrastructure.common.mjpeg import mjpeg_part
+
+log = logging.getLogger(__name__)
+
+
+class PreviewSubscriber:
+    """
+    Cola acotada de un cliente HTTP. Si el cliente va lento se descartan los
+    fotogramas más antiguos: el productor nunca espera.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.loop = loop
+        self.queue: asyncio.Queue[bytes] = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def _offer(self, part: bytes) -> None:
+        # Se ejecuta en el event loop del cliente
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(part)
+
+    def offer(self, part: bytes) -> None:
+        try:
+            self.loop.call_soon_threadsafe(self._offer, part)
+        except RuntimeError:
+            # Loop cerrado: el cliente ya se ha ido
+            pass
+
+    async def get(self) -> bytes:
+        return await self.queue.get()
+
+
+class PreviewBroadcaster:
+    """
+    Un único productor de preview: obtiene cada fotograma de `source`, lo codifica
+    a JPEG una sola vez y lo reparte a todos los suscriptores.
+    El hilo productor solo corre mientras haya clientes conectados.
+
+    `source()` devuelve un array RGB (o None si la cámara está ocupada con una
+    captura: la preview se pausa hasta que quede libre).
+    """
+
+    def __init__(
+        self,
+        source: Callable[[], Optional[np.ndarray]],
+        on_idle: Optional[Callable[[], None]] = None,
+        fps: float = 10.0,
+        quality: int = 70,
+        queue_size: int = 2,
+    ):
+        self.source = source
+        self.on_idle = on_idle
+        self.interval = 1.0 / fps
+        self.quality = quality
+        self.queue_size = queue_size
+
+        self._subscribers: set[PreviewSubscriber] = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.frames = 0
+        self.paused = False
+
+    # --- suscriptores ---
+    def subscribe(self) -> PreviewSubscriber:
+        sub = PreviewSubscriber(asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers.add(sub)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="preview", daemon=True)
+                self._thread.start()
+        return sub
+
+    def unsubscribe(self, sub: PreviewSubscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    @property
+    def running(self) -> bool:
+        with self._lock:
+            return self._thread is not None
+
+    # --- productor ---
+    def _encode(self, frame: np.ndarray) -> bytes:
+        buf = io.BytesIO()
+        Image.fromarray(frame).save(buf, "JPEG", quality=self.quality)
+        return mjpeg_part(buf.getvalue())
+
+    def _run(self) -> None:
+        next_tick = time.monotonic()
+        try:
+            while True:
+                with self._lock:
+                    subscribers = list(self._subscribers)
+                    if not subscribers:
+                        self._thread = None
+                        return
+
+                try:
+                    frame = self.source()
+                except Exception:
+                    log.exception("Preview source failed")
+                    frame = None
+
+                self.paused = frame is None
+                if frame is not None:
+                    part = self._encode(frame)
+                    self.frames += 1
+                    for sub in subscribers:
+                        sub.offer(part)
+
+                next_tick += self.interval
+                delay = next_tick - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_tick = time.monotonic()
+        finally:
+            if self.on_idle is not None:
+                try:
+                    self.on_idle()
+                except Exception:
+                    log.exception("Preview on_idle failed")
+
+    def status(self) -> dict:
+        with self._lock:
+            clients = len(self._subscribers)
+        return {"clients": clients, "frames": self.frames, "paused": self.paused}
+
+
+class PreviewBroadcasters:
+    """
+    Un PreviewBroadcaster por proyecto (cámara), creado con el primer cliente y
+    descartado cuando se queda sin clientes.
+    `source(project)` y `on_idle(project)` reciben el nombre del proyecto.
+    """
+
+    def __init__(self, source: Callable[[str], Optional[np.ndarray]], on_idle: Optional[Callable[[str], None]] = None, **kwargs):
+        self.source = source
+        self.on_idle = on_idle
+        self.kwargs = kwargs
+        self._broadcasters: dict[str, PreviewBroadcaster] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, project: str) -> tuple[PreviewBroadcaster, PreviewSubscriber]:
+        """
+        Suscribe un cliente al preview del proyecto. Devuelve (broadcaster, suscriptor)
+        para poder darlo de baja con `broadcaster.unsubscribe`.
+        """
+        with self._lock:
+            broadcaster = self._broadcasters.get(project)
+            if broadcaster is None:
+                broadcaster = PreviewBroadcaster(
+                    lambda: self.source(project), on_idle=lambda: self._idle(project), **self.kwargs
+                )
+                self._broadcasters[project] = broadcaster
+            # Con el lock tomado: el productor no puede descartarse entre la búsqueda y la suscripción
+            return broadcaster, broadcaster.subscribe()
+
+    def _idle(self, project: str) -> None:
+        with self._lock:
+            broadcaster = self._broadcasters.get(project)
+            # Si un cliente nuevo ya lo ha vuelto a arrancar, se queda
+            if broadcaster is not None and not broadcaster.running:
+                del self._broadcasters[project]
+        if self.on_idle is not None:
+            self.on_idle(project)
+
+    def status(self) -> dict:
+        with self._lock:
+            broadcasters = dict(self._broadcasters)
+        return {name: b.status() for name, b in broadcasters.items()}
@@ -1,4 +1,17 @@
+from __future__ import annotations
+import json
+import logging
+import os
+import threading
 from pathlib import Path
+from typing import Optional
+
+log = logging.getLogger(__name__)
+
+CONFIG_FILENAME = "config.json"
+# Eventos de watchdog que cambian algo (leer config.json genera eventos `opened`/`closed_no_write`)
+_CHANGE_EVENTS = {"created", "modified", "deleted", "moved", "closed"}
+
 
 def discover_projects(projects_dir: Path) -> list[str]:
     """
@@ -11,5 +24,174 @@ def discover_projects(projects_dir: Path) -> list[str]:
         p.name for p in projects_dir.iterdir()
         if p.is_dir()
         and not p.name.startswith(".")
-        and (p / "config.json").exists()
-    )
\ No newline at end of file
+        and (p / CONFIG_FILENAME).exists()
+    )
+
+
+class ProjectRegistry:
+    """
+    Configuración de todos los proyectos en memoria.
+
+    Se carga una vez al arrancar y se mantiene al día con eventos de watchdog
+    (inotify), recargando solo el proyecto afectado. Si no se puede vigilar el
+    directorio (watchdog no instalado, límite de inotify...) se reescanea cada
+    `rescan_interval` segundos; el reescaneo solo vuelve a leer los config.json
+    cuyo mtime ha cambiado.
+    """
+
+    def __init__(self, projects_dir: Path, rescan_interval: float = 30.0):
+        self.projects_dir = Path(projects_dir)
+        self.rescan_interval = rescan_interval
+        self._lock = threading.Lock()
+        # nombre -> (mtime_ns de config.json, config)
+        self._projects: dict[str, tuple[int, dict]] = {}
+        self._names: list[str] = []
+        self._observer = None
+        self._stop = threading.Event()
+        self._poller: Optional[threading.Thread] = None
+        self.mode = "stopped"
+        self.loads = 0
+
+    # --- ciclo de vida ---
+    def start(self) -> "ProjectRegistry":
+        self.projects_dir.mkdir(parents=True, exist_ok=True)
+        self.rescan()
+        try:
+            self._observer = self._watch()
+            self.mode = "watchdog"
+        except Exception as e:
+            log.warning("Cannot watch %s (%s), falling back to rescans every %ss", self.projects_dir, e, self.rescan_interval)
+            self._poller = threading.Thread(target=self._poll, name="project-rescan", daemon=True)
+            self._poller.start()
+            self.mode = "polling"
+        return self
+
+    def _watch(self):
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+
+        registry = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                registry._on_event(event)
+
+        observer = Observer()
+        observer.schedule(Handler(), str(self.projects_dir), recursive=True)
+        observer.start()
+        return observer
+
+    def _poll(self) -> None:
+        while not self._stop.wait(self.rescan_interval):
+            try:
+                self.rescan()
+            except Exception:
+                log.exception("Project rescan failed")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        self.mode = "stopped"
+
+    # --- carga ---
+    def _project_of(self, path: str) -> Optional[str]:
+        """
+        Proyecto afectado por un evento: solo interesan la carpeta del proyecto
+        y su config.json (no las fotos que se escriben dentro).
+        """
+        try:
+            parts = Path(path).relative_to(self.projects_dir).parts
+        except ValueError:
+            return None
+        if len(parts) == 1 or (len(parts) == 2 and parts[1] == CONFIG_FILENAME):
+            return parts[0]
+        return None
+
+    def _on_event(self, event) -> None:
+        if event.event_type not in _CHANGE_EVENTS:
+            return
+        paths = [event.src_path, getattr(event, "dest_path", "")]
+        for name in {self._project_of(os.fsdecode(p)) for p in paths if p}:
+            if name is not None:
+                self.reload(name)
+
+    def _load(self, name: str, known_mtime: Optional[int] = None):
+        """
+        (mtime_ns, config) del proyecto; None si no existe o no es un proyecto.
+        Si el mtime coincide con `known_mtime` no se vuelve a leer el fichero.
+        """
+        if name.startswith("."):
+            return None
+        path = self.projects_dir / name / CONFIG_FILENAME
+        try:
+            mtime = path.stat().st_mtime_ns
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        if mtime == known_mtime:
+            return mtime, None
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        self.loads += 1
+        return mtime, config
+
+    def _apply(self, name: str, loaded) -> None:
+        # Debe llamarse con el lock tomado
+        if loaded is None:
+            self._projects.pop(name, None)
+        elif loaded[1] is not None:
+            self._projects[name] = loaded
+        self._names = sorted(self._projects)
+
+    def reload(self, name: str) -> Optional[dict]:
+        """
+        Vuelve a leer un proyecto. Un config.json a medio escribir (JSON inválido)
+        conserva la versión anterior: llegará otro evento cuando termine la escritura.
+        """
+        with self._lock:
+            known = self._projects.get(name)
+        try:
+            loaded = self._load(name, known[0] if known else None)
+        except (OSError, ValueError) as e:
+            log.warning("Invalid project config %s: %s", name, e)
+            return known[1] if known else None
+        with self._lock:
+            self._apply(name, loaded)
+            entry = self._projects.get(name)
+        return dict(entry[1]) if entry else None
+
+    def rescan(self) -> None:
+        try:
+            with os.scandir(self.projects_dir) as it:
+                names = {e.name for e in it if e.is_dir() and not e.name.startswith(".")}
+        except FileNotFoundError:
+            names = set()
+        with self._lock:
+            removed = set(self._projects) - names
+            for name in removed:
+                self._apply(name, None)
+        for name in names:
+            self.reload(name)
+
+    # --- consulta (sin acceso a disco) ---
+    def names(self) -> list[str]:
+        with self._lock:
+            return list(self._names)
+
+    def get(self, name: str) -> Optional[dict]:
+        """
+        Configuración del proyecto. Un proyecto que aún no se conoce se busca en
+        disco una vez (p. ej. creado justo antes de que llegue su evento).
+        """
+        with self._lock:
+            entry = self._projects.get(name)
+        if entry is not None:
+            return dict(entry[1])
+        return self.reload(name)
+
+    def status(self) -> dict:
+        with self._lock:
+            count = len(self._projects)
+        return {"mode": self.mode, "projects": count, "loads": self.loads}
@@ -1,43 +1,214 @@
 from __future__ import annotations
+from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
+import os
+
+from app.infrastructure.common.capture_batcher import CaptureBatcher
+from app.infrastructure.common.encoders import EncoderPool, FrameEncoder, encoder_for
+from app.infrastructure.common.imaging import exposure_fusion
+from app.infrastructure.common.ingest import FrameIngest, IngestStage
+from app.infrastructure.common.light import LightArbiter
+from app.infrastructure.common.metrics import MetricsRegistry, capture_phases
+from app.infrastructure.common.pipeline import CapturePipeline
+from app.infrastructure.common.scheduler import CaptureScheduler, parse_misfire
+from app.infrastructure.projects_fs import ProjectRegistry
+
+# Fases de CameraController (meapis) -> fases de meaplan_capture_phase_seconds
+_MEAPIS_PHASES = {
+    "light_on": "light_on",
+    "frame_available": "frame",
+    "saved": "handoff",
+    "focus_calibration": "focus_calibration",
+}
+
+
+def preload_hardware() -> None:
+    """
+    Importa meapis y las librerías de las cámaras (picamera2, libcamera, numpy...), que en
+    la Raspberry tardan varios segundos. Se puede llamar antes de crear el runner para medir
+    (y adelantar en segundo plano) ese tiempo; después los imports ya están en caché.
+    """
+    import meapis.utils.project_runner  # noqa: F401
+    import meapis.utils.light  # noqa: F401
+    import meapis.camera.camera_controller  # noqa: F401
 
 
 class RaspiRunner:
-    def __init__(self, data_dir: Path):
+    def __init__(
+        self,
+        data_dir: Path,
+        pipeline: Optional[CapturePipeline] = None,
+        registry: Optional[ProjectRegistry] = None,
+        batch_window: float = 0.3,
+        light_warmup: float = 0.0,
+        sidecars: bool = False,
+        metrics: Optional[MetricsRegistry] = None,
+        encoders: Optional[EncoderPool] = None,
+        autostart: bool = True,
+    ):
         self.data_dir = data_dir
+        self.metrics = metrics or MetricsRegistry()
+        self._phases = capture_phases(self.metrics)
         self.projects_dir = data_dir / "projects"
         self.media_dir = data_dir / "media"
+        self.registry = registry or ProjectRegistry(self.projects_dir).start()
+        # Los metadatos van al log del proyecto; el -metadata.json por foto es opcional
+        self.sidecars = sidecars
 
         # IMPORTS DIFERIDOS → solo funcionan en Raspberry
         from meapis.utils.project_runner import ProjectRunner
         from meapis.utils.light import Light
 
-        self._light = Light()
-        self._runner = ProjectRunner(self._light)
+        # Análisis, codificación y escritura en los hilos del pipeline, no en el del scheduler
+        self.pipeline = pipeline or CapturePipeline(metrics=self.metrics)
+        self.ingest = FrameIngest(self.pipeline, metrics=self.metrics, encoders=encoders)
+        # Encoder de cada proyecto en marcha ("format"/"quality" de su config.json)
+        self._encoders: dict[str, FrameEncoder] = {}
 
-        self._active_project: Optional[str] = None
+        # Una luz para todas las cámaras: cada proyecto la pide a través del árbitro
+        self._light = LightArbiter(Light(), metrics=self.metrics)
+        # Fotos programadas que vencen casi a la vez comparten una sesión de luz
+        self.batcher = CaptureBatcher(self._light, window=batch_window, warmup=light_warmup)
+        # Rejilla fija de tiempo en lugar de los jobs interval de APScheduler
+        self.scheduler = CaptureScheduler(metrics=self.metrics)
+        self._runner = ProjectRunner(
+            self._light, frame_sink=self._frame_sink, dispatch=self.batcher.run,
+            on_timings=self._observe_timings, scheduler=self.scheduler,
+            # Sin autostart, las cámaras de current.txt se abren en start_initial_projects
+            autostart=autostart,
+        )
+
+    def start_initial_projects(self) -> None:
+        self._runner.start_initial_projects()
+
+    def _observe_timings(self, project, timings: dict) -> None:
+        for name, seconds in timings.items():
+            phase = _MEAPIS_PHASES.get(name)
+            if phase is not None:
+                self._phases.observe(seconds, phase=phase)
+
+    def _frame_sink(self, project, array, image_path: Optional[str], metadata: dict, metadata_file: Optional[str]):
+        """
+        Sumidero de fotos de meapis: traduce la foto al formato de metadatos de la API
+        y la entrega a la ingesta (el sidecar, si se pide, conserva los metadatos de la cámara).
+        """
+        encoder = self._encoder(project)
+        # meapis pone la extensión de "format" tal cual (p. ej. "jpeg"); la del fichero es la del encoder
+        image_path = f"{os.path.splitext(image_path)[0]}.{encoder.extension}"
+        meta = {
+            "project": project.name,
+            "filename": os.path.basename(image_path),
+            "timestamp_utc": datetime.utcnow().strftime("%Y%m%d_%H%M%S"),
+            "path": image_path,
+            "camera": project.camera,
+            "metadata": metadata,
+        }
+        sidecar_path = metadata_file if self.sidecars else None
+        return self.ingest.submit(array, meta, sidecar_path=sidecar_path, sidecar=metadata, encoder=encoder)
+
+    def _encoder(self, project) -> FrameEncoder:
+        encoder = self._encoders.get(project.name)
+        if encoder is None:
+            # Proyecto que meapis arrancó por su cuenta: solo se conoce su formato
+            encoder = encoder_for({"format": project.image_format})
+        return encoder
+
+    def add_capture_listener(self, listener: Callable[[dict], None]) -> None:
+        self.ingest.add_listener(listener)
+
+    def add_ingest_stage(self, stage: IngestStage) -> None:
+        self.ingest.add_stage(stage)
+
+    def active_projects(self) -> list[str]:
+        return list(self._runner.workers)
 
     def status(self) -> dict:
+        projects = {
+            name: {
+                "camera": w.project.camera, "interval": w.project.interval, "misfire": w.project.misfire,
+                "encoder": self._encoder(w.project).name,
+            }
+            for name, w in list(self._runner.workers.items())
+        }
+        only = next(iter(projects)) if len(projects) == 1 else None
         return {
             "env": "raspi",
-            "active_project": self._active_project,
+            "active_project": only,
+            "interval": projects[only]["interval"] if only else None,
+            "projects": projects,
+            "light": self._light.status(),
+            "batching": self.batcher.stats(),
+            "pipeline": self.pipeline.stats(),
+            "encoders": self.ingest.encoders.stats(),
+            "scheduler": self.scheduler.stats(),
         }
 
     def list_projects(self) -> list[str]:
-        from app.infrastructure.projects_fs import discover_projects
-        return discover_projects(self.projects_dir)
+        return self.registry.names()
 
     def start_project(self, name: str) -> None:
-        self._runner.start_project(name)
-        self._active_project = name
+        # Config ya parseada del registro; si no la conoce, meapis la lee de disco
+        config = self.registry.get(name)
+        if config is not None:
+            parse_misfire(config)
+            self._encoders[name] = encoder_for(config)
+        self._runner.start_project(name, config=config)
 
-    def stop_project(self) -> None:
-        self._runner.stop_project()
-        self._active_project = None
+    def stop_project(self, name: Optional[str] = None) -> None:
+        self._runner.stop_project(name)
 
-    def capture_now(self) -> dict:
-        return self._runner.capture_now()
+    def capture_now(self, wait: bool = False, project: Optional[str] = None) -> dict:
+        return self._runner.capture_now(wait=wait, project_name=project)
+
+    def capture_burst(
+        self,
+        frames: int,
+        bracket: Optional[list[dict]] = None,
+        merge: bool = False,
+        wait: bool = False,
+        project: Optional[str] = None,
+    ) -> dict:
+        worker = self._runner.worker(project)
+        controls_list = bracket or [{}] * frames
+        stack, metadata_list = worker.camera_controller.capture_burst(controls_list)
+
+        project = worker.project
+        encoder = self._encoder(project)
+        out_dir = project.path_pictures
+        filename = project.get_picture_filename("burst")
+        ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+
+        def frame_meta(name: str, metadata: dict) -> dict:
+            return {
+                "project": project.name,
+                "filename": f"{name}.{encoder.extension}",
+                "timestamp_utc": ts,
+                "path": os.path.join(out_dir, f"{name}.{encoder.extension}"),
+                "camera": project.camera,
+                "metadata": metadata,
+            }
+
+        metas = [frame_meta(f"{filename}{i}", md) for i, md in enumerate(metadata_list)]
+        futures = [self.ingest.submit(stack[i], m, encoder=encoder) for i, m in enumerate(metas)]
+
+        merged = None
+        if merge:
+            # merged_from en la raíz, como en el simulador: las etapas de ingesta lo buscan ahí
+            merged = {**frame_meta(f"{filename}-hdr", {}), "merged_from": [m["filename"] for m in metas]}
+            futures.append(self.ingest.submit(lambda: exposure_fusion(stack), merged, encoder=encoder))
+
+        if wait:
+            results = [f.result() for f in futures]
+            metas, merged = results[:len(metas)], (results[-1] if merge else None)
+
+        return {"frames": metas, "merged": merged}
+
+    def preview_frame(self, project: Optional[str] = None):
+        return self._runner.preview_frame(project)
+
+    def stop_preview(self, project: Optional[str] = None) -> None:
+        self._runner.stop_preview(project)
 
     def shutdown(self) -> None:
         try:
@@ -45,7 +216,11 @@ class RaspiRunner:
         except Exception:
             pass
 
+        self.batcher.shutdown(timeout=5)
+
         try:
             self._light.close()
         except Exception:
-            pass
\ No newline at end of file
+            pass
+
+        self.pipeline.shutdown(wait=True)
\ No newline at end of file
@@ -0,0 +1,113 @@
+from __future__ import annotations
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable
+
+from PIL import Image
+
+from app.infrastructure.common.imaging import open_image
+
+log = logging.getLogger(__name__)
+
+# "Tamaño" de las reconstrucciones a tamaño completo en la caché
+FULL_SIZE = 0
+
+# Capturas que el navegador no puede mostrar tal cual: se sirven reconstruidas en JPEG
+REBUILT_EXTS = {".npy", ".npz"}
+
+
+class RenditionService:
+    """
+    Genera y cachea en disco versiones reducidas de cada captura (miniaturas/previews).
+    El trabajo se hace en un pool de hilos propio, fuera del camino de captura, y las
+    peticiones concurrentes de la misma versión comparten un único trabajo.
+    """
+
+    def __init__(self, cache_dir: Path, sizes: Iterable[int] = (256, 1024), workers: int = 2, quality: int = 85):
+        self.cache_dir = cache_dir
+        self.sizes = tuple(sorted(sizes))
+        self.quality = quality
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rendition")
+        self._inflight: dict[Path, Future] = {}
+        self._lock = threading.Lock()
+
+    def path_for(self, project: str, filename: str, size: int) -> Path:
+        stem = os.path.splitext(filename)[0]
+        return self.cache_dir / project / str(size) / f"{stem}.jpg"
+
+    def _is_fresh(self, target: Path, source: Path) -> bool:
+        try:
+            return target.stat().st_mtime_ns >= source.stat().st_mtime_ns
+        except FileNotFoundError:
+            return False
+
+    def _render(self, source: Path, target: Path, size: int) -> Path:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open_image(source, draft_size=size or None) as img:
+            if size:
+                # JPEG: draft() decodifica directamente a 1/2, 1/4 o 1/8 con escalado DCT
+                img.draft("RGB", (size, size))
+            img = img.convert("RGB")
+            if size:
+                img.thumbnail((size, size), Image.Resampling.BILINEAR)
+
+            tmp = target.with_name(f".{target.name}.{threading.get_ident()}.tmp")
+            img.save(tmp, "JPEG", quality=self.quality)
+        os.replace(tmp, target)
+        return target
+
+    def _done(self, target: Path, fut: Future) -> None:
+        with self._lock:
+            if self._inflight.get(target) is fut:
+                del self._inflight[target]
+        if not fut.cancelled() and fut.exception() is not None:
+            log.error("Rendition failed: %s", target, exc_info=fut.exception())
+
+    def submit(self, project: str, filename: str, source: Path, size: int) -> Future:
+        """
+        Encola la generación de una versión. Si ya hay un trabajo en curso para
+        la misma versión se devuelve ese mismo Future.
+        """
+        target = self.path_for(project, filename, size)
+        with self._lock:
+            fut = self._inflight.get(target)
+            if fut is not None:
+                return fut
+            fut = self._pool.submit(self._render, Path(source), target, size)
+            self._inflight[target] = fut
+        fut.add_done_callback(lambda f: self._done(target, f))
+        return fut
+
+    def get(self, project: str, filename: str, source: Path, size: int) -> Path:
+        """
+        Devuelve la ruta de la versión pedida, generándola bajo demanda si falta.
+        """
+        if size not in self.sizes:
+            raise ValueError(f"Tamaño no soportado: {size}")
+        target = self.path_for(project, filename, size)
+        if self._is_fresh(target, Path(source)):
+            return target
+        return self.submit(project, filename, source, size).result()
+
+    def full(self, project: str, filename: str, source: Path) -> Path:
+        """
+        JPEG a tamaño completo de una captura que no se puede servir tal cual
+        (una diferencia .npz), reconstruida bajo demanda y cacheada como las versiones.
+        """
+        target = self.path_for(project, filename, FULL_SIZE)
+        if self._is_fresh(target, Path(source)):
+            return target
+        return self.submit(project, filename, source, FULL_SIZE).result()
+
+    def on_capture(self, meta: dict) -> None:
+        """
+        Listener de capturas: encola todas las versiones de la nueva foto.
+        """
+        for size in self.sizes:
+            self.submit(meta["project"], meta["filename"], Path(meta["path"]), size)
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
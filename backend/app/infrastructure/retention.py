@@ -0,0 +1,290 @@
+from __future__ import annotations
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Optional
+
+from PIL import Image
+
+from app.infrastructure.db import CaptureCatalog
+from app.infrastructure.projects_fs import ProjectRegistry
+from app.infrastructure.renditions import RenditionService
+
+log = logging.getLogger(__name__)
+
+RETENTION_KEY = "retention"
+
+
+def parse_policy(config: dict) -> Optional[dict]:
+    """
+    Política de retención del config.json del proyecto, p. ej.:
+        "retention": {"full_days": 7, "downsample": 1024, "keep_every": 6}
+    - full_days:  días que se conservan los originales tal cual
+    - downsample: pasado ese plazo, lado mayor (px) al que se reducen (null: no se reducen)
+    - keep_every: pasado ese plazo, solo se conserva una de cada N capturas (1: todas)
+    Devuelve None si el proyecto no tiene política; ValueError si no es válida.
+    """
+    raw = config.get(RETENTION_KEY)
+    if raw is None:
+        return None
+    if not isinstance(raw, dict):
+        raise ValueError("retention debe ser un objeto")
+
+    full_days = float(raw.get("full_days", 7))
+    downsample = raw.get("downsample")
+    keep_every = int(raw.get("keep_every", 1))
+    if full_days < 0:
+        raise ValueError("full_days debe ser >= 0")
+    if downsample is not None and int(downsample) < 16:
+        raise ValueError("downsample debe ser >= 16 px")
+    if keep_every < 1:
+        raise ValueError("keep_every debe ser >= 1")
+    return {
+        "full_days": full_days,
+        "downsample": int(downsample) if downsample is not None else None,
+        "keep_every": keep_every,
+    }
+
+
+def _sidecars(path: Path) -> list[Path]:
+    """
+    Ficheros de metadatos de una captura: <foto>.json (simulador) y
+    ../metadata/<stem>-metadata.json (meapis).
+    """
+    return [
+        path.with_name(f"{path.name}.json"),
+        path.parent.parent / "metadata" / f"{path.stem}-metadata.json",
+    ]
+
+
+class _Throttle:
+    """
+    Limita el ritmo de E/S a `rate` bytes/s: cada operación reserva su hueco en el
+    tiempo y se espera hasta él.
+    """
+
+    def __init__(self, rate: float, stop: threading.Event):
+        self.rate = rate
+        self._stop = stop
+        self._next = time.monotonic()
+
+    def consume(self, nbytes: int) -> None:
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        self._next = max(self._next, now) + nbytes / self.rate
+        delay = self._next - now
+        if delay > 0:
+            self._stop.wait(delay)
+
+
+class RetentionCompactor:
+    """
+    Aplica las políticas de retención en segundo plano.
+
+    Cada `interval` segundos recorre, por proyecto, las capturas que han superado
+    `full_days` desde la última que trató (cursor guardado en el catálogo, así que
+    cada captura se trata una sola vez): conserva una de cada `keep_every` y, si hay
+    `downsample`, la reduce; el resto se borra (foto, metadatos y versiones reducidas).
+    Un keyframe de dedup que aún usa algún delta no se toca: lo que le tocaba se
+    aplaza (en el catálogo) hasta que la retención borra el último delta que lo usa.
+
+    Nunca retrasa una captura: el hilo tiene prioridad mínima, la E/S está limitada a
+    `io_rate` bytes/s y antes de cada fichero espera mientras `busy()` sea cierto
+    (p. ej. mientras el pipeline tiene fotos pendientes de escribir).
+    """
+
+    def __init__(
+        self,
+        catalog: CaptureCatalog,
+        registry: ProjectRegistry,
+        renditions: Optional[RenditionService] = None,
+        interval: float = 3600.0,
+        io_rate: float = 2 * 1024 * 1024,
+        busy: Optional[Callable[[], bool]] = None,
+        batch: int = 100,
+        quality: int = 85,
+    ):
+        self.catalog = catalog
+        self.registry = registry
+        self.renditions = renditions
+        self.interval = interval
+        self.busy = busy
+        self.batch = batch
+        self.quality = quality
+        self._stop = threading.Event()
+        self._throttle = _Throttle(io_rate, self._stop)
+        self._run_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stats_lock = threading.Lock()
+        self.passes = 0
+        self.deleted = 0
+        self.downsampled = 0
+        self.bytes_freed = 0
+        self.last_pass: Optional[dict] = None
+
+    # --- ciclo de vida ---
+    def start(self) -> "RetentionCompactor":
+        self._thread = threading.Thread(target=self._loop, name="retention", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self) -> None:
+        try:
+            # Prioridad mínima de CPU solo para este hilo (Linux)
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except (AttributeError, OSError):
+            pass
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                log.exception("Retention pass failed")
+
+    # --- compactación ---
+    def run_once(self, project: Optional[str] = None) -> dict:
+        """
+        Una pasada de retención (de un proyecto o de todos). Devuelve el resumen.
+        """
+        with self._run_lock:
+            started = time.time()
+            summary = {"deleted": 0, "downsampled": 0, "bytes_freed": 0}
+            names = [project] if project is not None else self.registry.names()
+            for name in names:
+                config = self.registry.get(name)
+                if config is None:
+                    continue
+                try:
+                    policy = parse_policy(config)
+                except (TypeError, ValueError) as e:
+                    log.warning("Invalid retention policy in %s: %s", name, e)
+                    continue
+                if policy is None:
+                    continue
+                self._compact_project(name, policy, summary)
+                if self._stop.is_set():
+                    break
+
+            summary.update({"started": started, "duration": round(time.time() - started, 3)})
+            with self._stats_lock:
+                self.passes += 1
+                self.deleted += summary["deleted"]
+                self.downsampled += summary["downsampled"]
+                self.bytes_freed += summary["bytes_freed"]
+                self.last_pass = summary
+            return summary
+
+    def _wait_idle(self) -> None:
+        while self.busy is not None and self.busy() and not self._stop.is_set():
+            self._stop.wait(0.5)
+
+    def _compact_project(self, name: str, policy: dict, summary: dict) -> None:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=policy["full_days"])
+        cursor, seq = self.catalog.retention_state(name)
+        while not self._stop.is_set():
+            items = self.catalog.aged(name, cutoff, cursor, self.batch)
+            if not items:
+                return
+            for item_cursor, item in items:
+                self._wait_idle()
+                if self._stop.is_set():
+                    return
+                if seq % policy["keep_every"]:
+                    action = "delete"
+                else:
+                    action = "downsample" if policy["downsample"] is not None else None
+                dedup = (item.get("metadata") or {}).get("dedup") or {}
+                try:
+                    if action and dedup.get("action") == "keyframe" and self.catalog.keyframe_users(name, item["filename"]):
+                        # Los deltas que lo usan se reconstruyen a partir del original
+                        self.catalog.hold(name, item["filename"], action)
+                    else:
+                        self._apply(item, action, policy, summary)
+                        if action == "delete" and dedup.get("action") == "delta":
+                            self._release_keyframe(name, dedup.get("keyframe"), policy, summary)
+                except OSError as e:
+                    log.warning("Retention failed for %s/%s: %s", name, item["filename"], e)
+                seq += 1
+                cursor = item_cursor
+                self.catalog.set_retention_state(name, cursor, seq)
+
+    def _apply(self, item: dict, action: Optional[str], policy: dict, summary: dict) -> None:
+        if action == "delete":
+            self._delete(item, summary)
+        elif action == "downsample" and policy["downsample"] is not None:
+            self._downsample(item, policy["downsample"], summary)
+
+    def _release_keyframe(self, name: str, keyframe: Optional[str], policy: dict, summary: dict) -> None:
+        """
+        Aplica lo aplazado de un keyframe en cuanto no lo usa ningún delta.
+        """
+        if not keyframe or self.catalog.keyframe_users(name, keyframe):
+            return
+        action = self.catalog.take_held(name, keyframe)
+        item = self.catalog.get(name, keyframe) if action else None
+        if item is not None:
+            self._apply(item, action, policy, summary)
+
+    def _delete(self, item: dict, summary: dict) -> None:
+        path = Path(item["path"])
+        files = [path, *_sidecars(path)]
+        if self.renditions is not None:
+            files += [self.renditions.path_for(item["project"], item["filename"], s) for s in self.renditions.sizes]
+        for f in files:
+            try:
+                size = f.stat().st_size
+                f.unlink()
+            except FileNotFoundError:
+                continue
+            summary["bytes_freed"] += size
+        self.catalog.delete(item["project"], item["filename"])
+        summary["deleted"] += 1
+
+    def _downsample(self, item: dict, size: int, summary: dict) -> None:
+        path = Path(item["path"])
+        if path.suffix.lower() in (".npy", ".npz"):
+            # Fotogramas en bruto para análisis y diferencias: se conservan o se borran, no se reducen
+            return
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return
+        with Image.open(path) as img:
+            if max(img.size) <= size:
+                return
+            self._throttle.consume(st.st_size)
+            fmt = img.format or "JPEG"
+            img.draft("RGB", (size, size))
+            img = img.convert("RGB")
+            img.thumbnail((size, size), Image.Resampling.LANCZOS)
+            tmp = path.with_name(f".{path.name}.retention.tmp")
+            img.save(tmp, fmt, **({"quality": self.quality} if fmt == "JPEG" else {}))
+
+        new_size = tmp.stat().st_size
+        self._throttle.consume(new_size)
+        # Se conserva el mtime: las versiones reducidas ya generadas siguen siendo válidas
+        os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.replace(tmp, path)
+        self.catalog.update_size(item["project"], item["filename"], new_size)
+        summary["downsampled"] += 1
+        summary["bytes_freed"] += st.st_size - new_size
+
+    def status(self) -> dict:
+        with self._stats_lock:
+            return {
+                "interval": self.interval,
+                "passes": self.passes,
+                "deleted": self.deleted,
+                "downsampled": self.downsampled,
+                "bytes_freed": self.bytes_freed,
+                "last_pass": self.last_pass,
+            }
@@ -0,0 +1,258 @@
+from __future__ import annotations
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+
+from app.infrastructure.simulator.latency import SENSORS, LatencyModel
+
+# Exposición de referencia del simulador (coincide con config_picture de meapis)
+BASE_EXPOSURE_TIME = 10000  # µs
+BASE_ANALOGUE_GAIN = 1.0
+
+# LensPosition enfocada por defecto (centro del rango macro de meapis)
+FOCUS_POSITION = 8.0
+
+# Radiancia del fondo con la luz encendida: con la exposición de referencia se satura (>1)
+LAMP_LEVEL = 1.6
+
+# Valores de ruido precalculados por escena (float32); generar ruido nuevo en cada foto es
+# lo más caro del render. Las escenas más grandes generan el suyo cada vez.
+NOISE_BANK_SIZE = 8 * 1024 * 1024
+
+
+def box_blur(img: np.ndarray, radius: int) -> np.ndarray:
+    """
+    Desenfoque de caja separable (sumas acumuladas) de un array (H, W, C) float32.
+    """
+    if radius <= 0:
+        return img
+    k = 2 * radius + 1
+    for axis in (0, 1):
+        pad = [(0, 0)] * img.ndim
+        pad[axis] = (radius + 1, radius)
+        c = np.cumsum(np.pad(img, pad, mode="edge"), axis=axis, dtype=np.float32)
+        img = (c[k:] - c[:-k]) / k if axis == 0 else (c[:, k:] - c[:, :-k]) / k
+    return img
+
+
+class PlantScene:
+    """
+    Bandeja con `plants` rosetas sobre fondo claro (como en los ensayos LGP) que
+    crecen con el tiempo simulado, vista por una cámara de `width` x `height`.
+
+    - Crecimiento logístico: cada planta alcanza su tamaño final en ~`growth_days` días.
+    - Día/noche: luz ambiente según la hora del tiempo simulado; la lámpara se suma
+      cuando está encendida.
+    - Desenfoque proporcional a la distancia entre LensPosition y `focus`.
+    - Ruido de disparo y de lectura del sensor, que crece con la ganancia.
+
+    El tiempo simulado avanza `time_scale` veces más rápido que el real desde `start`
+    (p. ej. 3600: una hora por segundo). La disposición depende solo de `seed`, así que
+    la misma escena a distintas resoluciones (foto y preview) coincide.
+    """
+
+    def __init__(
+        self,
+        width: int = 1280,
+        height: int = 720,
+        plants: int = 6,
+        seed: int = 0,
+        focus: float = FOCUS_POSITION,
+        growth_days: float = 14.0,
+        time_scale: float = 1.0,
+        start: Optional[float] = None,
+    ):
+        self.width = width
+        self.height = height
+        self.focus = focus
+        self.growth_days = growth_days
+        self.time_scale = time_scale
+        self.start = time.time() if start is None else start
+        self._noise_rng = np.random.default_rng(seed + 1)
+        self._noise_lock = threading.Lock()
+        size = width * height * 3
+        self._noise_bank = (
+            self._noise_rng.standard_normal(size + 65536, dtype=np.float32) if size <= NOISE_BANK_SIZE else None
+        )
+
+        rng = np.random.default_rng(seed)
+        aspect = height / width
+        self._x = np.linspace(0.0, 1.0, width, dtype=np.float32)[None, :]
+        self._y = np.linspace(0.0, aspect, height, dtype=np.float32)[:, None]
+
+        # Plantas en rejilla con algo de desorden: centro, hojas, tamaño final, desfase de crecimiento y color
+        cols = int(np.ceil(np.sqrt(plants / aspect)))
+        rows = int(np.ceil(plants / cols))
+        self.plants = []
+        for i in range(plants):
+            r, c = divmod(i, cols)
+            self.plants.append({
+                "cx": (c + 0.5 + rng.uniform(-0.15, 0.15)) / cols,
+                "cy": (r + 0.5 + rng.uniform(-0.15, 0.15)) / rows * aspect,
+                "leaves": int(rng.integers(5, 9)),
+                "phase": float(rng.uniform(0, 2 * np.pi)),
+                "radius": float(rng.uniform(0.35, 0.45) / max(cols, rows)),
+                "lag": float(rng.uniform(-0.15, 0.15)),
+                "color": (float(rng.uniform(0.03, 0.06)), float(rng.uniform(0.12, 0.2)), float(rng.uniform(0.02, 0.05))),
+            })
+
+        # Textura estática del fondo: manchas suaves + grano fino
+        coarse = rng.random((height // 32 + 2, width // 32 + 2), dtype=np.float32)
+        coarse = np.kron(coarse, np.ones((32, 32), dtype=np.float32))[:height, :width, None]
+        coarse = box_blur(coarse, 16)[..., 0]
+        grain = rng.random((height, width), dtype=np.float32)
+        self._background = (0.78 + 0.1 * coarse + 0.03 * grain)[..., None] * np.array((0.98, 0.97, 0.92), dtype=np.float32)
+
+    # --- tiempo simulado ---
+    def sim_time(self, now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        return self.start + (now - self.start) * self.time_scale
+
+    def daylight(self, t: float) -> float:
+        """
+        Luz natural (0 de noche, 1 a mediodía) a la hora local de `t`.
+        """
+        dt = datetime.fromtimestamp(t)
+        hour = dt.hour + dt.minute / 60 + dt.second / 3600
+        return max(0.0, float(np.sin(np.pi * (hour - 6.0) / 12.0)))
+
+    def growth(self, plant: dict, t: float) -> float:
+        """
+        Fracción (0-1) del tamaño final de `plant` en el tiempo simulado `t`.
+        """
+        age = (t - self.start) / 86400 / self.growth_days - 0.5 + plant["lag"]
+        return 0.15 + 0.85 / (1.0 + np.exp(-10.0 * age))
+
+    # --- render ---
+    def reflectance(self, t: float) -> np.ndarray:
+        img = self._background.copy()
+        for p in self.plants:
+            radius = p["radius"] * self.growth(p, t)
+            # Solo la caja que contiene la planta
+            x0, x1 = np.searchsorted(self._x[0], (p["cx"] - radius, p["cx"] + radius))
+            y0, y1 = np.searchsorted(self._y[:, 0], (p["cy"] - radius, p["cy"] + radius))
+            if x0 >= x1 or y0 >= y1:
+                continue
+            dx = self._x[:, x0:x1] - p["cx"]
+            dy = self._y[y0:y1] - p["cy"]
+            dist = np.sqrt(dx * dx + dy * dy)
+            theta = np.arctan2(dy, dx)
+            # Roseta: radio modulado por el ángulo (una hoja por lóbulo)
+            lobes = np.abs(np.cos(p["leaves"] / 2.0 * (theta - p["phase"]))) ** 0.6
+            leaf = dist < radius * (0.25 + 0.75 * lobes)
+            # Nervio central más claro y bordes más oscuros
+            shade = 0.8 + 0.4 * (1.0 - dist / max(radius, 1e-6))
+            region = img[y0:y1, x0:x1]
+            region[leaf] = np.asarray(p["color"], dtype=np.float32) * shade[leaf][:, None]
+        return img
+
+    def radiance(self, t: Optional[float] = None, light_on: bool = False) -> np.ndarray:
+        """
+        Radiancia relativa (float32, H x W x 3): con la exposición de referencia 1.0
+        corresponde al blanco del sensor.
+        """
+        t = self.sim_time() if t is None else t
+        illumination = 0.05 + 0.55 * self.daylight(t) + (1.0 if light_on else 0.0)
+        return self.reflectance(t) * (LAMP_LEVEL * illumination / 1.05)
+
+    def render(
+        self,
+        lens_position: Optional[float] = None,
+        exposure_time: float = BASE_EXPOSURE_TIME,
+        analogue_gain: float = BASE_ANALOGUE_GAIN,
+        light_on: bool = False,
+        t: Optional[float] = None,
+        out: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Fotograma RGB uint8 tal como lo leería el sensor.
+        """
+        signal = self.radiance(t, light_on) * (255.0 * (exposure_time / BASE_EXPOSURE_TIME) * (analogue_gain / BASE_ANALOGUE_GAIN))
+
+        if lens_position is not None:
+            # ~4 px de radio (a 1000 px de ancho) por unidad de LensPosition desenfocada
+            signal = box_blur(signal, int(round(abs(lens_position - self.focus) * 4.0 * self.width / 1000)))
+
+        # Ruido de disparo (varianza proporcional a la señal) y de lectura, ambos escalados por la ganancia
+        with self._noise_lock:
+            if self._noise_bank is None:
+                noise = self._noise_rng.standard_normal(signal.shape, dtype=np.float32)
+            else:
+                offset = int(self._noise_rng.integers(0, len(self._noise_bank) - signal.size))
+                noise = self._noise_bank[offset:offset + signal.size].reshape(signal.shape)
+        sigma = np.sqrt(np.maximum(signal, 0.0) * (0.08 * analogue_gain) + (1.5 * analogue_gain) ** 2)
+        signal += noise * sigma
+
+        out = np.empty(signal.shape, dtype=np.uint8) if out is None else out
+        np.clip(signal, 0, 255, out=out, casting="unsafe")
+        return out
+
+
+def frame_size(sensor: str, width: int) -> tuple[int, int]:
+    """
+    Tamaño de los fotogramas simulados de `sensor`: `width` px de ancho con su
+    relación de aspecto (0: resolución completa del sensor).
+    """
+    full_w, full_h = SENSORS[sensor]["resolution"]
+    if width <= 0 or width >= full_w:
+        return full_w, full_h
+    return width, int(round(full_h * width / full_w))
+
+
+class SimulatedCamera:
+    """
+    Cámara simulada: escena de plantas (`PlantScene`) y tiempos del sensor (`LatencyModel`).
+
+    Como en meapis, en frío cada foto arranca el sensor (sensor_start) y en modo
+    `warm` solo se paga el primero. La preview usa una escena de menor resolución
+    con la misma disposición.
+    """
+
+    def __init__(self, latency: LatencyModel, width: int = 1280, preview_size: tuple[int, int] = (640, 360), **scene_options):
+        self.latency = latency
+        self.sensor = latency.sensor
+        self.scene = PlantScene(*frame_size(self.sensor, width), **scene_options)
+        self.preview_scene = PlantScene(*preview_size, **{**scene_options, "start": self.scene.start})
+        self._running = False
+
+    def capture(
+        self,
+        lens_position: Optional[float] = None,
+        exposure_time: float = BASE_EXPOSURE_TIME,
+        analogue_gain: float = BASE_ANALOGUE_GAIN,
+        light_on: bool = False,
+        warm: bool = False,
+    ) -> np.ndarray:
+        if not (warm and self._running):
+            self.latency.pad("sensor_start", time.perf_counter())
+        self._running = warm
+
+        started = time.perf_counter()
+        frame = self.scene.render(lens_position, exposure_time, analogue_gain, light_on)
+        self.latency.pad("readout", started, exposure_time=exposure_time)
+        return frame
+
+    def capture_stack(self, bracket: list[dict], light_on: bool = False, lens_position: Optional[float] = None) -> np.ndarray:
+        """
+        Ráfaga de fotogramas (N, H, W, 3) con la cámara en marcha: un arranque y una
+        lectura por fotograma. Cada elemento de `bracket` puede fijar ExposureTime/AnalogueGain.
+        """
+        self.latency.pad("sensor_start", time.perf_counter())
+        stack = np.empty((len(bracket), self.scene.height, self.scene.width, 3), dtype=np.uint8)
+        t = self.scene.sim_time()
+        for i, controls in enumerate(bracket):
+            started = time.perf_counter()
+            exposure_time = controls.get("ExposureTime", BASE_EXPOSURE_TIME)
+            self.scene.render(
+                lens_position, exposure_time, controls.get("AnalogueGain", BASE_ANALOGUE_GAIN),
+                light_on, t=t, out=stack[i],
+            )
+            self.latency.pad("readout", started, exposure_time=exposure_time)
+        self._running = False
+        return stack
+
+    def preview(self, light_on: bool = False) -> np.ndarray:
+        return self.preview_scene.render(light_on=light_on)
@@ -0,0 +1,125 @@
+from __future__ import annotations
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+from app.infrastructure.common.encoders import Encoded, EncoderPool, FrameEncoder
+from app.infrastructure.common.ingest import FrameIngest
+from app.infrastructure.common.metrics import MetricsRegistry
+from app.infrastructure.common.pipeline import CapturePipeline
+
+# Perfiles de las cámaras de meapis (cámara 0 = OwlSight, 1 = V3). Tiempos en segundos,
+# estimados en una Raspberry Pi 5 con picamera2 y la foto a resolución completa:
+# - sensor_start:  picam2.start() en frío hasta el primer fotograma (en modo warm no se paga)
+# - readout:       lectura de un fotograma completo (inversa de los fps del modo más grande)
+# - encode_per_mp: codificación JPEG por megapíxel en la CPU
+# - light_warmup:  desde que se activa el GPIO hasta que la luz es estable
+SENSORS = {
+    "owlsight": {
+        "model": "ov64a40",
+        "resolution": (9152, 6944),
+        "sensor_start": 0.6,
+        "readout": 0.37,
+        "encode_per_mp": 0.03,
+        "light_warmup": 0.05,
+    },
+    "v3": {
+        "model": "imx708_noir",
+        "resolution": (4608, 2592),
+        "sensor_start": 0.35,
+        "readout": 0.07,
+        "encode_per_mp": 0.03,
+        "light_warmup": 0.05,
+    },
+}
+
+PHASES = ("sensor_start", "readout", "encode", "light_warmup")
+
+
+def sensor_for_camera(camera: int) -> str:
+    """
+    Perfil de la cámara `camera` del simulador, con la numeración de meapis.
+    """
+    return "owlsight" if camera % 2 == 0 else "v3"
+
+
+class LatencyModel:
+    """
+    Tiempos de hardware de un sensor (ver SENSORS), multiplicados por `scale`
+    (0: sin esperas, 1: tiempo real) y con un jitter log-normal de desviación `jitter`.
+    Las esperas descuentan el tiempo ya gastado calculando el fotograma: `pad` duerme
+    solo hasta `started + duración`.
+    """
+
+    def __init__(self, sensor: str = "v3", scale: float = 1.0, jitter: float = 0.1, seed: Optional[int] = 0, **overrides):
+        if sensor not in SENSORS:
+            raise ValueError(f"Sensor desconocido: {sensor} (disponibles: {', '.join(SENSORS)})")
+        self.sensor = sensor
+        self.profile = {**SENSORS[sensor], **overrides}
+        self.scale = scale
+        self.jitter = jitter
+        self._rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def megapixels(self) -> float:
+        width, height = self.profile["resolution"]
+        return width * height / 1e6
+
+    def duration(self, phase: str, exposure_time: Optional[float] = None) -> float:
+        """
+        Duración simulada de una fase. `exposure_time` (µs) alarga la lectura si
+        la exposición es más larga que el fotograma.
+        """
+        if phase == "encode":
+            base = self.profile["encode_per_mp"] * self.megapixels
+        elif phase == "readout":
+            base = max(self.profile["readout"], (exposure_time or 0) / 1e6)
+        elif phase in PHASES:
+            base = self.profile[phase]
+        else:
+            raise ValueError(f"Fase desconocida: {phase}")
+        if self.scale <= 0:
+            return 0.0
+        with self._lock:
+            factor = float(self._rng.lognormal(0.0, self.jitter)) if self.jitter > 0 else 1.0
+        return base * factor * self.scale
+
+    def pad(self, phase: str, started: float, **kwargs) -> float:
+        """
+        Espera hasta que haya pasado la duración de `phase` desde `started`
+        (time.perf_counter()). Devuelve la duración simulada.
+        """
+        duration = self.duration(phase, **kwargs)
+        remaining = started + duration - time.perf_counter()
+        if remaining > 0:
+            time.sleep(remaining)
+        return duration
+
+
+class SimulatedIngest(FrameIngest):
+    """
+    Ingesta del simulador: la codificación tarda lo que tardaría la foto a resolución
+    completa del sensor de cada cámara (`latencies`: etiqueta de cámara -> LatencyModel).
+    """
+
+    def __init__(
+        self,
+        pipeline: CapturePipeline,
+        metrics: Optional[MetricsRegistry] = None,
+        latencies: Optional[dict[str, LatencyModel]] = None,
+        encoders: Optional[EncoderPool] = None,
+    ):
+        super().__init__(pipeline, metrics=metrics, encoders=encoders)
+        self.latencies = latencies or {}
+
+    def _encode(self, frame: np.ndarray, meta: dict, encoder: FrameEncoder) -> Encoded:
+        started = time.perf_counter()
+        data = super()._encode(frame, meta, encoder)
+        latency = self.latencies.get(meta.get("camera"))
+        # El perfil es de JPEG: npy no se codifica y las diferencias ya tardan lo suyo
+        if latency is not None and encoder.format not in ("npy", "delta"):
+            latency.pad("encode", started)
+        return data
@@ -0,0 +1,38 @@
+import threading
+import time
+
+
+class FakeLight:
+    """
+    Luz simulada con la interfaz de meapis `Light` (turn_on / turn_off / close).
+    Al encenderse tarda `warmup` segundos en estabilizarse, como la luz real.
+    """
+
+    def __init__(self, warmup: float = 0.0):
+        self.warmup = warmup
+        self._lock = threading.Lock()
+        self.on = False
+        self._closed = False
+
+    def turn_on(self) -> None:
+        with self._lock:
+            if self._closed or self.on:
+                return
+            self.on = True
+            if self.warmup > 0:
+                time.sleep(self.warmup)
+
+    def turn_off(self) -> None:
+        with self._lock:
+            if not self._closed:
+                self.on = False
+
+    def close(self) -> None:
+        with self._lock:
+            self.on = False
+            self._closed = True
+
+    @property
+    def is_closed(self) -> bool:
+        with self._lock:
+            return self._closed
@@ -1,30 +1,101 @@
 from pathlib import Path
+from concurrent.futures import Future
 from datetime import datetime
-import json
-from apscheduler.schedulers.background import BackgroundScheduler
-from PIL import Image, ImageDraw
-from app.infrastructure.projects_fs import discover_projects
+from typing import Callable, Optional
+import threading
+import time
+import numpy as np
+from app.infrastructure.common.capture_batcher import CaptureBatcher
+from app.infrastructure.common.encoders import EncoderPool, encoder_for
+from app.infrastructure.common.imaging import exposure_fusion
+from app.infrastructure.common.ingest import IngestStage
+from app.infrastructure.common.light import LightArbiter
+from app.infrastructure.common.metrics import MetricsRegistry, capture_phases
+from app.infrastructure.common.pipeline import CapturePipeline
+from app.infrastructure.common.scheduler import CaptureScheduler, parse_misfire
+from app.infrastructure.projects_fs import ProjectRegistry
+from app.infrastructure.simulator.camera_fake import BASE_ANALOGUE_GAIN, BASE_EXPOSURE_TIME, SimulatedCamera
+from app.infrastructure.simulator.latency import LatencyModel, SimulatedIngest, sensor_for_camera
+from app.infrastructure.simulator.light_fake import FakeLight
 
 class FakeRunner:
-    def __init__(self, data_dir: Path):
+    """
+    Simulador con `cameras` cámaras virtuales: un proyecto por cámara a la vez,
+    cada uno con su propio job. La luz se comparte a través de un árbitro.
+
+    Cada cámara ve una escena de plantas que crecen (`PlantScene`, el tiempo simulado
+    avanza `time_scale` veces más rápido) con los tiempos de su sensor real (cámara
+    par OwlSight 64MP, impar V3) multiplicados por `latency` (0: sin esperas).
+    Los fotogramas se generan con `frame_width` px de ancho (0: resolución completa).
+    """
+
+    def __init__(
+        self,
+        data_dir: Path,
+        pipeline: Optional[CapturePipeline] = None,
+        registry: Optional[ProjectRegistry] = None,
+        cameras: int = 2,
+        batch_window: float = 0.3,
+        sidecars: bool = False,
+        metrics: Optional[MetricsRegistry] = None,
+        latency: float = 0.0,
+        frame_width: int = 1280,
+        time_scale: float = 1.0,
+        encoders: Optional[EncoderPool] = None,
+        autostart: bool = True,
+    ):
         self.data_dir = data_dir
+        self.metrics = metrics or MetricsRegistry()
+        self._phases = capture_phases(self.metrics)
         self.projects_dir = data_dir / "projects"
         self.media_dir = data_dir / "media"
         self.current_file = self.projects_dir / "current.txt"
+        # Configuración de los proyectos en memoria, al día con watchdog
+        self.registry = registry or ProjectRegistry(self.projects_dir).start()
 
-        self.scheduler = BackgroundScheduler()
-        self.scheduler.start()
+        # Capturas sobre una rejilla fija de tiempo, con política propia ante retrasos por proyecto
+        self.scheduler = CaptureScheduler(metrics=self.metrics)
 
-        self.curr_project = None
-        self.job_id = "capture_job"
+        self.cameras = cameras
+        # nombre -> proyecto en marcha; como mucho uno por cámara
+        self.projects: dict[str, dict] = {}
+        self._lock = threading.RLock()
+        # proyecto -> (último segundo usado en un nombre de fichero, veces que se ha repetido)
+        self._stamps: dict[str, tuple[str, int]] = {}
         self.last_capture = None
+        # Cada cámara es única: su captura y su preview no pueden usarla a la vez
+        self._camera_locks = [threading.Lock() for _ in range(cameras)]
+        self.sim_cameras = [
+            SimulatedCamera(
+                LatencyModel(sensor_for_camera(i), scale=latency, seed=i),
+                width=frame_width, seed=i, time_scale=time_scale,
+            )
+            for i in range(cameras)
+        ]
+        self._light = FakeLight(warmup=LatencyModel(scale=latency, jitter=0).duration("light_warmup"))
+        self.light = LightArbiter(self._light, metrics=self.metrics)
+        # Capturas programadas que vencen casi a la vez comparten una sesión de luz
+        self.batcher = CaptureBatcher(self.light, window=batch_window)
+        # Codificación y escritura fuera del hilo de captura
+        self.pipeline = pipeline or CapturePipeline(metrics=self.metrics)
+        self.ingest = SimulatedIngest(
+            self.pipeline, metrics=self.metrics, encoders=encoders,
+            latencies={self._camera_label(i): cam.latency for i, cam in enumerate(self.sim_cameras)},
+        )
+        self.ingest.add_listener(self._set_last_capture)
+        # Los metadatos van al log del proyecto; el <foto>.json por captura es opcional
+        self.sidecars = sidecars
 
-        initial = self._read_text(self.current_file)
-        if initial:
+        # Sin autostart, los proyectos de current.txt se arrancan en start_initial_projects
+        if autostart:
+            self.start_initial_projects()
+
+    def start_initial_projects(self) -> None:
+        for name in self._read_text(self.current_file).splitlines():
             try:
-                self.start_project(initial)
-            except FileNotFoundError:
-                self.curr_project = None
+                self.start_project(name.strip())
+            except (FileNotFoundError, ValueError):
+                pass
 
     # --- helpers ---
     def _read_text(self, path: Path) -> str:
@@ -32,90 +103,313 @@ class FakeRunner:
             return ""
         return path.read_text(encoding="utf-8").strip()
 
-    def _read_json(self, path: Path) -> dict:
-        return json.loads(path.read_text(encoding="utf-8"))
-
     def _write_text(self, path: Path, content: str) -> None:
         path.parent.mkdir(parents=True, exist_ok=True)
         path.write_text(content, encoding="utf-8")
 
+    @staticmethod
+    def _camera_label(camera: int) -> str:
+        return f"SIM{camera}"
+
+    def _save_current(self) -> None:
+        self._write_text(self.current_file, "\n".join(self.projects))
+
+    def _set_last_capture(self, meta: dict) -> None:
+        self.last_capture = meta
+        proj = self.projects.get(meta["project"])
+        if proj is not None:
+            proj["last_capture"] = meta
+
+    def _submit_frame(self, proj: dict, frame, meta: dict) -> Future:
+        sidecar_path = Path(f'{meta["path"]}.json') if self.sidecars else None
+        return self.ingest.submit(frame, meta, sidecar_path=sidecar_path, encoder=proj["encoder"])
+
+    def _project(self, name: Optional[str]) -> dict:
+        """
+        Proyecto en marcha por nombre; sin nombre, el único que haya.
+        """
+        with self._lock:
+            if name is not None:
+                proj = self.projects.get(name)
+                if proj is None:
+                    raise RuntimeError(f"Proyecto no activo: {name}")
+                return proj
+            if not self.projects:
+                raise RuntimeError("No hay proyecto activo")
+            if len(self.projects) > 1:
+                raise RuntimeError("Hay varios proyectos activos: indica el proyecto")
+            return next(iter(self.projects.values()))
+
     # --- API del runner ---
+    def add_capture_listener(self, listener: Callable[[dict], None]) -> None:
+        self.ingest.add_listener(listener)
+
+    def add_ingest_stage(self, stage: IngestStage) -> None:
+        self.ingest.add_stage(stage)
+
     def list_projects(self) -> list[str]:
-        return discover_projects(self.projects_dir)
+        return self.registry.names()
+
+    def active_projects(self) -> list[str]:
+        with self._lock:
+            return list(self.projects)
 
     def start_project(self, name: str) -> None:
-        cfg_path = self.projects_dir / name / "config.json"
-        if not cfg_path.exists():
-            raise FileNotFoundError(str(cfg_path))
-        cfg = self._read_json(cfg_path)
-
-        self.curr_project = {
-            "name": name,
-            "filename": cfg.get("filename", name),
-            "interval": int(cfg.get("interval", 10)),
-        }
-        self._write_text(self.current_file, name)
-
-        self.scheduler.add_job(
-            self._scheduled_capture,
-            "interval",
-            seconds=self.curr_project["interval"],
-            id=self.job_id,
-            replace_existing=True,
-        )
+        cfg = self.registry.get(name)
+        if cfg is None:
+            raise FileNotFoundError(str(self.projects_dir / name / "config.json"))
+        camera = int(cfg.get("camera", 0))
+        if not 0 <= camera < self.cameras:
+            raise ValueError(f"Cámara no disponible: {camera} (el simulador tiene {self.cameras})")
+        misfire, misfire_grace = parse_misfire(cfg)
+        encoder = encoder_for(cfg)
 
-    def stop_project(self) -> None:
-        try:
-            self.scheduler.remove_job(self.job_id)
-        except Exception:
-            pass
-        self.curr_project = None
+        with self._lock:
+            # Arrancar un proyecto sustituye al que usara la misma cámara
+            for other in list(self.projects.values()):
+                if other["name"] == name or other["camera"] == camera:
+                    self.stop_project(other["name"])
 
-    def capture_now(self) -> dict:
-        if not self.curr_project:
-            raise RuntimeError("No hay proyecto activo")
+            proj = {
+                "name": name,
+                "filename": cfg.get("filename", name),
+                "interval": int(cfg.get("interval", 10)),
+                "camera": camera,
+                "use_light": bool(cfg.get("use_light", True)),
+                "warm_camera": bool(cfg.get("warm_camera", False)),
+                "encoder": encoder,
+                # Ajustes de cámara como los guarda meapis; sin LensPosition la foto sale enfocada
+                "LensPosition": cfg.get("LensPosition"),
+                "ExposureTime": cfg.get("ExposureTime", BASE_EXPOSURE_TIME),
+                "AnalogueGain": cfg.get("AnalogueGain", BASE_ANALOGUE_GAIN),
+                "misfire": misfire,
+                "misfire_grace": misfire_grace,
+                "job_id": f"capture_job-{name}",
+                "last_capture": None,
+            }
+            self.projects[name] = proj
+            self._save_current()
 
-        proj = self.curr_project
-        out_dir = self.media_dir / proj["name"]
-        out_dir.mkdir(parents=True, exist_ok=True)
+            self.scheduler.add(
+                proj["job_id"],
+                lambda: self._scheduled_capture(name),
+                proj["interval"],
+                misfire=misfire,
+                grace=misfire_grace,
+            )
+
+    def stop_project(self, name: Optional[str] = None) -> None:
+        """
+        Para un proyecto, o todos si no se indica.
+        """
+        with self._lock:
+            names = list(self.projects) if name is None else [name]
+            for n in names:
+                proj = self.projects.pop(n, None)
+                if proj is None:
+                    continue
+                self.scheduler.remove(proj["job_id"])
+            self._save_current()
+
+    def capture_now(self, wait: bool = False, project: Optional[str] = None) -> dict:
+        """
+        Captura y devuelve los metadatos en cuanto el fotograma está tomado.
+        Con `wait` espera además a que la imagen esté escrita en disco.
+        """
+        meta, persisted = self.submit_capture(project)
+        if wait:
+            return persisted.result()
+        return meta
 
+    def submit_capture(self, project: Optional[str] = None) -> tuple[dict, Future]:
+        """
+        Toma el fotograma y encola su persistencia.
+        Devuelve (metadatos, Future que se resuelve con los metadatos ya escritos).
+        """
+        proj = self._project(project)
+        light = self.light.handle(proj["camera"])
+
+        with self._camera_locks[proj["camera"]]:
+            t0 = time.perf_counter()
+            if proj["use_light"]:
+                light.turn_on()
+            try:
+                t1 = time.perf_counter()
+                frame, meta = self._grab(proj)
+                t2 = time.perf_counter()
+            finally:
+                light.turn_off()
+
+        self._phases.observe(t1 - t0, phase="light_on")
+        self._phases.observe(t2 - t1, phase="frame")
+        return meta, self._submit_frame(proj, frame, meta)
+
+    def _stamp(self, project: str) -> tuple[str, str]:
+        """
+        (timestamp_utc, sello para el nombre de fichero). Las capturas del mismo segundo
+        llevan _1, _2... para no sobrescribirse: la escritura es asíncrona, así que el
+        nombre se reserva aquí y no comprobando el disco.
+        """
         ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        filename = f'{proj["filename"]}_{ts}.jpg'
-        img_path = out_dir / filename
+        with self._lock:
+            last, count = self._stamps.get(project, (None, 0))
+            count = count + 1 if last == ts else 0
+            self._stamps[project] = (ts, count)
+        return ts, f"{ts}_{count}" if count else ts
+
+    def _grab(self, proj: dict) -> tuple[np.ndarray, dict]:
+        ts, stamp = self._stamp(proj["name"])
+        filename = f'{proj["filename"]}_{stamp}.{proj["encoder"].extension}'
+        img_path = self.media_dir / proj["name"] / filename
 
-        img = Image.new("RGB", (1280, 720))
-        draw = ImageDraw.Draw(img)
-        draw.text((20, 20), f"SIM CAPTURE\n{proj['name']}\n{ts}", fill=(255, 255, 255))
-        img.save(img_path, "JPEG", quality=90)
+        camera = self.sim_cameras[proj["camera"]]
+        frame = camera.capture(
+            lens_position=proj["LensPosition"],
+            exposure_time=proj["ExposureTime"],
+            analogue_gain=proj["AnalogueGain"],
+            light_on=self._light.on,
+            warm=proj["warm_camera"],
+        )
 
         meta = {
             "project": proj["name"],
             "filename": filename,
             "timestamp_utc": ts,
             "path": str(img_path),
-            "camera": "SIM",
+            "camera": self._camera_label(proj["camera"]),
+            "metadata": {
+                "ExposureTime": proj["ExposureTime"],
+                "AnalogueGain": proj["AnalogueGain"],
+                "LensPosition": proj["LensPosition"] if proj["LensPosition"] is not None else camera.scene.focus,
+            },
         }
+        return frame, meta
 
-        (out_dir / f"{filename}.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
-        self.last_capture = meta
-        return meta
+    def capture_burst(
+        self,
+        frames: int,
+        bracket: Optional[list[dict]] = None,
+        merge: bool = False,
+        wait: bool = False,
+        project: Optional[str] = None,
+    ) -> dict:
+        """
+        Ráfaga de `frames` fotos seguidas; con `bracket` cada foto usa sus propios
+        ExposureTime/AnalogueGain. Con `merge` se añade la fusión de exposiciones.
+        """
+        proj = self._project(project)
+        bracket = bracket or [{}] * frames
+        light = self.light.handle(proj["camera"])
 
-    def _scheduled_capture(self) -> None:
+        ts, stamp = self._stamp(proj["name"])
+        out_dir = self.media_dir / proj["name"]
+        camera = self._camera_label(proj["camera"])
+
+        with self._camera_locks[proj["camera"]]:
+            if proj["use_light"]:
+                light.turn_on()
+            try:
+                # Un único buffer para toda la ráfaga; el "sensor" escribe en él sin copias
+                bracket = [{"ExposureTime": proj["ExposureTime"], "AnalogueGain": proj["AnalogueGain"], **c} for c in bracket]
+                stack = self.sim_cameras[proj["camera"]].capture_stack(
+                    bracket, light_on=self._light.on, lens_position=proj["LensPosition"],
+                )
+                lens_position = proj["LensPosition"] if proj["LensPosition"] is not None else self.sim_cameras[proj["camera"]].scene.focus
+                metas = []
+                for i, controls in enumerate(bracket):
+                    filename = f'{proj["filename"]}_{stamp}_b{i}.{proj["encoder"].extension}'
+                    # Metadatos de cámara en "metadata", como en _grab y en la ráfaga de la Raspberry
+                    metas.append({
+                        "project": proj["name"],
+                        "filename": filename,
+                        "timestamp_utc": ts,
+                        "path": str(out_dir / filename),
+                        "camera": camera,
+                        "metadata": {
+                            "ExposureTime": controls["ExposureTime"],
+                            "AnalogueGain": controls["AnalogueGain"],
+                            "LensPosition": lens_position,
+                        },
+                    })
+            finally:
+                light.turn_off()
+
+        futures = [self._submit_frame(proj, stack[i], m) for i, m in enumerate(metas)]
+
+        merged = None
+        if merge:
+            filename = f'{proj["filename"]}_{stamp}_hdr.{proj["encoder"].extension}'
+            merged = {
+                "project": proj["name"],
+                "filename": filename,
+                "timestamp_utc": ts,
+                "path": str(out_dir / filename),
+                "camera": camera,
+                "metadata": {},
+                "merged_from": [m["filename"] for m in metas],
+            }
+            futures.append(self._submit_frame(proj, lambda: exposure_fusion(stack), merged))
+
+        if wait:
+            results = [f.result() for f in futures]
+            metas, merged = results[:len(metas)], (results[-1] if merge else None)
+
+        return {"frames": metas, "merged": merged}
+
+    def preview_frame(self, project: Optional[str] = None) -> Optional[np.ndarray]:
+        """
+        Fotograma de preview de la escena; None mientras hay una captura en curso
+        en esa cámara (o si no hay tal proyecto en marcha).
+        """
         try:
-            self.capture_now()
-        except Exception:
-            pass
+            proj = self._project(project)
+        except RuntimeError:
+            return None
+        lock = self._camera_locks[proj["camera"]]
+        if not lock.acquire(blocking=False):
+            return None
+        try:
+            return self.sim_cameras[proj["camera"]].preview(light_on=self._light.on)
+        finally:
+            lock.release()
+
+    def stop_preview(self, project: Optional[str] = None) -> None:
+        pass
+
+    def _scheduled_capture(self, name: str) -> None:
+        proj = self.projects.get(name)
+        if proj is None:
+            return
+        # Los fallos los cuenta y registra el scheduler
+        self.batcher.run(lambda: self.submit_capture(name), use_light=proj["use_light"])
 
     def status(self) -> dict:
+        with self._lock:
+            projects = {
+                name: {
+                    "camera": p["camera"], "interval": p["interval"], "misfire": p["misfire"],
+                    "encoder": p["encoder"].name, "last_capture": p["last_capture"],
+                }
+                for name, p in self.projects.items()
+            }
+        only = next(iter(projects)) if len(projects) == 1 else None
         return {
             "env": "sim",
-            "active_project": self.curr_project["name"] if self.curr_project else None,
-            "interval": self.curr_project["interval"] if self.curr_project else None,
+            "active_project": only,
+            "interval": projects[only]["interval"] if only else None,
             "last_capture": self.last_capture,
+            "projects": projects,
+            "cameras": self.cameras,
+            "light": self.light.status(),
+            "batching": self.batcher.stats(),
+            "pipeline": self.pipeline.stats(),
+            "encoders": self.ingest.encoders.stats(),
+            "scheduler": self.scheduler.stats(),
         }
 
     def shutdown(self) -> None:
-        try:
-            self.scheduler.shutdown(wait=False)
-        except Exception:
-            pass
\ No newline at end of file
+        self.scheduler.shutdown(wait=False)
+        self.batcher.shutdown(timeout=5)
+
+        # Termina de escribir lo que quede en cola
+        self.pipeline.shutdown(wait=True)
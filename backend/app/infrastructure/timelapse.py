@@ -0,0 +1,107 @@
+from __future__ import annotations
+import hashlib
+import io
+import logging
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, Optional
+
+from PIL import Image
+
+from app.infrastructure.common.imaging import open_image
+from app.infrastructure.common.mjpeg import mjpeg_part
+from app.infrastructure.db import CaptureCatalog
+from app.infrastructure.renditions import RenditionService
+
+log = logging.getLogger(__name__)
+
+
+class TimelapseRenderer:
+    """
+    Renderiza time-lapses MJPEG como un pipeline de generadores:
+    catálogo (por lotes) -> muestreo cada `step` -> reescalado -> JPEG -> parte multipart.
+    Solo hay un fotograma en memoria a la vez. Los renders completos se guardan en
+    caché por parámetros y se sirven directamente la siguiente vez.
+    """
+
+    def __init__(self, catalog: CaptureCatalog, renditions: RenditionService, cache_dir: Path, quality: int = 80):
+        self.catalog = catalog
+        self.renditions = renditions
+        self.cache_dir = cache_dir
+        self.quality = quality
+
+    def cache_path(
+        self,
+        project: str,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        step: int,
+        size: int,
+    ) -> Path:
+        # La firma del rango invalida la caché si entran o salen capturas
+        count, max_id = self.catalog.range_signature(project, start, end)
+        key = "|".join(str(v) for v in (project, start, end, step, size, count, max_id))
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+        return self.cache_dir / project / f"{digest}.mjpeg"
+
+    # --- etapas del pipeline ---
+    def _sample(self, project: str, start, end, step: int) -> Iterator[dict]:
+        for i, item in enumerate(self.catalog.iter_range(project, start, end)):
+            if i % step == 0:
+                yield item
+
+    def _encode(self, item: dict, size: int) -> Optional[bytes]:
+        try:
+            if size in self.renditions.sizes:
+                # Reutiliza (o genera) la miniatura cacheada
+                path = self.renditions.get(item["project"], item["filename"], Path(item["path"]), size)
+                return path.read_bytes()
+
+            with open_image(item["path"], draft_size=size) as img:
+                img.draft("RGB", (size, size))
+                img = img.convert("RGB")
+                img.thumbnail((size, size), Image.Resampling.BILINEAR)
+                buf = io.BytesIO()
+                img.save(buf, "JPEG", quality=self.quality)
+                return buf.getvalue()
+        except (OSError, ValueError):
+            log.warning("Skipping unreadable frame %s", item["path"])
+            return None
+
+    def _frames(self, project: str, start, end, step: int, size: int) -> Iterator[bytes]:
+        for item in self._sample(project, start, end, step):
+            jpeg = self._encode(item, size)
+            if jpeg is not None:
+                yield mjpeg_part(jpeg)
+
+    def stream(
+        self,
+        project: str,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        step: int,
+        size: int,
+        target: Path,
+    ) -> Iterator[bytes]:
+        """
+        Genera el MJPEG y, en paralelo, lo escribe en `target`. El fichero solo se
+        publica si el render termina; si el cliente corta, se descarta.
+        """
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f".{target.name}.{threading.get_ident()}.tmp")
+        completed = False
+        try:
+            with open(tmp, "wb") as f:
+                for part in self._frames(project, start, end, step, size):
+                    f.write(part)
+                    yield part
+            os.replace(tmp, target)
+            completed = True
+        finally:
+            if not completed:
+                try:
+                    os.unlink(tmp)
+                except FileNotFoundError:
+                    pass
@@ -1,35 +1,166 @@
+import shutil
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.config import ENV, DATA_DIR
-from app.infrastructure.simulator.runner_fake import FakeRunner
-from app.infrastructure.raspi.runner_raspi import RaspiRunner
+from app.config import (
+    ENV, DATA_DIR, PROJECTS_DIR, PROJECTS_RESCAN_INTERVAL, CATALOG_PATH, CACHE_DIR, RENDITION_SIZES, RENDITION_WORKERS,
+    SIM_CAMERAS, SIM_LATENCY, SIM_FRAME_WIDTH, SIM_TIME_SCALE, CAPTURE_BATCH_WINDOW, LIGHT_WARMUP, PIPELINE_WORKERS, ENCODER_WORKERS, PIPELINE_QUEUE_SIZE, PIPELINE_QUEUE_MB, PIPELINE_POLICY, EVENTS_HISTORY, EVENTS_QUEUE_SIZE,
+    RETENTION_INTERVAL, RETENTION_IO_RATE, METADATA_DIR, METADATA_FLUSH_INTERVAL, METADATA_COMPACT_ROWS, METADATA_SIDECARS,
+)
+from app.infrastructure.analytics import analytics_stage
+from app.infrastructure.common.async_runner import AsyncRunner
+from app.infrastructure.common.encoders import EncoderPool
+from app.infrastructure.common.metrics import MetricsRegistry
+from app.infrastructure.common.pipeline import CapturePipeline
+from app.infrastructure.common.startup import FirstRequestMiddleware, Startup
+from app.infrastructure.db import CaptureCatalog
+from app.infrastructure.dedup import DedupStage
+from app.infrastructure.events import EventHub, RunnerEvents
+from app.infrastructure.export import ZipExporter
+from app.infrastructure.metadata_log import MetadataLog
+from app.infrastructure.projects_fs import ProjectRegistry
+from app.infrastructure.renditions import RenditionService
+from app.infrastructure.retention import RetentionCompactor
+from app.infrastructure.timelapse import TimelapseRenderer
+from app.infrastructure.preview import PreviewBroadcasters
 
 from app.adapters.http.routes.system import router as system_router
 from app.adapters.http.routes.projects import router as projects_router
 from app.adapters.http.routes.capture import router as capture_router
+from app.adapters.http.routes.captures import router as captures_router
+from app.adapters.http.routes.series import router as series_router
+from app.adapters.http.routes.metadata import router as metadata_router
+from app.adapters.http.routes.media import router as media_router
+from app.adapters.http.routes.timelapse import router as timelapse_router
+from app.adapters.http.routes.preview import router as preview_router
+from app.adapters.http.routes.events import router as events_router
+
+
+# Fases del arranque en segundo plano, en orden (ver /api/ready)
+STARTUP_PHASES = ("imports", "runner", "wiring", "projects")
+# Espera máxima al arranque en segundo plano al apagar (s)
+STARTUP_SHUTDOWN_TIMEOUT = 10
+
+
+def _start_runner(app: FastAPI, startup: Startup, pipeline: CapturePipeline, encoders: EncoderPool) -> None:
+    """
+    Parte lenta del arranque, en segundo plano: imports del hardware, luz y cámaras.
+    Las rutas que necesitan el runner responden 503 hasta que se publica en app.state.
+    """
+    with startup.phase("imports"):
+        # En la Raspberry, meapis + picamera2/libcamera tardan varios segundos en importarse
+        if ENV == "raspi":
+            from app.infrastructure.raspi.runner_raspi import RaspiRunner, preload_hardware
+            preload_hardware()
+        else:
+            from app.infrastructure.simulator.runner_fake import FakeRunner
+
+    with startup.phase("runner"):
+        if ENV == "raspi":
+            runner = RaspiRunner(
+                DATA_DIR, pipeline=pipeline, registry=app.state.registry,
+                batch_window=CAPTURE_BATCH_WINDOW, light_warmup=LIGHT_WARMUP, sidecars=METADATA_SIDECARS,
+                metrics=app.state.metrics, encoders=encoders, autostart=False,
+            )
+        else:
+            runner = FakeRunner(
+                DATA_DIR, pipeline=pipeline, registry=app.state.registry,
+                cameras=SIM_CAMERAS, batch_window=CAPTURE_BATCH_WINDOW, sidecars=METADATA_SIDECARS,
+                metrics=app.state.metrics, latency=SIM_LATENCY, frame_width=SIM_FRAME_WIDTH, time_scale=SIM_TIME_SCALE,
+                encoders=encoders, autostart=False,
+            )
+
+    with startup.phase("wiring"):
+        # Fotos casi repetidas: se descartan o se guardan como diferencia según el proyecto
+        runner.add_ingest_stage(app.state.dedup)
+        runner.add_capture_listener(app.state.dedup.on_capture)
+        # Estadísticas calculadas una vez sobre el fotograma en memoria, antes de codificarlo
+        runner.add_ingest_stage(analytics_stage)
+        runner.add_capture_listener(app.state.catalog.record)
+        runner.add_capture_listener(app.state.metadata.append)
+        runner.add_capture_listener(app.state.renditions.on_capture)
+
+        runner_events = RunnerEvents(app.state.events, runner, thumbnail_size=min(RENDITION_SIZES))
+        runner.add_capture_listener(runner_events.on_capture)
+        async_runner = AsyncRunner(runner, on_status_change=runner_events.on_status_change)
+        previews = PreviewBroadcasters(runner.preview_frame, on_idle=runner.stop_preview)
+
+        # Se publica todo junto, con el runner ya conectado a la ingesta
+        app.state.runner_events = runner_events
+        app.state.async_runner = async_runner
+        app.state.previews = previews
+        app.state.runner = runner
+
+    with startup.phase("projects"):
+        # Abrir las cámaras de current.txt (con calibración de foco) es lo más lento
+        runner.start_initial_projects()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     DATA_DIR.mkdir(parents=True, exist_ok=True)
 
-    if ENV == "raspi":
-        app.state.runner = RaspiRunner(DATA_DIR)
-    else:
-        app.state.runner = FakeRunner(DATA_DIR)
+    # Métricas de todo el proceso, expuestas en /api/metrics
+    app.state.metrics = MetricsRegistry()
+    app.state.metrics.gauge("meaplan_disk_free_bytes", "Espacio libre en el disco de datos", fn=lambda: shutil.disk_usage(DATA_DIR).free)
+    # La API responde en cuanto está lo imprescindible; el hardware arranca en segundo plano
+    app.state.startup = startup = Startup(STARTUP_PHASES, metrics=app.state.metrics)
+
+    app.state.catalog = CaptureCatalog(CATALOG_PATH)
+    app.state.renditions = RenditionService(CACHE_DIR / "renditions", RENDITION_SIZES, RENDITION_WORKERS)
+    app.state.timelapse = TimelapseRenderer(app.state.catalog, app.state.renditions, CACHE_DIR / "timelapse")
+
+    pipeline = CapturePipeline(
+        PIPELINE_WORKERS, PIPELINE_QUEUE_SIZE, PIPELINE_POLICY, metrics=app.state.metrics,
+        max_bytes=int(PIPELINE_QUEUE_MB * 1024 * 1024),
+    )
+    encoders = EncoderPool(ENCODER_WORKERS, metrics=app.state.metrics)
+
+    app.state.registry = ProjectRegistry(PROJECTS_DIR, PROJECTS_RESCAN_INTERVAL).start()
+    app.state.dedup = DedupStage(app.state.registry, metrics=app.state.metrics)
+    app.state.metadata = MetadataLog(METADATA_DIR, METADATA_FLUSH_INTERVAL, METADATA_COMPACT_ROWS).start()
+    app.state.exporter = ZipExporter(app.state.catalog, app.state.metadata, app.state.renditions)
+    app.state.events = EventHub(EVENTS_HISTORY, EVENTS_QUEUE_SIZE)
+
+    # Retención en segundo plano; cede el disco mientras haya fotos por escribir
+    app.state.retention = RetentionCompactor(
+        app.state.catalog, app.state.registry, app.state.renditions,
+        interval=RETENTION_INTERVAL, io_rate=RETENTION_IO_RATE, busy=lambda: pipeline.depth > 0,
+    ).start()
+
+    startup.run_background(lambda: _start_runner(app, startup, pipeline, encoders))
+    startup.mark("serving")
 
     yield
 
-    try:
-        app.state.runner.shutdown()
-    except Exception:
-        pass
+    # Si el arranque sigue en curso (p. ej. una cámara que no responde) se apaga lo que haya
+    startup.wait(STARTUP_SHUTDOWN_TIMEOUT)
+    async_runner = getattr(app.state, "async_runner", None)
+    if async_runner is not None:
+        async_runner.shutdown()
+    runner = getattr(app.state, "runner", None)
+    if runner is not None:
+        try:
+            runner.shutdown()
+        except Exception:
+            pass
+    else:
+        pipeline.shutdown(wait=True)
+    encoders.shutdown()
+
+    app.state.retention.stop(timeout=5)
+    app.state.metadata.close()
+    app.state.registry.stop()
+    app.state.renditions.shutdown()
+    app.state.catalog.close()
 
 
 app = FastAPI(title="TFG API", lifespan=lifespan)
 
+# Tiempo hasta la primera petición atendida (hito first_request de /api/ready)
+app.add_middleware(FirstRequestMiddleware, startup=lambda: getattr(app.state, "startup", None))
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:4200"],
@@ -40,4 +171,11 @@ app.add_middleware(
 
 app.include_router(system_router)
 app.include_router(projects_router)
-app.include_router(capture_router)
\ No newline at end of file
+app.include_router(capture_router)
+app.include_router(captures_router)
+app.include_router(series_router)
+app.include_router(metadata_router)
+app.include_router(media_router)
+app.include_router(timelapse_router)
+app.include_router(preview_router)
+app.include_router(events_router)
\ No newline at end of file
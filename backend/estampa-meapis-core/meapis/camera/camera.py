@@ -2,12 +2,17 @@ import json
 import logging
 import os
 import datetime
+import threading
+import time
 
-from picamera2 import Picamera2, Preview  # type: ignore
+import numpy as np
+
+from picamera2 import MappedArray, Picamera2, Preview  # type: ignore
 from libcamera import controls  # type: ignore
 
 from ..project import Project
 from .camera_config import CameraConfig
+from .focus import FocusCalibrator, sharpness
 
 
 class Camera:
@@ -40,6 +45,26 @@ class Camera:
 
         # Initialize picam2 instance
         self.picam2 = Picamera2(self.num, tuning=tuning)
+
+        # Path of the last saved picture (None if the last picture was not saved)
+        self.last_picture_path = None
+
+        # Stills and the live preview share the sensor: serialize access
+        self.lock = threading.RLock()
+        self.config = None
+        self._previewing = False
+
+        # Warm mode: keep the still configuration running between scheduled pictures
+        self.persistent = getattr(project, "warm_camera", False)
+        self._running = False
+
+        # Optional frame sink: callable(array, image_path, metadata, metadata_file) -> Future.
+        # When set, the frame is handed over as an RGB array and the sink encodes and writes
+        # it (e.g. on a persistence pipeline) instead of the capture thread.
+        self.frame_sink = None
+
+        # perf_counter() marks of the last picture: start, frame_available, saved
+        self.last_timings = {}
         # print(Picamera2.global_camera_info())
 
     """ 
@@ -48,7 +73,11 @@ class Camera:
     """
     def setup(self, config: CameraConfig) -> None:
         logging.info("Setting up camera")
-        self.picam2.configure(config.dict)
+        with self.lock:
+            self._stop_preview()
+            self._stop()
+            self.config = config
+            self.picam2.configure(config.dict)
 
     """
     Hook for subclasses to add custom camera configuration. 
@@ -64,37 +93,169 @@ class Camera:
     :param save_metadata: Whether to save the metadata of the captured image to disk.
     :param filename_postfix: Optional postfix to append to the filename.
     :param output_path: Optional output path to save the image and metadata.
+    :param on_frame: Optional callback called as soon as the frame is available (before saving).
+    :param on_saved: Optional callback(image_path, metadata) called once the picture is on disk.
+    :param wait: With a frame sink, whether to wait until the picture is on disk before returning.
     :return: Metadata dictionary for the captured image.
     """
-    def take_picture(self, config: CameraConfig = None, save: bool = True, save_metadata: bool = True, filename_postfix: str = None, output_path: str = None) -> dict:
+    def take_picture(self, config: CameraConfig = None, save: bool = True, save_metadata: bool = True, filename_postfix: str = None, output_path: str = None, on_frame=None, on_saved=None, wait: bool = True) -> dict:
         logging.info("Taking picture")
 
-        if config is not None:
-            logging.debug("Switching to custom config")
-            self.picam2.switch_mode(config.dict)
-
-        self.picam2.start()
+        with self.lock:
+            t_start = time.perf_counter()
+
+            # A running preview is paused for the still (resumed on the next preview frame)
+            self._stop_preview()
+
+            # Warm mode only applies to the picture configuration set in setup()
+            warm = self.persistent and config is None
+
+            if config is not None:
+                self._stop()
+                logging.debug("Switching to custom config")
+                self.picam2.switch_mode(config.dict)
+
+            if warm:
+                if not self._running:
+                    self.picam2.start()
+                    self._running = True
+                # Camera is already streaming: wait for a frame exposed after this call
+                # (e.g. after the light was turned on)
+                request = self.picam2.capture_request(flush=True)
+            else:
+                self.picam2.start()
+                request = self.picam2.capture_request()
+
+            t_frame = time.perf_counter()
+            if on_frame is not None:
+                on_frame()
+
+            filename = self.project.get_picture_filename(filename_postfix)
+            image_path = None
+            if save:
+                picture_path = self.project.path_pictures if output_path is None else output_path
+                image_filename = f"{filename}.{self.project.image_format}"
+                image_path = os.path.join(picture_path, image_filename)
+
+            metadata_file = None
+            if save_metadata:
+                metadata_path = self.project.path_metadata if output_path is None else output_path
+                metadata_file = os.path.join(metadata_path, f"{filename}-metadata.json")
+
+            metadata = request.get_metadata()
+
+            persisted = None
+            if self.frame_sink is None or image_path is None:
+                if image_path is not None and self.project.image_format == "npy":
+                    # Raw frame, memory-mappable with np.load(mmap_mode="r")
+                    np.save(image_path, request.make_array("main"))
+                elif image_path is not None:
+                    request.save("main", image_path)
+                request.release()
+                self._write_metadata(metadata_file, metadata)
+            else:
+                # Copy the frame out of the camera buffer so the request goes back to libcamera now
+                array = request.make_array("main")
+                request.release()
+                persisted = self.frame_sink(array, image_path, metadata, metadata_file)
+
+            self.last_picture_path = image_path
+
+            if not warm:
+                self.picam2.stop()
+
+            self.last_timings = {"start": t_start, "frame_available": t_frame, "saved": time.perf_counter()}
+
+        if persisted is None:
+            if on_saved is not None:
+                on_saved(image_path, metadata)
+        else:
+            if on_saved is not None:
+                persisted.add_done_callback(lambda f: f.exception() is None and on_saved(image_path, metadata))
+            if wait:
+                persisted.result()
 
-        request = self.picam2.capture_request()
+        return metadata
 
-        filename = self.project.get_picture_filename(filename_postfix)
-        if save:
-            picture_path = self.project.path_pictures if output_path is None else output_path
-            image_filename = f"{filename}.{self.project.image_format}"
-            image_path = os.path.join(picture_path, image_filename)
-            request.save("main", image_path)
+    """
+    Take a burst of pictures keeping the camera running between frames.
+    Frames are copied straight from the camera buffers into one preallocated array.
+    :param controls_list: One dict of controls per frame (e.g. ExposureTime/AnalogueGain for a bracket; {} keeps the current ones).
+    :return: (stack, metadata_list) with stack of shape (N, height, width, 3) uint8.
+    """
+    def capture_burst(self, controls_list: list) -> tuple:
+        logging.info("Taking burst of %d pictures", len(controls_list))
+
+        with self.lock:
+            self._stop_preview()
+
+            width, height = self.picam2.camera_config["main"]["size"]
+            stack = np.empty((len(controls_list), height, width, 3), dtype=np.uint8)
+            metadata_list = []
+
+            was_running = self._running
+            if not was_running:
+                self.picam2.start()
+
+            try:
+                for i, frame_controls in enumerate(controls_list):
+                    if frame_controls:
+                        self.picam2.set_controls(frame_controls)
+                    request = self._capture_request_with(frame_controls)
+                    with MappedArray(request, "main") as m:
+                        stack[i] = m.array[:height, :width, :3]
+                    metadata_list.append(request.get_metadata())
+                    request.release()
+            finally:
+                # Back to the picture exposure for the next scheduled picture
+                if self.config is not None and any(controls_list):
+                    base = self.config.dict.get("controls", {})
+                    self.picam2.set_controls({k: base[k] for k in ("ExposureTime", "AnalogueGain") if k in base})
+                if not was_running:
+                    self.picam2.stop()
+
+        return stack, metadata_list
 
-        metadata = request.get_metadata()
-        if save_metadata:
-            metadata_path = self.project.path_metadata if output_path is None else output_path
-            with open(os.path.join(metadata_path, f"{filename}-metadata.json"), "w") as f:
-                json.dump(metadata, f, indent=2)
+    """
+    Capture the first request whose metadata reflects the requested controls.
+    Controls take a few frames to apply, so earlier frames are discarded.
+    :param frame_controls: Controls dict that was set before the capture.
+    :param max_frames: Maximum number of frames to wait for.
+    :param tolerance: Relative tolerance when comparing ExposureTime/AnalogueGain.
+    """
+    def _capture_request_with(self, frame_controls: dict, max_frames: int = 10, tolerance: float = 0.05):
+        request = self.picam2.capture_request(flush=True)
+        for _ in range(max_frames):
+            metadata = request.get_metadata()
+            if all(
+                abs(metadata.get(k, 0) - v) <= tolerance * abs(v)
+                for k, v in frame_controls.items()
+                if k in ("ExposureTime", "AnalogueGain")
+            ):
+                return request
+            request.release()
+            request = self.picam2.capture_request()
+        logging.warning("Controls %s not applied after %d frames", frame_controls, max_frames)
+        return request
 
-        request.release()
+    @staticmethod
+    def _write_metadata(metadata_file, metadata) -> None:
+        if metadata_file is None:
+            return
+        with open(metadata_file, "w") as f:
+            json.dump(metadata, f, indent=2)
 
-        self.picam2.stop()
+    """
+    Stop the camera if it was left running by warm mode.
+    """
+    def stop(self) -> None:
+        with self.lock:
+            self._stop()
 
-        return metadata
+    def _stop(self) -> None:
+        if self._running:
+            self.picam2.stop()
+            self._running = False
 
     """
     Perform an autofocus cycle.
@@ -103,6 +264,8 @@ class Camera:
     def autofocus(self) -> bool:
         logging.info("Autofocus")
 
+        self.stop()
+
         def print_af_state(request):
             md = request.get_metadata()
             print(("Idle", "Scanning", "Success", "Fail")[md['AfState']], md.get('LensPosition'))
@@ -119,6 +282,65 @@ class Camera:
 
         return success
 
+    """
+    Camera model as reported by libcamera (e.g. "ov64a40"), used to key calibration results.
+    """
+    @property
+    def model(self) -> str:
+        return self.picam2.camera_properties.get("Model", f"camera{self.num}")
+
+    """
+    Range of the LensPosition control.
+    :return: (min, max) LensPosition.
+    """
+    def lens_range(self) -> tuple:
+        lens_min, lens_max, _ = self.picam2.camera_controls["LensPosition"]
+        return lens_min, lens_max
+
+    """
+    Software focus calibration on the low-res stream.
+    The camera runs a preview configuration with manual focus; for every LensPosition the
+    calibrator asks for, the lens is moved and the sharpness of the first low-res frame
+    taken at that position is scored. The still configuration is restored afterwards.
+    :param calibrator: FocusCalibrator that picks the positions to score.
+    :param key: Cache key for the calibrator (see CalibrationCache.key).
+    :param size: Size of the low-res stream.
+    :param max_frames: Maximum number of frames to wait for the lens to reach a position.
+    :return: Calibration result (see FocusCalibrator.calibrate).
+    """
+    def calibrate_focus(self, calibrator: FocusCalibrator, key: str = None, size: tuple = (320, 240), max_frames: int = 10) -> dict:
+        width, height = size
+
+        def score_at(position):
+            self.picam2.set_controls({"LensPosition": position})
+            request = self.picam2.capture_request(flush=True)
+            for _ in range(max_frames):
+                if abs(request.get_metadata().get("LensPosition", position) - position) <= 0.05:
+                    break
+                request.release()
+                request = self.picam2.capture_request()
+            try:
+                # The first `height` rows of the YUV420 buffer are the luma plane
+                return sharpness(request.make_array("lores")[:height, :width])
+            finally:
+                request.release()
+
+        with self.lock:
+            self._stop_preview()
+            self._stop()
+            focus_config = self.picam2.create_preview_configuration(
+                lores={"size": size},
+                controls={"AfMode": controls.AfModeEnum.Manual},
+            )
+            self.picam2.configure(focus_config)
+            self.picam2.start()
+            try:
+                return calibrator.calibrate(score_at, self.lens_range(), key)
+            finally:
+                self.picam2.stop()
+                if self.config is not None:
+                    self.picam2.configure(self.config.dict)
+
     """
     Find the mode with the biggest size (area)
     :param sensor_modes: List of sensor mode dictionaries.
@@ -186,6 +408,65 @@ class Camera:
 
         return crop_tuple
 
+    """
+    Grab a frame from the low-res stream for the live preview.
+    The camera is switched to a preview configuration on the first call and stays
+    running until stop_preview() or the next still picture.
+    :param size: Size of the low-res stream.
+    :return: RGB array, or None if the camera is busy taking a picture.
+    """
+    def capture_preview(self, size: tuple = (640, 480)):
+        if not self.lock.acquire(blocking=False):
+            return None
+        try:
+            if not self._previewing:
+                preview_config = self.picam2.create_preview_configuration(lores={"size": size})
+                self._stop()
+                self.picam2.stop()
+                self.picam2.configure(preview_config)
+                self.picam2.start()
+                self._previewing = True
+
+            return self.yuv420_to_rgb(self.picam2.capture_array("lores"), size)
+        finally:
+            self.lock.release()
+
+    """
+    Stop the live preview and restore the still configuration.
+    """
+    def stop_preview(self) -> None:
+        with self.lock:
+            self._stop_preview()
+
+    def _stop_preview(self) -> None:
+        if not self._previewing:
+            return
+        self.picam2.stop()
+        if self.config is not None:
+            self.picam2.configure(self.config.dict)
+        self._previewing = False
+
+    """
+    Convert a YUV420 (I420) low-res buffer to RGB.
+    :param yuv: Array of shape (height * 3 / 2, width) as returned by capture_array("lores").
+    :param size: (width, height) of the stream.
+    :return: RGB uint8 array of shape (height, width, 3).
+    """
+    @staticmethod
+    def yuv420_to_rgb(yuv, size) -> np.ndarray:
+        width, height = size
+        y = yuv[:height, :width].astype(np.float32)
+        u = yuv[height:height + height // 4].reshape(height // 2, width // 2).astype(np.float32) - 128.0
+        v = yuv[height + height // 4:height + height // 2].reshape(height // 2, width // 2).astype(np.float32) - 128.0
+        u = u.repeat(2, axis=0).repeat(2, axis=1)
+        v = v.repeat(2, axis=0).repeat(2, axis=1)
+
+        rgb = np.empty((height, width, 3), dtype=np.float32)
+        rgb[..., 0] = y + 1.402 * v
+        rgb[..., 1] = y - 0.344136 * u - 0.714136 * v
+        rgb[..., 2] = y + 1.772 * u
+        return np.clip(rgb, 0, 255).astype(np.uint8)
+
     """
     Close the camera and release resources.
     """
@@ -1,21 +1,45 @@
 import logging
+import os
 import time
 
 from .camera_config import CameraConfig
+from .focus import CalibrationCache, FocusCalibrator
 from owlsight import Owlsight
 from v3 import V3
 
+# Focus calibration cache shared by all projects (dot file: not a project)
+FOCUS_CACHE_FILENAME = ".focus-calibration.json"
+
 
 class CameraController:
-    def __init__(self, project, light):
+    """
+    Drive a camera for a project: calibration, light handling and picture taking.
+    :param project: Project instance.
+    :param light: Light instance (turn_on / turn_off).
+    :param on_capture: Optional callback(project, image_path, metadata) called after every scheduled picture.
+    :param frame_sink: Optional callable(project, array, image_path, metadata, metadata_file) -> Future that encodes and writes scheduled pictures.
+    :param focus_calibrator: Optional FocusCalibrator; by default results are cached next to the projects.
+    :param on_timings: Optional callback(project, timings) with the duration in seconds of each phase
+                       (light_on, frame_available, saved, total; focus_calibration during setup).
+    """
+    def __init__(self, project, light, on_capture=None, frame_sink=None, focus_calibrator=None, on_timings=None):
         self.project = project
         self.light = light
+        self.on_capture = on_capture
+        self.on_timings = on_timings
+        self.last_timings = {}
+        self.focus_calibrator = focus_calibrator or FocusCalibrator(
+            CalibrationCache(os.path.join(os.path.dirname(project.path), FOCUS_CACHE_FILENAME))
+        )
 
         if project.camera == 0:
             self.camera = Owlsight(project)
         else:
             self.camera = V3(project)
 
+        # Calibration pictures are always saved inline; the sink is attached once set up
+        self._frame_sink = frame_sink
+
         self.config_picture = CameraConfig(self.camera).create_picture_config()
 
         if not self.project.has_camera_settings:
@@ -30,32 +54,19 @@ class CameraController:
             self.config_picture.set_control(setting, value)
 
         self.camera.setup(self.config_picture)
-
-    def auto_focus(self, config_focus):
-        focused = False
-
-        while not focused:
-            focused = self.camera.autofocus()
-            metadata = self.camera.take_picture(config_focus, output_path=self.project.path_setup, filename_postfix="focus")
-            # print(metadata)
-            if focused:
-                logging.info("Autofocus successful")
-                return metadata["LensPosition"]
-            else:
-                logging.warning("Autofocus failed")
+        if self._frame_sink is not None:
+            self.camera.frame_sink = lambda *args: self._frame_sink(self.project, *args)
 
     def compute_camera_settings(self):
-        config_focus = CameraConfig(self.camera).create_focus_config()
         config_exposure = CameraConfig(self.camera).create_exposure_config()
 
-        self.camera.setup(config_focus)
-
         self.light.turn_on()
 
-        # Autofocus twice to ensure good focus
-        self.auto_focus(config_focus)
-        lens_position = self.auto_focus(config_focus)
-        logging.info(f"Autofocus complete, LensPosition: {lens_position}")
+        # Software focus search on the low-res stream; a known camera/project starts from the cached position
+        focus = self.camera.calibrate_focus(self.focus_calibrator, CalibrationCache.key(self.camera.model, self.project.name))
+        lens_position = focus["LensPosition"]
+        logging.info(f"Focus calibration complete in {focus['elapsed']:.1f}s ({focus['steps']} steps), LensPosition: {lens_position}")
+        self._report_timings({"focus_calibration": focus["elapsed"]})
         config_exposure.set_control("LensPosition", lens_position)
         self.config_picture.set_control("LensPosition", lens_position)
 
@@ -77,16 +88,77 @@ class CameraController:
 
         return camera_settings
 
-    def take_picture(self):
+    def take_picture(self, wait: bool = True):
+        t_start = time.perf_counter()
+
         if self.project.use_light:
             self.light.turn_on()
+        t_light = time.perf_counter()
+
+        # The light is only needed until the frame is available, not while saving.
+        # The finally only turns it off if on_frame did not get to (e.g. the capture failed)
+        light_is_on = self.project.use_light
+
+        def light_off():
+            nonlocal light_is_on
+            if light_is_on:
+                light_is_on = False
+                self.light.turn_off()
+
+        try:
+            metadata = self.camera.take_picture(on_frame=light_off, on_saved=self._notify_saved, wait=wait)
+        finally:
+            light_off()
+
+        camera_timings = self.camera.last_timings
+        self.last_timings = {
+            "light_on": t_light - t_start,
+            "frame_available": camera_timings["frame_available"] - t_light,
+            "saved": camera_timings["saved"] - camera_timings["frame_available"],
+            "total": camera_timings["saved"] - t_start,
+        }
+        logging.debug("Picture timings: %s", self.last_timings)
+        self._report_timings(self.last_timings)
 
-        metadata = self.camera.take_picture()
+        return metadata
 
+    def capture_burst(self, controls_list):
+        """
+        Burst / exposure bracket with the light on for the whole burst.
+        :return: (stack, metadata_list), see Camera.capture_burst.
+        """
         if self.project.use_light:
-            self.light.turn_off()
-
-        return metadata
+            self.light.turn_on()
+        try:
+            return self.camera.capture_burst(controls_list)
+        finally:
+            if self.project.use_light:
+                self.light.turn_off()
+
+    def _report_timings(self, timings):
+        if self.on_timings is None:
+            return
+        try:
+            self.on_timings(self.project, timings)
+        except Exception:
+            logging.error("on_timings callback failed", exc_info=True)
+
+    def _notify_saved(self, image_path, metadata):
+        if self.on_capture is None:
+            return
+        try:
+            self.on_capture(self.project, image_path, metadata)
+        except Exception:
+            logging.error("on_capture callback failed", exc_info=True)
+
+    def stop(self):
+        self.camera.stop()
+
+    def preview_frame(self):
+        return self.camera.capture_preview()
+
+    def stop_preview(self):
+        self.camera.stop_preview()
 
     def close(self):
         self.camera.close()
\ No newline at end of file
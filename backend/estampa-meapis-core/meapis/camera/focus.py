@@ -0,0 +1,229 @@
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+
+"""
+Focus score of a grayscale frame: variance of the Laplacian over a central region,
+normalized by the mean brightness so the light level does not change the score.
+Vectorized with array slicing; a 320x240 low-res frame takes well under a millisecond.
+:param gray: 2D array (e.g. the Y plane of the low-res YUV420 stream).
+:param roi: Fraction of the width/height of the central region that is scored.
+:return: Sharpness score (higher is sharper).
+"""
+def sharpness(gray: np.ndarray, roi: float = 0.5) -> float:
+    height, width = gray.shape[:2]
+    dy = int(height * (1 - roi) / 2)
+    dx = int(width * (1 - roi) / 2)
+    img = gray[dy:height - dy, dx:width - dx].astype(np.float32)
+
+    lap = 4 * img[1:-1, 1:-1] - img[:-2, 1:-1] - img[2:, 1:-1] - img[1:-1, :-2] - img[1:-1, 2:]
+    mean = float(img.mean())
+    if mean <= 0:
+        return 0.0
+    return float(lap.var()) / (mean * mean)
+
+
+class FocusSearch:
+    """
+    Coarse-to-fine LensPosition search that maximizes a focus score.
+    A coarse grid over the lens range finds the peak; each refinement samples a finer
+    grid around the best position. The number of lens moves is bounded by `max_steps`.
+    :param score_at: Callable(position) -> score; moves the lens and scores a frame.
+    :param coarse_steps: Number of positions of the coarse grid.
+    :param refine_steps: Number of positions of every refinement grid (it spans two grid steps, so at least 4).
+    :param max_steps: Maximum number of positions scored.
+    :param tolerance: Stop refining once the grid step is below this (LensPosition units).
+    """
+    def __init__(self, score_at, coarse_steps: int = 9, refine_steps: int = 5, max_steps: int = 25, tolerance: float = 0.05):
+        if refine_steps < 4:
+            raise ValueError("refine_steps must be at least 4 for the grid to get finer")
+        self.score_at = score_at
+        self.coarse_steps = coarse_steps
+        self.refine_steps = refine_steps
+        self.max_steps = max_steps
+        self.tolerance = tolerance
+        self.scores = {}
+
+    def _score(self, position: float) -> float:
+        position = round(position, 3)
+        if position not in self.scores:
+            self.scores[position] = self.score_at(position)
+        return self.scores[position]
+
+    def _grid(self, lo: float, hi: float, steps: int) -> list:
+        # Only positions that fit in the remaining budget
+        grid = [round(float(p), 3) for p in np.linspace(lo, hi, steps)]
+        new = [p for p in grid if p not in self.scores]
+        budget = self.max_steps - len(self.scores)
+        if len(new) > budget:
+            keep = set(new[:budget])
+            grid = [p for p in grid if p in self.scores or p in keep]
+        return grid
+
+    """
+    Search the best position in [lens_min, lens_max].
+    :return: Dict with LensPosition, score and steps (lens positions scored).
+    """
+    def run(self, lens_min: float, lens_max: float) -> dict:
+        lo, hi, steps = lens_min, lens_max, self.coarse_steps
+        best = lo
+        while len(self.scores) < self.max_steps:
+            scored = len(self.scores)
+            grid = self._grid(lo, hi, steps)
+            if not grid:
+                break
+            best = max(grid, key=self._score)
+
+            step = (hi - lo) / max(steps - 1, 1)
+            # Nothing new scored: a finer grid would not move the lens either
+            if step <= self.tolerance or len(self.scores) == scored:
+                break
+            lo, hi, steps = max(lens_min, best - step), min(lens_max, best + step), self.refine_steps
+
+        best = max(self.scores, key=self.scores.get, default=best)
+        return {"LensPosition": best, "score": self.scores.get(best, 0.0), "steps": len(self.scores)}
+
+
+class CalibrationCache:
+    """
+    Focus calibration results on disk, keyed by camera model and project.
+    :param path: JSON file that holds the cache.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(model: str, project: str) -> str:
+        return f"{model}/{project}"
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def get(self, key: str):
+        with self.lock:
+            return self._read().get(key)
+
+    def put(self, key: str, result: dict) -> None:
+        with self.lock:
+            cache = self._read()
+            cache[key] = {**result, "calibrated_at": time.time()}
+            # Write-and-rename so a crash never leaves a truncated cache
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(cache, f, indent=2)
+            os.replace(tmp, self.path)
+
+
+class FocusCalibrator:
+    """
+    Focus calibration with cached results.
+    Without a cached result the whole lens range is searched. With one, only a narrow
+    window around the cached position is searched (a few lens moves); if the best score
+    there is much worse than the cached one, the setup changed and the whole range is searched.
+    :param cache: Optional CalibrationCache.
+    :param window: Half width of the window searched around a cached position.
+    :param min_ratio: Minimum score ratio (new / cached) to accept the narrow search.
+    """
+    def __init__(self, cache: CalibrationCache = None, window: float = 0.5, min_ratio: float = 0.7, **search_options):
+        self.cache = cache
+        self.window = window
+        self.min_ratio = min_ratio
+        self.search_options = search_options
+
+    """
+    Find the best LensPosition.
+    :param score_at: Callable(position) -> score.
+    :param lens_range: (min, max) LensPosition.
+    :param key: Cache key (see CalibrationCache.key), None to skip the cache.
+    :return: Dict with LensPosition, score, steps, cached (whether the cache was used) and elapsed seconds.
+    """
+    def calibrate(self, score_at, lens_range: tuple, key: str = None) -> dict:
+        t_start = time.perf_counter()
+        lens_min, lens_max = lens_range
+        cached = self.cache.get(key) if self.cache is not None and key is not None else None
+
+        result = None
+        steps = 0
+        if cached is not None:
+            center = cached["LensPosition"]
+            search = FocusSearch(score_at, coarse_steps=5, refine_steps=5, max_steps=10, tolerance=self.search_options.get("tolerance", 0.05))
+            result = search.run(max(lens_min, center - self.window), min(lens_max, center + self.window))
+            steps = result["steps"]
+            if result["score"] < self.min_ratio * cached["score"]:
+                logging.info("Focus score dropped (%.4f < %.4f), searching the whole lens range", result["score"], cached["score"])
+                result = None
+
+        if result is None:
+            result = FocusSearch(score_at, **self.search_options).run(lens_min, lens_max)
+            steps += result["steps"]
+
+        if self.cache is not None and key is not None:
+            self.cache.put(key, {"LensPosition": result["LensPosition"], "score": result["score"]})
+
+        result = {**result, "steps": steps, "cached": cached is not None, "elapsed": time.perf_counter() - t_start}
+        logging.info("Focus calibration: %s", result)
+        return result
+
+
+class SimulatedLens:
+    """
+    Lens model to exercise the calibration without hardware.
+    A fixed random texture is blurred with a box filter whose radius grows with the
+    distance to the in-focus position, plus sensor noise.
+    :param focus: LensPosition that gives the sharpest frame.
+    :param depth: LensPosition distance that adds one pixel of blur radius.
+    :param size: (width, height) of the simulated low-res stream.
+    :param noise: Standard deviation of the sensor noise (0-255 scale).
+    :param move_time: Seconds each lens move takes (to model the real lens settling).
+    """
+    def __init__(self, focus: float = 8.0, depth: float = 0.25, size: tuple = (320, 240), noise: float = 1.0, move_time: float = 0.0, seed: int = 0):
+        self.focus = focus
+        self.depth = depth
+        self.noise = noise
+        self.move_time = move_time
+        self.rng = np.random.default_rng(seed)
+        width, height = size
+        # Texture with detail at several scales, like leaves and soil
+        scene = self.rng.uniform(0, 255, (height, width)).astype(np.float32)
+        self.scene = 0.5 * scene + 0.5 * self._box_blur(scene, 3)
+        self.moves = 0
+
+    @staticmethod
+    def _box_blur(img: np.ndarray, radius: int) -> np.ndarray:
+        if radius <= 0:
+            return img
+        # Separable box filter with cumulative sums: O(pixels) for any radius
+        k = 2 * radius + 1
+        for axis in (0, 1):
+            pad = [(0, 0), (0, 0)]
+            pad[axis] = (radius + 1, radius)
+            c = np.cumsum(np.pad(img, pad, mode="edge"), axis=axis)
+            img = (c[k:] - c[:-k]) / k if axis == 0 else (c[:, k:] - c[:, :-k]) / k
+        return img
+
+    """
+    Frame seen with the lens at `position`.
+    :return: uint8 grayscale array of shape (height, width).
+    """
+    def frame(self, position: float) -> np.ndarray:
+        self.moves += 1
+        if self.move_time > 0:
+            time.sleep(self.move_time)
+        radius = int(round(abs(position - self.focus) / self.depth))
+        img = self._box_blur(self.scene, radius)
+        if self.noise > 0:
+            img = img + self.rng.normal(0, self.noise, img.shape)
+        return np.clip(img, 0, 255).astype(np.uint8)
+
+    def score_at(self, position: float) -> float:
+        return sharpness(self.frame(position))
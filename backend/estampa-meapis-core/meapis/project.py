@@ -3,17 +3,24 @@ import json
 import logging
 import os
 import platform
+import threading
 
 from meapis.environment import Environment
 
 class Project:
-    def __init__(self, name: str, camera: int = 0, filename: str = None, interval: int = 60, image_format: str = "jpg", use_light: bool = True):
+    """
+    :param config: Already parsed config.json contents (e.g. from a project registry). When None, config.json is read from disk.
+    """
+    def __init__(self, name: str, camera: int = 0, filename: str = None, interval: int = 60, image_format: str = "jpg", use_light: bool = True, warm_camera: bool = False, config: dict = None):
         self.name = name
         self.camera = camera  # 0 = OwlSight, 1 = V3
         self.filename = name if filename is not None else name
         self.interval = interval  # seconds
         self.image_format = image_format  # Picture format
         self.use_light = use_light
+        self.warm_camera = warm_camera  # Keep the camera running between pictures
+        self.misfire = "coalesce"  # Late scheduled pictures: skip | coalesce | catch_up
+        self.misfire_grace = None  # Seconds a picture may be late before the misfire policy applies (None: half the interval)
 
         self.path = os.path.join(Environment.get_project_path(), self.name)
         if not os.path.exists(self.path):
@@ -31,19 +38,29 @@ class Project:
         if not os.path.exists(self.path_setup):
             os.makedirs(self.path_setup)
 
-        if os.path.isfile(os.path.join(self.path, "config.json")):
+        json_data = config
+        if json_data is None and os.path.isfile(os.path.join(self.path, "config.json")):
             logging.info("Found config.json, retrieving project settings")
             with open(os.path.join(self.path, "config.json"), "r") as json_file:
                 json_data = json.load(json_file)
 
-                self.camera = json_data.get("camera", self.camera)
-                self.filename = json_data.get("filename", self.filename)
-                self.interval = json_data.get("interval", self.interval)
-                self.image_format = json_data.get("format", self.image_format)
-                self.use_light = json_data.get("use_light", self.use_light)
+        if json_data is not None:
+            self.camera = json_data.get("camera", self.camera)
+            self.filename = json_data.get("filename", self.filename)
+            self.interval = json_data.get("interval", self.interval)
+            self.image_format = json_data.get("format", self.image_format)
+            self.use_light = json_data.get("use_light", self.use_light)
+            self.warm_camera = json_data.get("warm_camera", self.warm_camera)
+            self.misfire = json_data.get("misfire", self.misfire)
+            self.misfire_grace = json_data.get("misfire_grace", self.misfire_grace)
 
         self.camera_settings = self.load_camera_settings()  # Load picture settings
 
+        # Last timestamp handed out and how many pictures already used it, so that
+        # pictures taken within the same second do not overwrite each other
+        self._last_picture_time = (None, 0)
+        self._picture_lock = threading.Lock()
+
     def load_camera_settings(self):
         camera_settings_path = os.path.join(self.path, "camera_settings.json")
         if os.path.isfile(camera_settings_path):
@@ -66,6 +83,12 @@ class Project:
 
     def get_picture_filename(self, postfix: str = None):
         current_date_and_time = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        with self._picture_lock:
+            last, count = self._last_picture_time
+            count = count + 1 if last == current_date_and_time else 0
+            self._last_picture_time = (current_date_and_time, count)
+        if count:
+            current_date_and_time += f"_{count}"
         computer_name = platform.node()
         filename = f"{self.filename}-{computer_name}-{self.camera}-{current_date_and_time}"
         if postfix is not None and postfix != "":
@@ -1,7 +1,17 @@
 class PictureTakingTask:
-    def __init__(self, camera_controller):
+    """
+    Scheduled picture of a project.
+    :param camera_controller: CameraController of the project.
+    :param dispatch: Optional callable(job, use_light) that runs the picture instead of calling it directly.
+    """
+    def __init__(self, camera_controller, dispatch=None):
         self.camera_controller = camera_controller
+        self.dispatch = dispatch
 
     def execute(self):
         print(f"Taking picture.")
-        self.camera_controller.take_picture()
+        # Do not wait for the picture to be written: the next run must not be delayed by disk I/O
+        if self.dispatch is None:
+            self.camera_controller.take_picture(wait=False)
+        else:
+            self.dispatch(lambda: self.camera_controller.take_picture(wait=False), self.camera_controller.project.use_light)
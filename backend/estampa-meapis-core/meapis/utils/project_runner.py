@@ -1,6 +1,7 @@
 import datetime
 import logging
 import os
+import threading
 
 from apscheduler.jobstores.base import JobLookupError
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -10,64 +11,232 @@ from ..tasks.picture_taking import PictureTakingTask
 from .file_monitor import FileMonitor
 
 
+class IntervalScheduler:
+    """
+    Default scheduler of ProjectRunner: APScheduler interval jobs.
+    Misfire policies map to APScheduler options: skip drops runs later than `grace`,
+    coalesce merges missed runs into one, catch_up runs every missed run.
+    """
+    def __init__(self):
+        self._scheduler = BackgroundScheduler()
+
+    def add(self, job_id, func, interval, misfire="coalesce", grace=None, start=None):
+        options = {
+            "skip": {"coalesce": True, "misfire_grace_time": grace if grace is not None else max(1, interval // 2)},
+            "coalesce": {"coalesce": True, "misfire_grace_time": None},
+            "catch_up": {"coalesce": False, "misfire_grace_time": None},
+        }[misfire]
+        next_run_time = datetime.datetime.now() + datetime.timedelta(seconds=interval if start is None else start)
+        self._scheduler.add_job(func, 'interval', seconds=interval, id=job_id, next_run_time=next_run_time, replace_existing=True, **options)
+        if not self._scheduler.running:
+            self._scheduler.start()
+
+    def remove(self, job_id):
+        try:
+            self._scheduler.remove_job(job_id)
+            return True
+        except JobLookupError:
+            return False
+
+    def shutdown(self):
+        if self._scheduler.running:
+            self._scheduler.shutdown()
+
+
+class CameraWorker:
+    """
+    One running project on one camera: its controller and its scheduled job.
+    """
+    def __init__(self, project, camera_controller):
+        self.project = project
+        self.camera_controller = camera_controller
+        self.job_id = f"picture_taking_task-{project.name}"
+
+
 class ProjectRunner:
-    def __init__(self, light):
+    """
+    Run one project per camera at the same time (OwlSight = 0, V3 = 1).
+    :param light: Light instance, or an arbiter with handle(camera) returning a per-camera light so that
+                  concurrent projects never switch the shared light off under each other.
+    :param on_capture: Optional callback(project, image_path, metadata) called after every scheduled picture.
+    :param frame_sink: Optional callable(project, array, image_path, metadata, metadata_file) -> Future.
+    :param dispatch: Optional callable(job, use_light) that runs scheduled pictures (e.g. batched into shared light sessions).
+    :param on_timings: Optional callback(project, timings) with the phase durations of every picture, see CameraController.
+    :param scheduler: Optional scheduler with the IntervalScheduler interface (add / remove / shutdown); default IntervalScheduler.
+    :param autostart: Start the projects listed in current.txt right away; with False, call start_initial_projects()
+                      later (e.g. once the API is up, since opening every camera takes seconds).
+    """
+    def __init__(self, light, on_capture=None, frame_sink=None, dispatch=None, on_timings=None, scheduler=None, autostart=True):
         self.light = light
+        self.on_capture = on_capture  # callback(project, image_path, metadata)
+        self.frame_sink = frame_sink  # optional callable(project, array, image_path, metadata, metadata_file) -> Future
+        self.dispatch = dispatch
+        self.on_timings = on_timings
 
-        self.curr_project = None
-        self.camera_controller = None
+        # Project name -> worker; at most one worker per camera
+        self.workers = {}
+        self._lock = threading.RLock()
+        # Camera -> project whose controller is being built outside the lock, and the
+        # starting projects that were stopped meanwhile (they are dropped once built)
+        self._starting = {}
+        self._cancelled = set()
+        self._camera_free = threading.Condition(self._lock)
 
         self.curr_project_file = os.path.join(os.path.dirname(__file__), "..", "..", "..", "projects", "current.txt")
 
         # self.curr_project_monitor = FileMonitor(self.curr_project_file, on_change=self.current_project_change)
         # self.curr_project_monitor.start()
 
-        self.scheduler = BackgroundScheduler()
+        self.scheduler = scheduler or IntervalScheduler()
 
+        if autostart:
+            self.start_initial_projects()
+
+    def start_initial_projects(self):
+        """
+        Start the projects listed in current.txt (one project name per line, one per camera).
+        """
         with open(self.curr_project_file, "r") as f:
-            project_name = f.read().strip()
+            project_names = [line.strip() for line in f if line.strip()]
 
-        if project_name and project_name.strip() != "":
-            logging.info("Starting initial project: %s", project_name)
-            self.start_project(project_name)
+        if project_names:
+            for project_name in project_names:
+                logging.info("Starting initial project: %s", project_name)
+                self.start_project(project_name)
         else:
             logging.info("No initial project to start")
 
-    def start_project(self, project_name):
+    def _light_for(self, camera):
+        handle = getattr(self.light, "handle", None)
+        return handle(camera) if handle is not None else self.light
+
+    def start_project(self, project_name, config=None):
         from meapis.camera.camera_controller import CameraController
 
-        self.curr_project = Project(project_name)
-        self.camera_controller = CameraController(self.curr_project, self.light)
+        project = Project(project_name, config=config)
 
-        task = PictureTakingTask(self.camera_controller)
+        with self._lock:
+            # One start at a time per camera and per project: wait for it, then replace it
+            self._camera_free.wait_for(
+                lambda: project.camera not in self._starting and project_name not in self._starting.values()
+            )
 
-        self.scheduler.add_job(task.execute, 'interval', seconds=self.curr_project.interval, id='picture_taking_task', next_run_time=datetime.datetime.now())
-        self.scheduler.start()
+            # Starting a project replaces whatever was running on the same camera
+            for worker in list(self.workers.values()):
+                if worker.project.name == project_name or worker.project.camera == project.camera:
+                    self.stop_project(worker.project.name)
 
-    def stop_project(self):
-        if self.scheduler and self.scheduler.running:
-            try:
-                self.scheduler.remove_job('picture_taking_task')
-                self.camera_controller.stop()
-                logging.info("Removed job 'picture_taking_task'")
-            except JobLookupError:
-                logging.info("Job 'picture_taking_task' not found")
+            self._starting[project.camera] = project_name
+            self._cancelled.discard(project_name)
 
-        self.curr_project = None
+        # Opening the camera and calibrating the focus take seconds: build the controller
+        # without the lock so the other cameras and the API are not blocked meanwhile
+        try:
+            camera_controller = CameraController(project, self._light_for(project.camera), on_capture=self.on_capture, frame_sink=self.frame_sink, on_timings=self.on_timings)
+        except BaseException:
+            with self._lock:
+                del self._starting[project.camera]
+                self._cancelled.discard(project_name)
+                self._camera_free.notify_all()
+            raise
+
+        # Release the camera and publish the worker in one step: a start waiting for
+        # this camera then finds the worker and replaces it
+        with self._lock:
+            del self._starting[project.camera]
+            self._camera_free.notify_all()
+            if project_name in self._cancelled:
+                self._cancelled.discard(project_name)
+                logging.info("Project '%s' was stopped while starting", project_name)
+                camera_controller.close()
+                return
+
+            worker = CameraWorker(project, camera_controller)
+            self.workers[project_name] = worker
+
+            task = PictureTakingTask(camera_controller, dispatch=self.dispatch)
+
+            self.scheduler.add(worker.job_id, task.execute, project.interval, misfire=project.misfire, grace=project.misfire_grace, start=0)
+
+    def stop_project(self, project_name=None):
+        """
+        Stop one project, or every running project if no name is given.
+        """
+        with self._lock:
+            # Projects still starting are not in workers yet: they are dropped once built
+            starting = set(self._starting.values())
+            self._cancelled.update(starting if project_name is None else starting & {project_name})
+
+            names = list(self.workers) if project_name is None else [project_name]
+            for name in names:
+                worker = self.workers.pop(name, None)
+                if worker is None:
+                    continue
+                if self.scheduler.remove(worker.job_id):
+                    logging.info("Removed job '%s'", worker.job_id)
+                else:
+                    logging.info("Job '%s' not found", worker.job_id)
+                worker.camera_controller.stop()
+                worker.camera_controller.close()
+
+    def worker(self, project_name=None):
+        """
+        Worker of a running project. Without a name, the only running project.
+        """
+        with self._lock:
+            if project_name is not None:
+                worker = self.workers.get(project_name)
+                if worker is None:
+                    raise RuntimeError(f"Proyecto no activo: {project_name}")
+                return worker
+            if not self.workers:
+                raise RuntimeError("No hay proyecto activo")
+            if len(self.workers) > 1:
+                raise RuntimeError("Hay varios proyectos activos: indica el proyecto")
+            return next(iter(self.workers.values()))
+
+    @property
+    def curr_project(self):
+        """
+        The running project when there is exactly one, else None.
+        """
+        with self._lock:
+            if len(self.workers) != 1:
+                return None
+            return next(iter(self.workers.values())).project
 
     def shutdown(self):
         # self.curr_project_monitor.stop()
-        if self.scheduler and self.scheduler.running:
-            self.scheduler.shutdown()
+        self.scheduler.shutdown()
+
+        with self._lock:
+            for worker in self.workers.values():
+                worker.camera_controller.close()
+            self.workers.clear()
+
+    def capture_now(self, wait: bool = True, project_name=None) -> dict:
+        return self.worker(project_name).camera_controller.take_picture(wait=wait)
 
-        if self.camera_controller:
-            self.camera_controller.close()
+    def capture_burst(self, controls_list, project_name=None):
+        return self.worker(project_name).camera_controller.capture_burst(controls_list)
 
-    def capture_now(self) -> dict:
-        if not self.camera_controller:
-            raise RuntimeError("No hay proyecto activo")
+    def preview_frame(self, project_name=None):
+        """
+        Low-res RGB frame for the live preview, or None if there is no such running camera
+        or it is busy taking a picture.
+        """
+        try:
+            worker = self.worker(project_name)
+        except RuntimeError:
+            return None
+        return worker.camera_controller.preview_frame()
 
-        return self.camera_controller.take_picture()
+    def stop_preview(self, project_name=None):
+        try:
+            worker = self.worker(project_name)
+        except RuntimeError:
+            return
+        worker.camera_controller.stop_preview()
 
 
 
@@ -0,0 +1,14 @@
+"""
+Datos de prueba compartidos por los tests.
+"""
+
+
+def capture_meta(i, project="p1", path=None):
+    return {
+        "project": project,
+        "filename": f"{project}_{i:04d}.jpg",
+        "timestamp_utc": f"20260101_{i // 3600:02d}{i // 60 % 60:02d}{i % 60:02d}",
+        "path": str(path) if path is not None else f"/media/{project}_{i:04d}.jpg",
+        "camera": "SIM0",
+        "metadata": {"ExposureTime": 1000 + i, "AnalogueGain": 1.0},
+    }
@@ -0,0 +1,86 @@
+"""
+Runner asíncrono: capturas concurrentes compartidas y executors por proyecto.
+"""
+import asyncio
+import threading
+import time
+
+from app.infrastructure.common.async_runner import AsyncRunner
+
+
+class StubRunner:
+    """
+    Runner mínimo: cada captura espera a `release` para que las peticiones coincidan.
+    """
+
+    def __init__(self):
+        self.active = []
+        self.calls = []
+        self.release = threading.Event()
+
+    def status(self):
+        return {}
+
+    def active_projects(self):
+        return list(self.active)
+
+    def start_project(self, name):
+        if name == "missing":
+            raise FileNotFoundError(name)
+        self.active.append(name)
+
+    def stop_project(self, name=None):
+        self.active.remove(name)
+
+    def capture_now(self, wait=False, project=None):
+        self.calls.append((project, wait))
+        self.release.wait(5)
+        return {"project": project, "wait": wait, "n": len(self.calls)}
+
+
+def camera_threads(name):
+    return [t for t in threading.enumerate() if t.name.startswith(f"camera-{name}_")]
+
+
+def test_concurrent_captures_share_one_shot():
+    runner = StubRunner()
+    async_runner = AsyncRunner(runner)
+
+    async def scenario():
+        await async_runner.start_project("p1")
+        shared = [asyncio.ensure_future(async_runner.capture_now(project="p1")) for _ in range(3)]
+        waited = asyncio.ensure_future(async_runner.capture_now(wait=True, project="p1"))
+        await asyncio.sleep(0.05)
+        runner.release.set()
+        return await asyncio.gather(*shared), await waited
+
+    shared, waited = asyncio.run(scenario())
+    assert shared[0] == shared[1] == shared[2]
+    # `wait` distinto es otra captura (una espera a que la foto esté escrita)
+    assert waited["wait"] and waited["n"] != shared[0]["n"]
+    assert sorted(runner.calls) == [("p1", False), ("p1", True)]
+    assert async_runner.status()["capture"] == {"inflight": 0, "captures": 2, "shared": 2}
+    async_runner.shutdown()
+
+
+def test_stopped_projects_release_their_executor():
+    runner = StubRunner()
+    runner.release.set()
+    async_runner = AsyncRunner(runner)
+
+    async def scenario():
+        await async_runner.start_project("p2")
+        await async_runner.capture_now(project="p2")
+        assert camera_threads("p2")
+        await async_runner.stop_project("p2")
+        try:
+            await async_runner.start_project("missing")
+        except FileNotFoundError:
+            pass
+
+    asyncio.run(scenario())
+    deadline = time.monotonic() + 5
+    while (camera_threads("p2") or camera_threads("missing")) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not camera_threads("p2") and not camera_threads("missing")
+    async_runner.shutdown()
@@ -0,0 +1,74 @@
+"""
+Sesiones de luz compartidas: las capturas que vencen juntas encienden la luz una vez.
+"""
+import pytest
+
+from app.infrastructure.common.capture_batcher import CaptureBatcher
+from app.infrastructure.common.light import LightArbiter
+from app.infrastructure.simulator.light_fake import FakeLight
+
+
+@pytest.fixture
+def light():
+    return FakeLight()
+
+
+@pytest.fixture
+def arbiter(light):
+    return LightArbiter(light)
+
+
+@pytest.fixture
+def batcher(arbiter):
+    batcher = CaptureBatcher(arbiter, window=0.5)
+    yield batcher
+    batcher.shutdown(timeout=5)
+
+
+def capture(arbiter, light, camera, log):
+    """
+    Captura como la de los runners: enciende y apaga la luz de su cámara.
+    """
+    def job():
+        handle = arbiter.handle(camera)
+        handle.turn_on()
+        log.append((camera, light.on))
+        handle.turn_off()
+        return camera
+    return job
+
+
+def test_batched_captures_share_one_light_session(batcher, arbiter, light):
+    log = []
+    futures = [batcher.submit(capture(arbiter, light, i, log)) for i in range(3)]
+    futures.append(batcher.submit(lambda: log.append(("dark", light.on)), use_light=False))
+
+    assert [f.result(5) for f in futures[:3]] == [0, 1, 2]
+    futures[3].result(5)
+    # Primero las capturas sin luz, después las demás con la luz ya encendida
+    assert log == [("dark", False), (0, True), (1, True), (2, True)]
+    assert not light.on
+    assert arbiter.switches == 1
+
+    stats = batcher.stats()
+    assert (stats["sessions"], stats["frames"], stats["toggles_saved"]) == (1, 4, 4)
+    assert stats["recent"][0]["lit"] == 3
+
+
+def test_lone_capture_saves_nothing(batcher, arbiter, light):
+    batcher.run(capture(arbiter, light, 0, []))
+    batcher.run(lambda: None, use_light=False)
+    assert batcher.stats()["toggles_saved"] == 0
+    assert arbiter.switches == 1
+
+
+def test_failed_capture_does_not_break_the_session(batcher, arbiter, light):
+    def broken():
+        raise RuntimeError("cámara desconectada")
+
+    futures = [batcher.submit(broken), batcher.submit(capture(arbiter, light, 1, []))]
+    with pytest.raises(RuntimeError):
+        futures[0].result(5)
+    assert futures[1].result(5) == 1
+    assert not light.on
+    assert batcher.stats()["toggles_saved"] == 2
@@ -0,0 +1,99 @@
+"""
+Catálogo SQLite: paginación keyset, cursores, espacio por proyecto mantenido por
+triggers y metadatos a un solo nivel.
+"""
+import json
+import sqlite3
+
+import pytest
+
+from app.infrastructure.db import CaptureCatalog, decode_cursor, encode_cursor
+from factories import capture_meta
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = CaptureCatalog(tmp_path / "catalog.sqlite")
+    yield catalog
+    catalog.close()
+
+
+def at_second(i, second, **extra):
+    """
+    Captura i con el timestamp del segundo `second` (varias pueden compartirlo).
+    """
+    return {**capture_meta(i), "timestamp_utc": f"20260101_0000{second:02d}", **extra}
+
+
+def test_query_pages_by_keyset(catalog):
+    # Varias capturas por segundo: el desempate es el id
+    for i in range(7):
+        catalog.record(at_second(i, i // 3))
+
+    pages, cursor = [], None
+    while True:
+        items, cursor = catalog.query("p1", cursor=cursor, limit=3)
+        pages.append([item["filename"] for item in items])
+        if cursor is None:
+            break
+    assert pages == [
+        ["p1_0000.jpg", "p1_0001.jpg", "p1_0002.jpg"],
+        ["p1_0003.jpg", "p1_0004.jpg", "p1_0005.jpg"],
+        ["p1_0006.jpg"],
+    ]
+
+
+def test_query_cursor_is_stable_under_inserts(catalog):
+    for i in range(4):
+        catalog.record(at_second(i, 10 + i))
+    first, cursor = catalog.query("p1", limit=2)
+
+    # Una captura anterior que llega tarde no desplaza la página siguiente
+    catalog.record(at_second(9, 0))
+    items, cursor = catalog.query("p1", cursor=cursor, limit=2)
+    assert [item["filename"] for item in items] == ["p1_0002.jpg", "p1_0003.jpg"]
+    assert cursor is None
+
+
+def test_cursor_round_trip(catalog):
+    ts = 1767225600.123456
+    assert decode_cursor(encode_cursor(ts, 42)) == (ts, 42)
+    with pytest.raises(ValueError):
+        decode_cursor("no-es-un-cursor")
+
+    for i in range(3):
+        catalog.record(capture_meta(i))
+    cursor = catalog.cursor_for("p1", "p1_0000.jpg")
+    assert [item["filename"] for item in catalog.iter_range("p1", cursor=cursor)] == ["p1_0001.jpg", "p1_0002.jpg"]
+    assert catalog.cursor_for("p1", "no-existe.jpg") is None
+
+
+def test_usage_follows_inserts_replacements_and_deletes(catalog):
+    for i in range(3):
+        catalog.record({**capture_meta(i), "size_bytes": 100})
+    catalog.record({**capture_meta(0, project="p2"), "size_bytes": 7})
+    assert catalog.usage() == {"p1": {"files": 3, "bytes": 300}, "p2": {"files": 1, "bytes": 7}}
+
+    # Volver a registrar la misma captura la sustituye: no cuenta dos veces
+    catalog.record({**capture_meta(1), "size_bytes": 150})
+    catalog.update_size("p1", "p1_0002.jpg", 40)
+    assert catalog.usage()["p1"] == {"files": 3, "bytes": 290}
+
+    catalog.delete("p1", "p1_0000.jpg")
+    catalog.delete("p2", "p2_0000.jpg")
+    assert catalog.usage() == {"p1": {"files": 2, "bytes": 190}}
+
+
+def test_metadata_is_flat(catalog, tmp_path):
+    catalog.record({**capture_meta(0), "dedup": {"action": "stored"}})
+    metadata = catalog.get("p1", "p1_0000.jpg")["metadata"]
+    assert metadata == {"ExposureTime": 1000, "AnalogueGain": 1.0, "dedup": {"action": "stored"}}
+
+    # Filas de versiones anteriores, con los metadatos de la cámara anidados
+    with sqlite3.connect(tmp_path / "catalog.sqlite") as conn:
+        nested = {"metadata": {"ExposureTime": 5}, "merged_from": ["a.jpg"]}
+        conn.execute(
+            "INSERT INTO captures (project, ts, filename, path, metadata) VALUES ('p1', 0, 'old.jpg', '/old.jpg', ?)",
+            (json.dumps(nested),),
+        )
+    assert catalog.get("p1", "old.jpg")["metadata"] == {"ExposureTime": 5, "merged_from": ["a.jpg"]}
@@ -0,0 +1,81 @@
+"""
+Decisiones de la etapa dedup sobre escenas simuladas: repeticiones de noche y de día,
+cambios visibles, keyframes del modo delta y fusiones HDR.
+"""
+from datetime import datetime
+
+import pytest
+
+from app.infrastructure.dedup import DedupStage
+from app.infrastructure.simulator.camera_fake import PlantScene
+from factories import capture_meta
+
+
+class Registry:
+    def __init__(self, policy):
+        self.config = {"dedup": policy}
+
+    def get(self, name):
+        return self.config
+
+
+def run_dedup(stage, frames):
+    actions = []
+    for i, frame in enumerate(frames):
+        result = stage(capture_meta(i), frame)
+        if result is None:
+            actions.append("skipped")
+            continue
+        meta = result[0] if isinstance(result, tuple) else result
+        actions.append(meta["dedup"]["action"])
+        stage.on_capture({**meta, "size_bytes": 1000})
+    return actions
+
+
+def at(hour, day=0):
+    return datetime(2026, 3, 10 + day, hour).timestamp()
+
+
+@pytest.fixture(scope="module")
+def scene():
+    # A 1280 px el ruido de una noche ya cambia varios bits del dHash sin máscara
+    return PlantScene(1280, 720, seed=0, start=at(0, -7))
+
+
+@pytest.mark.parametrize("hour", [2, 12])
+def test_dedup_detects_repeated_frames(scene, hour):
+    frames = [scene.render(t=at(hour) + 60 * i) for i in range(4)]
+    stage = DedupStage(Registry({"mode": "skip"}))
+    assert run_dedup(stage, frames) == ["stored", "skipped", "skipped", "skipped"]
+
+
+def test_dedup_keeps_visible_changes(scene):
+    frames = [scene.render(t=at(12)), scene.render(t=at(13)), scene.render(t=at(12, 1))]
+    stage = DedupStage(Registry({"mode": "skip"}))
+    assert run_dedup(stage, frames) == ["stored", "stored", "stored"]
+
+
+def test_dedup_delta_keyframes(scene):
+    frames = [scene.render(t=at(2) + 60 * i) for i in range(5)]
+    stage = DedupStage(Registry({"mode": "delta", "keyframe_every": 2}))
+    assert run_dedup(stage, frames) == ["keyframe", "delta", "delta", "keyframe", "delta"]
+
+
+def test_dedup_delta_waits_for_keyframe_write(scene):
+    frame = scene.render(t=at(2))
+    stage = DedupStage(Registry({"mode": "delta"}))
+    assert stage(capture_meta(0), frame)["dedup"]["action"] == "keyframe"
+    # Sin confirmar la escritura del keyframe no hay referencia para diferencias
+    assert stage(capture_meta(1), frame)["dedup"]["action"] == "keyframe"
+    stage.on_capture({**capture_meta(1), "dedup": {"action": "keyframe"}, "size_bytes": 1000})
+    meta, encoder = stage(capture_meta(2), frame)
+    assert meta["dedup"]["keyframe"] == "p1_0001.jpg"
+    assert encoder.keyframe_name == "p1_0001.jpg"
+
+
+def test_dedup_ignores_hdr_merges(scene):
+    frame = scene.render(t=at(2))
+    stage = DedupStage(Registry({"mode": "skip"}))
+    run_dedup(stage, [frame])
+    merged = {**capture_meta(1), "merged_from": ["a.jpg", "b.jpg"]}
+    assert stage(merged, frame) is merged
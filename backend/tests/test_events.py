@@ -0,0 +1,65 @@
+"""
+Hub de eventos SSE: reenvío tras reconectar con Last-Event-ID, resync cuando el
+histórico ya no alcanza y cierre del stream de un cliente que no da abasto.
+"""
+import asyncio
+import json
+
+from app.infrastructure.events import EventHub
+
+
+def parse(message):
+    fields = dict(line.split(": ", 1) for line in message.decode().strip().split("\n"))
+    return fields["event"], json.loads(fields["data"])
+
+
+def subscribe(hub, last_event_id=None, publish=()):
+    """
+    Suscribe con `last_event_id`, publica `publish` y devuelve lo que recibe el cliente.
+    """
+    async def scenario():
+        sub = hub.subscribe(last_event_id)
+        for n in publish:
+            hub.publish("capture", {"n": n})
+        received = []
+        while True:
+            try:
+                message = await asyncio.wait_for(sub.get(), 0.1)
+            except asyncio.TimeoutError:
+                break
+            received.append(message and parse(message))
+            if message is None:
+                break
+        hub.unsubscribe(sub)
+        return received
+    return asyncio.run(scenario())
+
+
+def test_reconnect_replays_missed_events():
+    hub = EventHub(history=8)
+    ids = [hub.publish("capture", {"n": n}) for n in range(3)]
+
+    assert subscribe(hub, ids[0], publish=[3]) == [("capture", {"n": n}) for n in (1, 2, 3)]
+    # Al día: solo lo que se publica después
+    assert subscribe(hub, hub.status()["last_event_id"], publish=[4]) == [("capture", {"n": 4})]
+    # Sin Last-Event-ID no hay reenvío
+    assert subscribe(hub, publish=[5]) == [("capture", {"n": 5})]
+
+
+def test_reconnect_resyncs_when_history_is_gone():
+    hub = EventHub(history=2)
+    ids = [hub.publish("capture", {"n": n}) for n in range(4)]
+    last = hub.status()["last_event_id"]
+
+    # El siguiente al perdido aún está: basta con reenviar
+    assert subscribe(hub, ids[1]) == [("capture", {"n": 2}), ("capture", {"n": 3})]
+    for stale in (ids[0], last + 100):
+        assert subscribe(hub, stale) == [("resync", {"last_event_id": last})]
+
+
+def test_slow_client_is_closed():
+    hub = EventHub(queue_size=2)
+    received = subscribe(hub, publish=range(5))
+    # Se descarta lo más antiguo y se marca el desbordamiento: el stream debe cerrarse
+    assert received[-1] is None
+    assert len(received) == 2
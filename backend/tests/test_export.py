@@ -0,0 +1,64 @@
+"""
+Export ZIP generado al vuelo: archivo válido, reanudación por cursor, ZIP64 y
+ficheros que faltan.
+"""
+import io
+import zipfile
+
+import pytest
+
+from app.infrastructure.db import CaptureCatalog
+from app.infrastructure.export import ZipExporter
+from factories import capture_meta
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = CaptureCatalog(tmp_path / "catalog.db")
+    yield catalog
+    catalog.close()
+
+
+def add_files(catalog, tmp_path, n):
+    contents = {}
+    for i in range(n):
+        path = tmp_path / f"p1_{i:04d}.jpg"
+        data = bytes([i]) * (1000 + i)
+        path.write_bytes(data)
+        meta = capture_meta(i, path=path)
+        catalog.record({**meta, "size_bytes": len(data)})
+        contents[f"p1/{meta['filename']}"] = data
+    return contents
+
+
+def read_zip(chunks):
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+    assert archive.testzip() is None
+    return {name: archive.read(name) for name in archive.namelist()}
+
+
+def test_export_streams_valid_zip_and_resumes(catalog, tmp_path):
+    contents = add_files(catalog, tmp_path, 5)
+    exporter = ZipExporter(catalog)
+    assert read_zip(exporter.stream("p1")) == contents
+
+    cursor = catalog.cursor_for("p1", "p1_0002.jpg")
+    resumed = read_zip(exporter.stream("p1", cursor=cursor))
+    assert sorted(resumed) == ["p1/p1_0003.jpg", "p1/p1_0004.jpg"]
+
+
+def test_export_writes_zip64_records(catalog, tmp_path, monkeypatch):
+    contents = add_files(catalog, tmp_path, 3)
+    # Límite ZIP64 diminuto: mismas estructuras que un export de más de 4GB
+    monkeypatch.setattr(zipfile, "ZIP64_LIMIT", 512)
+    data = b"".join(ZipExporter(catalog).stream("p1"))
+    assert b"PK\x06\x06" in data  # end of central directory ZIP64
+    monkeypatch.undo()
+    assert read_zip([data]) == contents
+
+
+def test_export_skips_missing_files(catalog, tmp_path):
+    contents = add_files(catalog, tmp_path, 3)
+    (tmp_path / "p1_0001.jpg").unlink()
+    del contents["p1/p1_0001.jpg"]
+    assert read_zip(ZipExporter(catalog).stream("p1")) == contents
@@ -0,0 +1,80 @@
+"""
+Árbitro de la luz compartida: la luz física sigue encendida mientras alguna
+cámara la necesite.
+"""
+import threading
+
+from app.infrastructure.common.light import LightArbiter
+
+
+class RecordingLight:
+    def __init__(self):
+        self.on = False
+        self.calls = []
+
+    def turn_on(self):
+        self.calls.append("on")
+        self.on = True
+
+    def turn_off(self):
+        self.calls.append("off")
+        self.on = False
+
+    def close(self):
+        self.calls.append("close")
+
+
+def test_light_stays_on_until_the_last_holder_releases():
+    light = RecordingLight()
+    arbiter = LightArbiter(light)
+    cam0, cam1 = arbiter.handle(0), arbiter.handle(1)
+
+    cam0.turn_on()
+    cam1.turn_on()
+    cam0.turn_off()
+    # La cámara 1 sigue exponiendo
+    assert light.on and arbiter.status()["holders"] == ["1"]
+    cam1.turn_off()
+
+    assert light.calls == ["on", "off"]
+    assert arbiter.status() == {"on": False, "holders": [], "switches": 1, "overlaps": 1}
+
+
+def test_repeated_calls_from_one_holder_count_once():
+    light = RecordingLight()
+    arbiter = LightArbiter(light)
+    cam0, cam1 = arbiter.handle(0), arbiter.handle(1)
+
+    cam0.turn_on()
+    cam0.turn_on()
+    cam1.turn_on()
+    cam0.turn_off()
+    cam0.turn_off()
+    assert light.on
+    cam1.turn_off()
+    cam1.close()
+    assert light.calls == ["on", "off"]
+
+
+def test_concurrent_holders():
+    light = RecordingLight()
+    arbiter = LightArbiter(light)
+    barrier = threading.Barrier(8)
+
+    def camera(owner):
+        handle = arbiter.handle(owner)
+        barrier.wait()
+        for _ in range(200):
+            handle.turn_on()
+            handle.turn_off()
+
+    threads = [threading.Thread(target=camera, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not light.on
+    assert light.calls.count("on") == light.calls.count("off") == arbiter.switches
+    # Nunca dos encendidos (o apagados) seguidos de la luz física
+    assert all(a != b for a, b in zip(light.calls, light.calls[1:]))
@@ -0,0 +1,101 @@
+"""
+Recuperación del log de metadatos tras un corte: línea a medias, compactación
+interrumpida y logs ya compactados.
+Desde backend/: python -m pytest tests
+"""
+import json
+
+from app.infrastructure.metadata_log import CURRENT_NAME, LOG_NAME, MetadataLog
+from factories import capture_meta
+
+
+def filenames(log, project="p1"):
+    return [r["filename"] for r in log.records(project)]
+
+
+def test_metadata_log_truncates_torn_line(tmp_path):
+    log = MetadataLog(tmp_path)
+    for i in range(3):
+        log.append(capture_meta(i))
+    log.close()
+    # Corte de luz a mitad de una línea
+    with open(tmp_path / "p1" / LOG_NAME, "ab") as f:
+        f.write(b'{"project":"p1","filena')
+
+    log = MetadataLog(tmp_path)
+    assert filenames(log) == [f"p1_{i:04d}.jpg" for i in range(3)]
+    log.append(capture_meta(3))
+    log.close()
+    assert filenames(MetadataLog(tmp_path))[-1] == "p1_0003.jpg"
+
+
+def test_metadata_log_replays_interrupted_compaction(tmp_path):
+    log = MetadataLog(tmp_path)
+    for i in range(4):
+        log.append(capture_meta(i))
+    log.close()
+    # Compactación cortada tras renombrar el log: ni segmento completo ni `current`
+    project_dir = tmp_path / "p1"
+    (project_dir / LOG_NAME).rename(project_dir / "log-1.jsonl")
+    (project_dir / ".segment-1.tmp").mkdir()
+
+    log = MetadataLog(tmp_path)
+    assert len(filenames(log)) == 4
+    log.append(capture_meta(4))
+    assert log.compact("p1")
+    log.close()
+
+    assert (project_dir / CURRENT_NAME).read_text() == "2"
+    assert not (project_dir / "log-1.jsonl").exists()
+    log = MetadataLog(tmp_path)
+    assert filenames(log) == [f"p1_{i:04d}.jpg" for i in range(5)]
+    assert log.record("p1", "p1_0002.jpg")["metadata"]["ExposureTime"] == 1002
+
+
+def test_metadata_log_drops_logs_already_compacted(tmp_path):
+    log = MetadataLog(tmp_path)
+    for i in range(3):
+        log.append(capture_meta(i))
+    assert log.compact("p1")
+    log.close()
+    # Corte tras apuntar `current` pero antes de borrar el log ya compactado
+    project_dir = tmp_path / "p1"
+    stale = "".join(json.dumps(capture_meta(i)) + "\n" for i in range(3))
+    (project_dir / "log-1.jsonl").write_text(stale)
+
+    log = MetadataLog(tmp_path)
+    assert len(filenames(log)) == 3
+    assert not (project_dir / "log-1.jsonl").exists()
+
+
+def test_metadata_log_appends_segments(tmp_path):
+    log = MetadataLog(tmp_path)
+    project_dir = tmp_path / "p1"
+    sizes = [4, 1, 1, 1]
+    i = 0
+    for size in sizes:
+        for _ in range(size):
+            log.append(capture_meta(i))
+            i += 1
+        assert log.compact("p1")
+        if i == 4:
+            first = (project_dir / "segment-1" / "records.jsonl").stat()
+
+    # El 2 se funde con el 3 (mismo tamaño); el 1, mayor, no se reescribe y el 4 se añade
+    assert (project_dir / CURRENT_NAME).read_text() == "1 3 4"
+    assert (project_dir / "segment-1" / "records.jsonl").stat() == first
+    assert sorted(p.name for p in project_dir.iterdir() if p.name.startswith("segment-")) == [
+        "segment-1", "segment-3", "segment-4",
+    ]
+    assert log.status()["p1"]["segments"] == 3
+
+    meta = capture_meta(i)
+    meta["metadata"]["Lux"] = 12.5
+    log.append(meta)
+    log.close()
+    log = MetadataLog(tmp_path)
+    assert filenames(log) == [f"p1_{n:04d}.jpg" for n in range(i + 1)]
+    assert log.record("p1", "p1_0005.jpg")["metadata"]["ExposureTime"] == 1005
+    result = log.query("p1", fields=["ExposureTime", "Lux"], where=[("ExposureTime", ">=", 1003)])
+    assert result["columns"]["filename"] == [f"p1_{n:04d}.jpg" for n in range(3, i + 1)]
+    assert result["columns"]["Lux"] == [None] * (i - 3) + [12.5]
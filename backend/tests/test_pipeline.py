@@ -0,0 +1,109 @@
+"""
+Cola de persistencia: políticas cuando se llena (por trabajos o por bytes).
+"""
+import threading
+
+import pytest
+
+from app.infrastructure.common.pipeline import CapturePipeline, FrameDropped
+
+
+class Busy:
+    """
+    Ocupa el único hilo de escritura hasta `release()`, para poder llenar la cola.
+    """
+
+    def __init__(self, pipeline):
+        self.started = threading.Event()
+        self.gate = threading.Event()
+        self.future = pipeline.submit(self._job)
+        assert self.started.wait(5)
+
+    def _job(self):
+        self.started.set()
+        self.gate.wait(5)
+        return "busy"
+
+    def release(self):
+        self.gate.set()
+
+
+@pytest.fixture
+def make_pipeline():
+    pipelines = []
+
+    def make(**kwargs):
+        pipelines.append(CapturePipeline(workers=1, **kwargs))
+        return pipelines[-1]
+    yield make
+    for pipeline in pipelines:
+        pipeline.shutdown(wait=False)
+
+
+def job(value):
+    return lambda: value
+
+
+def test_block_waits_for_room(make_pipeline):
+    pipeline = make_pipeline(queue_size=2, policy="block")
+    busy = Busy(pipeline)
+    queued = [pipeline.submit(job(i)) for i in range(2)]
+
+    submitted = []
+    waiter = threading.Thread(target=lambda: submitted.append(pipeline.submit(job(2))))
+    waiter.start()
+    waiter.join(0.2)
+    assert waiter.is_alive()
+    assert pipeline.depth == 2
+
+    busy.release()
+    waiter.join(5)
+    assert [f.result(5) for f in queued + submitted] == [0, 1, 2]
+    assert pipeline.stats()["dropped"] == 0
+
+
+@pytest.mark.parametrize("policy, dropped", [("drop_oldest", 0), ("drop_newest", 2)])
+def test_drop_policies(make_pipeline, policy, dropped):
+    pipeline = make_pipeline(queue_size=2, policy=policy)
+    busy = Busy(pipeline)
+    futures = [pipeline.submit(job(i)) for i in range(3)]
+    assert pipeline.depth == 2
+    busy.release()
+
+    with pytest.raises(FrameDropped):
+        futures[dropped].result(5)
+    assert [f.result(5) for i, f in enumerate(futures) if i != dropped] == [i for i in range(3) if i != dropped]
+    assert pipeline.stats()["dropped"] == 1
+
+
+def test_max_bytes_bounds_the_queue(make_pipeline):
+    pipeline = make_pipeline(queue_size=8, policy="drop_newest", max_bytes=100)
+    busy = Busy(pipeline)
+    # En la cola vacía siempre cabe uno, aunque supere el límite
+    big = pipeline.submit(job("big"), nbytes=500)
+    assert pipeline.stats()["queued_bytes"] == 500
+    with pytest.raises(FrameDropped):
+        pipeline.submit(job("small"), nbytes=10).result(5)
+    busy.release()
+    assert big.result(5) == "big"
+
+    busy = Busy(pipeline)
+    kept = [pipeline.submit(job(i), nbytes=40) for i in range(2)]
+    over = pipeline.submit(job(2), nbytes=40)
+    assert pipeline.stats()["queued_bytes"] == 80
+    busy.release()
+    with pytest.raises(FrameDropped):
+        over.result(5)
+    assert [f.result(5) for f in kept] == [0, 1]
+    assert pipeline.stats()["queued_bytes"] == 0
+
+
+def test_drop_oldest_frees_bytes(make_pipeline):
+    pipeline = make_pipeline(queue_size=8, policy="drop_oldest", max_bytes=100)
+    busy = Busy(pipeline)
+    first, second = (pipeline.submit(job(i), nbytes=60) for i in range(2))
+    assert pipeline.stats()["queued_bytes"] == 60
+    busy.release()
+    with pytest.raises(FrameDropped):
+        first.result(5)
+    assert second.result(5) == 1
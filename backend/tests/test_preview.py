@@ -0,0 +1,35 @@
+"""
+Productores de preview por proyecto: uno por cámara mientras haya clientes.
+"""
+import asyncio
+import threading
+
+import numpy as np
+
+from app.infrastructure.preview import PreviewBroadcasters
+
+
+def test_broadcaster_is_shared_and_dropped_when_idle():
+    idle = threading.Event()
+    calls = []
+
+    def source(project):
+        calls.append(project)
+        return np.zeros((8, 8, 3), dtype=np.uint8)
+
+    previews = PreviewBroadcasters(source, on_idle=lambda project: idle.set(), fps=100)
+
+    async def watch():
+        (first, a), (second, b) = previews.subscribe("p1"), previews.subscribe("p1")
+        assert first is second
+        parts = [await a.get(), await b.get()]
+        first.unsubscribe(a)
+        first.unsubscribe(b)
+        return parts
+
+    parts = asyncio.run(watch())
+    assert parts[0].startswith(b"--frame")
+    # Se descarta antes de avisar a on_idle (que para la preview de la cámara)
+    assert idle.wait(5)
+    assert previews.status() == {}
+    assert set(calls) == {"p1"}
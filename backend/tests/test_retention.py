@@ -0,0 +1,110 @@
+"""
+Retención: una de cada `keep_every` capturas envejecidas se conserva (reducida con
+`downsample`) y el resto se borra; el cursor evita volver a tratar las ya vistas.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from PIL import Image
+
+from app.infrastructure.db import CaptureCatalog
+from app.infrastructure.retention import RetentionCompactor
+from factories import capture_meta
+
+
+class Registry:
+    def __init__(self, policy):
+        self.config = {"retention": policy}
+
+    def names(self):
+        return ["p1"]
+
+    def get(self, name):
+        return self.config
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = CaptureCatalog(tmp_path / "catalog.sqlite")
+    yield catalog
+    catalog.close()
+
+
+def add_capture(catalog, media, i, **extra):
+    path = media / f"p1_{i:04d}.jpg"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", (320, 240), (i * 10 % 256, 120, 60)).save(path, quality=95)
+    path.with_name(f"{path.name}.json").write_text("{}")
+    meta = {**capture_meta(i, path=path), "size_bytes": path.stat().st_size, **extra}
+    catalog.record(meta)
+    return path
+
+
+def compactor(catalog, policy):
+    return RetentionCompactor(catalog, Registry(policy), io_rate=0)
+
+
+def test_keep_every_and_downsample(catalog, tmp_path):
+    media = tmp_path / "media" / "p1"
+    paths = [add_capture(catalog, media, i) for i in range(7)]
+
+    summary = compactor(catalog, {"full_days": 7, "downsample": 64, "keep_every": 3}).run_once()
+    assert (summary["deleted"], summary["downsampled"]) == (4, 3)
+
+    kept = [i for i, p in enumerate(paths) if p.exists()]
+    assert kept == [0, 3, 6]
+    assert not any(p.with_name(f"{p.name}.json").exists() for i, p in enumerate(paths) if i not in kept)
+    for i in kept:
+        with Image.open(paths[i]) as img:
+            assert max(img.size) == 64
+    usage = catalog.usage()["p1"]
+    assert usage == {"files": 3, "bytes": sum(paths[i].stat().st_size for i in kept)}
+    assert summary["bytes_freed"] > 0
+
+
+def test_cursor_does_not_reprocess(catalog, tmp_path):
+    media = tmp_path / "media" / "p1"
+    for i in range(4):
+        add_capture(catalog, media, i)
+    retention = compactor(catalog, {"full_days": 7, "keep_every": 2})
+    assert retention.run_once()["deleted"] == 2
+
+    # Segunda pasada: nada nuevo que tratar, aunque las conservadas sigan envejecidas
+    assert retention.run_once()["deleted"] == 0
+
+    # Las siguientes continúan la cuenta: la 4 es la quinta envejecida (se conserva), la 5 no
+    add_capture(catalog, media, 4)
+    add_capture(catalog, media, 5)
+    now = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+    add_capture(catalog, media, 6, timestamp_utc=now)
+    assert retention.run_once()["deleted"] == 1
+    assert [item["filename"] for item in catalog.iter_range("p1")] == [
+        "p1_0000.jpg", "p1_0002.jpg", "p1_0004.jpg", "p1_0006.jpg",
+    ]
+    assert catalog.retention_state("p1")[1] == 6
+
+
+def test_keyframes_are_kept_only_while_a_delta_uses_them(catalog, tmp_path):
+    media = tmp_path / "media" / "p1"
+    recent = datetime.now(timezone.utc) - timedelta(days=1)
+    keyframe = {"dedup": {"action": "keyframe"}}
+    delta = {"dedup": {"action": "delta", "keyframe": "p1_0001.jpg"}}
+    paths = [
+        add_capture(catalog, media, 0),
+        add_capture(catalog, media, 1, **keyframe),
+        add_capture(catalog, media, 2, **delta),
+        add_capture(catalog, media, 3, **delta, timestamp_utc=recent.strftime("%Y%m%d_%H%M%S")),
+        # En modo delta toda captura distinta es keyframe, aunque no la use ningún delta
+        add_capture(catalog, media, 4, **keyframe, timestamp_utc="20260102_000000"),
+    ]
+    registry = Registry({"full_days": 7, "keep_every": 100})
+    retention = RetentionCompactor(catalog, registry, io_rate=0)
+
+    assert retention.run_once()["deleted"] == 2
+    assert [p.exists() for p in paths] == [True, True, False, True, False]
+
+    # Cuando envejece el último delta que lo usa, el keyframe sigue su suerte
+    registry.config["retention"]["full_days"] = 0
+    assert retention.run_once()["deleted"] == 2
+    assert [p.exists() for p in paths] == [True, False, False, False, False]
+    assert catalog.take_held("p1", "p1_0001.jpg") is None
@@ -0,0 +1,36 @@
+"""
+Runner simulado de extremo a extremo: captura, cola de persistencia y catálogo.
+"""
+import json
+
+import pytest
+
+from app.infrastructure.db import CaptureCatalog
+from app.infrastructure.projects_fs import ProjectRegistry
+from app.infrastructure.simulator.runner_fake import FakeRunner
+
+
+@pytest.fixture
+def runner(tmp_path):
+    project_dir = tmp_path / "projects" / "p1"
+    project_dir.mkdir(parents=True)
+    (project_dir / "config.json").write_text(json.dumps({"camera": 0, "interval": 3600, "use_light": False}))
+    registry = ProjectRegistry(tmp_path / "projects").start()
+    runner = FakeRunner(tmp_path, registry=registry, frame_width=160, autostart=False)
+    runner.start_project("p1")
+    yield runner
+    runner.shutdown()
+    registry.stop()
+
+
+def test_back_to_back_captures_do_not_overwrite(runner, tmp_path):
+    catalog = CaptureCatalog(tmp_path / "catalog.sqlite")
+    runner.add_capture_listener(catalog.record)
+
+    futures = [runner.submit_capture("p1")[1] for _ in range(20)]
+    filenames = {f.result(timeout=10)["filename"] for f in futures}
+
+    assert len(filenames) == 20
+    assert len(list((tmp_path / "media" / "p1").iterdir())) == 20
+    assert catalog.count("p1") == 20
+    catalog.close()
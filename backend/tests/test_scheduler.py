@@ -0,0 +1,107 @@
+"""
+Rejilla del scheduler y políticas ante disparos tardíos, con un reloj simulado
+que solo avanza cuando lo mueve el test (o la propia captura, para simular una lenta).
+"""
+import threading
+import time
+
+import pytest
+
+from app.infrastructure.common.scheduler import CaptureScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.deadline = None
+        self._cond = threading.Condition()
+
+    def __call__(self):
+        return self.now
+
+    def wait(self, stop, delay):
+        with self._cond:
+            self.deadline = self.now + delay
+            while self.now < self.deadline and not stop.is_set():
+                self._cond.wait(0.01)
+            self.deadline = None
+        return stop.is_set()
+
+    def advance(self, seconds):
+        with self._cond:
+            self.now += seconds
+            self._cond.notify_all()
+
+    def settle(self, timeout=5.0):
+        """
+        Espera a que el hilo del job esté parado esperando un disparo futuro.
+        """
+        end = time.monotonic() + timeout
+        while time.monotonic() < end:
+            deadline = self.deadline
+            if deadline is not None and deadline > self.now:
+                return
+            time.sleep(0.005)
+        raise AssertionError("El job no ha vuelto a esperar")
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def scheduler(clock):
+    scheduler = CaptureScheduler(max_catch_up=2, clock=clock, wait=clock.wait)
+    yield scheduler
+    scheduler.shutdown(wait=True, timeout=1)
+
+
+def slow_first_run(clock, seconds):
+    """
+    Job cuya primera ejecución tarda `seconds` (en el reloj simulado).
+    """
+    runs = []
+
+    def func():
+        if not runs:
+            clock.advance(seconds)
+        runs.append(clock.now)
+    return func, runs
+
+
+def test_scheduler_fires_on_the_grid(scheduler, clock):
+    # La primera captura tarda 4 s (dentro del margen): no desplaza la siguiente
+    func, runs = slow_first_run(clock, 4.0)
+    scheduler.add("job", func, interval=10.0, grace=5.0, start=0.0)
+    clock.settle()
+    clock.advance(10.0 - clock.now)
+    clock.settle()
+
+    stats = scheduler.stats()["job"]
+    assert runs == [4.0, 10.0]
+    assert [r["slot"] for r in stats["recent"]] == [0, 1]
+    assert [r["late"] for r in stats["recent"]] == [0.0, 0.0]
+    assert stats["fires"] == 2
+    assert stats["skipped"] == stats["coalesced"] == stats["caught_up"] == 0
+
+
+@pytest.mark.parametrize("misfire, took, slots, counts", [
+    ("skip", 34.0, [0, 3], {"skipped": 2}),
+    ("skip", 38.0, [0], {"skipped": 3}),
+    ("coalesce", 38.0, [0, 3], {"coalesced": 2}),
+    ("catch_up", 38.0, [0, 2, 3], {"skipped": 1, "caught_up": 2}),
+])
+def test_scheduler_misfire_policies(scheduler, clock, misfire, took, slots, counts):
+    # La primera captura tarda `took` s y deja vencidos los huecos 1-3 (a 10, 20 y 30 s)
+    func, runs = slow_first_run(clock, took)
+    scheduler.add("job", func, interval=10.0, misfire=misfire, grace=5.0, start=0.0)
+    clock.settle()
+
+    stats = scheduler.stats()["job"]
+    assert [r["slot"] for r in stats["recent"]] == slots
+    assert stats["fires"] == len(runs) == len(slots)
+    for reason in ("skipped", "coalesced", "caught_up"):
+        assert stats[reason] == counts.get(reason, 0)
+    # El siguiente disparo sigue en la rejilla (hueco 4, a los 40 s)
+    assert clock.deadline == 40.0
@@ -0,0 +1,383 @@
+"""
+Performance benchmarks on the simulator: FakeRunner and the FastAPI app in-process.
+
+    python tools/benchmark.py run [-o results.json] [--frames 10,1000,100000] [--baseline baseline.json]
+    python tools/benchmark.py compare baseline.json results.json [--threshold 0.15]
+
+Run from backend/. Every run uses a fresh temporary data directory, fixed seeds and
+medians/percentiles over many samples, so two runs on the same machine are comparable.
+--sim-latency scales the simulated sensor/encode/light timings (0, the default, measures
+only the software; 1 behaves like the OwlSight/V3 cameras on the device).
+
+Suites (select with --suite, default all):
+    capture   capture_now per-phase latency (frame taken, persisted) and throughput
+    api       /api/status and /api/projects p50/p99 and req/s under --clients concurrent clients,
+              plus time from app startup to the first answer and to /api/ready
+    listing   catalog ingest, first/deep page, usage ledger and series with N synthetic
+              frames (--frames, up to 1000000) and filesystem discovery up to --fs-max frames
+    encode    per output preset (format:quality, see "format"/"quality" in config.json):
+              encode and write time and bytes per frame of a simulated plant scene
+              --encode-width px wide (0: full OwlSight resolution), and the throughput of
+              an encoder pool of --encoder-workers threads; run it on the device to pick
+              a preset for its hardware
+
+Results are written as JSON: {"meta": {...}, "metrics": {name: {value, unit, better}}}.
+`compare` (or `run --baseline`) flags every metric that got worse than the baseline by
+more than --threshold (relative) and exits with status 1 if there is any regression.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+class Metrics:
+    def __init__(self):
+        self.values = {}
+
+    def add(self, name, value, unit="ms", better="lower"):
+        self.values[name] = {"value": round(value, 4), "unit": unit, "better": better}
+        print(f"  {name:<44}{value:>14.3f} {unit}")
+
+    def latencies(self, prefix, samples):
+        ms = [s * 1000 for s in samples]
+        self.add(f"{prefix}.p50", percentile(ms, 50))
+        self.add(f"{prefix}.p99", percentile(ms, 99))
+
+
+def write_project(data_dir, name, **config):
+    path = data_dir / "projects" / name
+    path.mkdir(parents=True, exist_ok=True)
+    (path / "config.json").write_text(json.dumps({"interval": 86400, **config}))
+
+
+# --- capture ---
+def bench_capture(data_dir, metrics, captures, latency):
+    from app.infrastructure.analytics import analytics_stage
+    from app.infrastructure.db import CaptureCatalog
+    from app.infrastructure.simulator.runner_fake import FakeRunner
+
+    write_project(data_dir, "bench")
+    runner = FakeRunner(data_dir, cameras=1, batch_window=0, latency=latency)
+    catalog = CaptureCatalog(data_dir / "capture.db")
+    runner.add_ingest_stage(analytics_stage)
+    runner.add_capture_listener(catalog.record)
+    runner.start_project("bench")
+    try:
+        runner.capture_now(wait=True, project="bench")  # calentamiento
+
+        frame, persist, total = [], [], []
+        for _ in range(captures):
+            t0 = time.perf_counter()
+            _, persisted = runner.submit_capture("bench")
+            t1 = time.perf_counter()
+            persisted.result()
+            t2 = time.perf_counter()
+            frame.append(t1 - t0)
+            persist.append(t2 - t1)
+            total.append(t2 - t0)
+        metrics.latencies("capture.frame", frame)
+        metrics.latencies("capture.persist", persist)
+        metrics.latencies("capture.total", total)
+
+        t0 = time.perf_counter()
+        futures = [runner.submit_capture("bench")[1] for _ in range(captures)]
+        for f in futures:
+            f.result()
+        metrics.add("capture.throughput", captures / (time.perf_counter() - t0), "captures/s", "higher")
+
+        # Cada captura es una fila: si los nombres chocaran se mediría sobrescribir
+        expected = 1 + 2 * captures
+        stored = catalog.count("bench")
+        if stored != expected:
+            raise RuntimeError(f"El catálogo tiene {stored} capturas en lugar de {expected}")
+    finally:
+        runner.shutdown()
+        runner.registry.stop()
+        catalog.close()
+
+
+# --- encode ---
+def bench_encode(data_dir, metrics, width, frames, workers):
+    from app.infrastructure.common.encoders import FORMATS, EncoderPool, get_encoder
+    from app.infrastructure.common.imaging import write_file
+    from app.infrastructure.simulator.camera_fake import PlantScene, frame_size
+
+    w, h = frame_size("owlsight", width)
+    # Escena de día con las plantas a media altura: ruido y detalle como en una foto real
+    scene = PlantScene(w, h, start=0)
+    t = 7 * 86400 + 12 * 3600
+    samples = [scene.render(t=t + i) for i in range(frames)]
+    print(f"  {w}x{h} px, {frames} frame(s) per preset")
+
+    out = data_dir / "encode"
+    for fmt, spec in FORMATS.items():
+        for quality in spec["presets"]:
+            encoder = get_encoder(fmt, quality)
+            encoder.encode(samples[0])  # calentamiento
+            encode, write, sizes = [], [], []
+            for i, frame in enumerate(samples):
+                t0 = time.perf_counter()
+                data = encoder.encode(frame)
+                t1 = time.perf_counter()
+                sizes.append(write_file(data, out / f"{fmt}-{quality}-{i}.{encoder.extension}"))
+                t2 = time.perf_counter()
+                encode.append(t1 - t0)
+                write.append(t2 - t1)
+            prefix = f"encode.{fmt}.{quality}"
+            metrics.add(f"{prefix}.encode", statistics.median(encode) * 1000)
+            metrics.add(f"{prefix}.write", statistics.median(write) * 1000)
+            metrics.add(f"{prefix}.bytes", statistics.mean(sizes), "bytes")
+    shutil.rmtree(out, ignore_errors=True)
+
+    # Como en la app: varios hilos del pipeline entregan fotos al pool a la vez
+    pool = EncoderPool(workers)
+    try:
+        with ThreadPoolExecutor(max(workers, 1) * 2) as callers:
+            t0 = time.perf_counter()
+            list(callers.map(pool.encode, samples * 4))
+            metrics.add("encode.pool.throughput", 4 * frames / (time.perf_counter() - t0), "frames/s", "higher")
+    finally:
+        pool.shutdown()
+
+
+# --- api ---
+async def _bench_api(metrics, clients, requests):
+    import httpx
+    from app.main import app
+
+    t0 = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            # The runner starts in the background: time to the first answer and to readiness
+            (await client.get("/api/health")).raise_for_status()
+            metrics.add("api.startup.first_request", (time.perf_counter() - t0) * 1000)
+            while (await client.get("/api/ready")).status_code != 200:
+                await asyncio.sleep(0.01)
+            metrics.add("api.startup.ready", (time.perf_counter() - t0) * 1000)
+
+            for name, path in (("status", "/api/status"), ("projects", "/api/projects")):
+                for _ in range(10):
+                    (await client.get(path)).raise_for_status()
+
+                samples = []
+
+                async def worker():
+                    for _ in range(requests // clients):
+                        t0 = time.perf_counter()
+                        (await client.get(path)).raise_for_status()
+                        samples.append(time.perf_counter() - t0)
+
+                t0 = time.perf_counter()
+                await asyncio.gather(*(worker() for _ in range(clients)))
+                elapsed = time.perf_counter() - t0
+                metrics.latencies(f"api.{name}", samples)
+                metrics.add(f"api.{name}.rps", len(samples) / elapsed, "req/s", "higher")
+
+
+def bench_api(data_dir, metrics, clients, requests):
+    for i in range(5):
+        write_project(data_dir, f"api{i}")
+    asyncio.run(_bench_api(metrics, clients, requests))
+
+
+# --- listing ---
+def _synthetic(project, n, rng, media_dir=None, start=1_700_000_000):
+    for i in range(n):
+        filename = f"{project}_{i:08d}.jpg"
+        yield {
+            "project": project,
+            "filename": filename,
+            "path": str(media_dir / filename) if media_dir else f"/synthetic/{filename}",
+            "timestamp_utc": start + i * 60,
+            "camera": "SIM0",
+            "size_bytes": 1_000_000,
+            "analytics": {"mean_luminosity": rng.uniform(0, 255), "green_index": rng.random(), "histogram": None},
+        }
+
+
+def _timed(fn, repeat=20):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples) * 1000
+
+
+def bench_listing(data_dir, metrics, sizes, fs_max, chunk=100_000):
+    from app.infrastructure.captures_fs import scan_captures
+    from app.infrastructure.db import CaptureCatalog
+
+    for n in sizes:
+        rng = random.Random(n)
+        catalog = CaptureCatalog(data_dir / f"listing-{n}.db")
+        try:
+            frames = _synthetic("p", n, rng)
+            t0 = time.perf_counter()
+            while True:
+                batch = [m for _, m in zip(range(chunk), frames)]
+                if not batch:
+                    break
+                catalog.record_many(batch)
+            metrics.add(f"listing.{n}.ingest", n / (time.perf_counter() - t0), "frames/s", "higher")
+
+            deep = datetime.fromtimestamp(1_700_000_000 + int(n * 0.9) * 60, tz=timezone.utc)
+            metrics.add(f"listing.{n}.first_page", _timed(lambda: catalog.query("p", limit=100)))
+            metrics.add(f"listing.{n}.deep_page", _timed(lambda: catalog.query("p", start=deep, limit=100)))
+            metrics.add(f"listing.{n}.usage", _timed(catalog.usage))
+            metrics.add(f"listing.{n}.series", _timed(lambda: catalog.series("p", "mean_luminosity"), repeat=5))
+        finally:
+            catalog.close()
+
+        if n <= fs_max:
+            media = data_dir / "media" / f"fs{n}"
+            media.mkdir(parents=True)
+            for i in range(n):
+                (media / f"fs{n}_{i:08d}.jpg").touch()
+            metrics.add(f"listing.{n}.fs_discovery", _timed(lambda: sum(1 for _ in scan_captures(data_dir, f"fs{n}")), repeat=3))
+
+
+# --- run / compare ---
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    data_dir = Path(tempfile.mkdtemp(prefix="meaplan-bench-"))
+    # La configuración de la app se lee del entorno al importarla
+    os.environ.update({
+        "MEAPLAN_ENV": "sim",
+        "MEAPLAN_DATA_DIR": str(data_dir),
+        "MEAPLAN_RETENTION_INTERVAL": "86400",
+        "MEAPLAN_SIM_LATENCY": str(args.sim_latency),
+    })
+    sys.path.insert(0, str(BACKEND_DIR))
+    import logging
+    logging.disable(logging.WARNING)
+
+    metrics = Metrics()
+    suites = args.suite or ["capture", "api", "listing", "encode"]
+    try:
+        if "capture" in suites:
+            print("capture")
+            bench_capture(data_dir, metrics, args.captures, args.sim_latency)
+        if "api" in suites:
+            print("api")
+            bench_api(data_dir, metrics, args.clients, args.requests)
+        if "listing" in suites:
+            print("listing")
+            bench_listing(data_dir, metrics, [int(n) for n in args.frames.split(",")], args.fs_max)
+        if "encode" in suites:
+            print("encode")
+            bench_encode(data_dir, metrics, args.encode_width, args.encode_frames, args.encoder_workers)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    result = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("func", "output", "baseline")},
+        },
+        "metrics": metrics.values,
+    }
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            return 1 if compare(json.load(f), result, args.threshold) else 0
+    return 0
+
+
+def compare(baseline, current, threshold):
+    """
+    Print current vs baseline per metric. Returns the names of the regressed metrics.
+    """
+    regressions = []
+    print(f"\n{'metric':<44}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, cur in current["metrics"].items():
+        base = baseline["metrics"].get(name)
+        if base is None or not base["value"]:
+            continue
+        change = (cur["value"] - base["value"]) / base["value"]
+        worse = change > threshold if cur["better"] == "lower" else change < -threshold
+        if worse:
+            regressions.append(name)
+        flag = "  REGRESSION" if worse else ""
+        print(f"{name:<44}{base['value']:>12.3f}{cur['value']:>12.3f}{change:>+10.1%}{flag}")
+    print(f"\n{len(regressions)} regression(s) over {threshold:.0%}")
+    return regressions
+
+
+def compare_files(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    return 1 if compare(baseline, current, args.threshold) else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("run", help="Run the benchmarks")
+    p.add_argument("-o", "--output", default="benchmark-results.json")
+    p.add_argument("--suite", action="append", choices=["capture", "api", "listing", "encode"])
+    p.add_argument("--captures", type=int, default=50)
+    p.add_argument("--sim-latency", type=float, default=0.0, help="Simulated hardware latency factor")
+    p.add_argument("--clients", type=int, default=16)
+    p.add_argument("--requests", type=int, default=800, help="Requests per endpoint, split across clients")
+    p.add_argument("--frames", default="10,1000,100000", help="Synthetic frame counts (e.g. 10,1000,100000,1000000)")
+    p.add_argument("--fs-max", type=int, default=10000, help="Largest frame count also created as files")
+    p.add_argument("--encode-width", type=int, default=4608, help="Width of the encoded frames in px (0: full sensor)")
+    p.add_argument("--encode-frames", type=int, default=5, help="Frames encoded per preset")
+    p.add_argument("--encoder-workers", type=int, default=2, help="Encoder pool size for the throughput run")
+    p.add_argument("--baseline", help="Compare against this results file when done")
+    p.add_argument("--threshold", type=float, default=0.15)
+    p.set_defaults(func=run)
+
+    p = sub.add_parser("compare", help="Compare two results files")
+    p.add_argument("baseline")
+    p.add_argument("current")
+    p.add_argument("--threshold", type=float, default=0.15, help="Relative change that counts as a regression")
+    p.set_defaults(func=compare_files)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Per-phase capture latency on the device, cold vs warm camera mode.
+
+    python tools/capture-latency.py <project> [-n 20] [--interval 1.0]
+
+Phases (seconds, from CameraController.last_timings):
+    light_on         light.turn_on()
+    frame_available  light on -> frame available
+    saved            frame available -> image + metadata saved
+    total            whole take_picture()
+"""
+import argparse
+import statistics
+import time
+
+PHASES = ("light_on", "frame_available", "saved", "total")
+
+
+def run_mode(project_name, warm, shots, interval, light):
+    from meapis.project import Project
+    from meapis.camera.camera_controller import CameraController
+
+    project = Project(project_name)
+    project.warm_camera = warm
+
+    controller = CameraController(project, light)
+    controller.camera.persistent = warm
+
+    timings = []
+    try:
+        for _ in range(shots):
+            controller.take_picture()
+            timings.append(controller.last_timings)
+            time.sleep(interval)
+    finally:
+        controller.close()
+
+    return timings
+
+
+def summarize(mode, timings):
+    print(f"\n{mode} ({len(timings)} shots)")
+    print(f"{'phase':<16}{'mean':>10}{'p50':>10}{'max':>10}")
+    for phase in PHASES:
+        values = [t[phase] for t in timings]
+        print(f"{phase:<16}{statistics.mean(values):>10.4f}{statistics.median(values):>10.4f}{max(values):>10.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("project")
+    parser.add_argument("-n", "--shots", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between shots")
+    args = parser.parse_args()
+
+    from meapis.utils.light import Light
+
+    light = Light()
+    try:
+        for mode, warm in (("cold", False), ("warm", True)):
+            summarize(mode, run_mode(args.project, warm, args.shots, args.interval, light))
+    finally:
+        light.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""
+Focus calibration on the simulated lens: cold search, cached re-calibration and
+re-calibration after the setup moved (cached position no longer in focus).
+
+    python tools/focus-calibration.py [--focus 8.0] [--move 2.0] [--move-time 0.05]
+
+--move-time models how long the real lens takes to settle at each position.
+"""
+import argparse
+import os
+import tempfile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--focus", type=float, default=8.0, help="In-focus LensPosition")
+    parser.add_argument("--move", type=float, default=2.0, help="How far the in-focus position moves for the last run")
+    parser.add_argument("--move-time", type=float, default=0.05, help="Seconds per lens move")
+    parser.add_argument("--range", type=float, nargs=2, default=(0.0, 15.0), metavar=("MIN", "MAX"))
+    args = parser.parse_args()
+
+    from meapis.camera.focus import CalibrationCache, FocusCalibrator, SimulatedLens
+
+    lens = SimulatedLens(focus=args.focus, move_time=args.move_time)
+    with tempfile.TemporaryDirectory() as tmp:
+        calibrator = FocusCalibrator(CalibrationCache(os.path.join(tmp, "focus.json")))
+        key = CalibrationCache.key("simulated", "demo")
+
+        print(f"{'run':<10}{'target':>10}{'found':>10}{'steps':>8}{'seconds':>10}")
+        for run, focus in (("cold", args.focus), ("cached", args.focus), ("moved", args.focus + args.move)):
+            lens.focus = focus
+            result = calibrator.calibrate(lens.score_at, tuple(args.range), key)
+            print(f"{run:<10}{focus:>10.2f}{result['LensPosition']:>10.3f}{result['steps']:>8}{result['elapsed']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+LGP luminosity analysis.
+
+Column-mean luminosity of each image, mirrored around the centre and reduced
+to 21 bins (0..100 % of the half width).
+
+    python tools/lgp_analyze.py <sweep_dir> [-o table.csv] [-j WORKERS] [--per-image]
+
+Every image under <sweep_dir> is analyzed with a process pool. Results are
+cached by file content hash in <sweep_dir>/.lgp-cache.json, so re-runs only
+process new or modified images. One combined table is written for the sweep.
+
+As a module:
+
+    from lgp_analyze import analyze_luminosity, analyze_tree
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+import numpy as np
+
+BINS = 21
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".tif", ".tiff", ".bmp")
+CACHE_FILE = ".lgp-cache.json"
+
+
+def bin_bounds(length, bins=BINS):
+    # Same split as np.array_split: the first (length % bins) bins get one extra column
+    q, r = divmod(length, bins)
+    sizes = np.full(bins, q, dtype=np.int64)
+    sizes[:r] += 1
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    return starts, sizes
+
+
+def analyze_array(arr, bins=BINS):
+    # Average luminosity for each column (integer accumulation, no float copy of the image)
+    luminosity = arr.sum(axis=0, dtype=np.uint64) / arr.shape[0]
+
+    mid = len(luminosity) // 2
+    left = luminosity[:mid]
+    right = luminosity[-mid:][::-1]  # Reverse the right half
+    luminosity = (left + right) / 2
+
+    starts, sizes = bin_bounds(len(luminosity), bins)
+    # With a half width below `bins` (small crops) the last bins are empty: NaN, as
+    # the mean of an empty np.array_split chunk. reduceat only gets the non-empty ones
+    binned = np.full(bins, np.nan)
+    filled = sizes > 0
+    if filled.any():
+        binned[filled] = np.add.reduceat(luminosity, starts[filled]) / sizes[filled]
+
+    return binned / 100
+
+
+def analyze_luminosity(image_path):
+    # Open and convert image to grayscale
+    with Image.open(image_path) as img:
+        arr = np.asarray(img.convert('L'))
+    return analyze_array(arr)
+
+
+def file_hash(path, chunk_size=1 << 20):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def find_images(root):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(IMAGE_EXTS):
+                yield os.path.join(dirpath, name)
+
+
+def _analyze_job(path):
+    return analyze_luminosity(path).tolist()
+
+
+def load_cache(root):
+    try:
+        with open(os.path.join(root, CACHE_FILE), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(root, cache):
+    path = os.path.join(root, CACHE_FILE)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump(cache, f)
+    os.replace(tmp, path)
+
+
+def analyze_tree(root, workers=None):
+    """
+    Analyze every image under `root`.
+    :return: list of (relative_path, luminosity array), sorted by path.
+    """
+    images = list(find_images(root))
+    cache = load_cache(root)
+
+    hashes = {path: file_hash(path) for path in images}
+    pending = sorted({h: p for p, h in hashes.items() if h not in cache}.items())
+
+    if pending:
+        print(f"Analyzing {len(pending)} new image(s), {len(images) - len(pending)} cached", file=sys.stderr)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for (digest, _), result in zip(pending, pool.map(_analyze_job, [p for _, p in pending], chunksize=4)):
+                cache[digest] = result
+        save_cache(root, cache)
+
+    return [(os.path.relpath(p, root), np.array(cache[hashes[p]])) for p in images]
+
+
+def bin_positions(bins=BINS):
+    return [idx / (bins - 1) * 100 for idx in range(bins)]
+
+
+def write_table(results, output):
+    with open(output, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['image'] + bin_positions())
+        for rel_path, luminosity in results:
+            writer.writerow([rel_path] + list(luminosity))
+
+
+def write_image_csv(image_path, luminosity):
+    image_path_wout_ext = os.path.splitext(image_path)[0]
+
+    with open(f"{image_path_wout_ext}.csv", 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['index', 'luminosity'])
+        for row_idx, value in zip(bin_positions(len(luminosity)), luminosity):
+            writer.writerow([row_idx, value])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root", help="Sweep directory (e.g. dist-0.8-0.005-size-0.5-0.0-2_sides) or a single image")
+    parser.add_argument("-o", "--output", help="Combined table (default: <root>/lgp-luminosity.csv)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--per-image", action="store_true", help="Also write <image>.csv next to each image")
+    args = parser.parse_args()
+
+    if os.path.isfile(args.root):
+        luminosity = analyze_luminosity(args.root)
+        write_image_csv(args.root, luminosity)
+        return
+
+    results = analyze_tree(args.root, args.workers)
+    output = args.output or os.path.join(args.root, "lgp-luminosity.csv")
+    write_table(results, output)
+    print(f"{len(results)} image(s) -> {output}", file=sys.stderr)
+
+    if args.per_image:
+        for rel_path, luminosity in results:
+            write_image_csv(os.path.join(args.root, rel_path), luminosity)
+
+
+if __name__ == '__main__':
+    main()